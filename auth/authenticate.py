@@ -3,6 +3,7 @@ from streamlit_oauth import OAuth2Component
 from streamlit import session_state as ss
 import json
 import base64
+from db.swr_cache import stale_while_revalidate, reference_client
 
 def authenticate_user():
     if "oauth" in st.secrets:
@@ -65,10 +66,10 @@ def _check_sso_authentication():
 
     st.rerun()
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@stale_while_revalidate()
 def get_user_permissions():
     sql = 'SELECT id, email, name, lbu, permissions, admin FROM supp.streamlit_users ORDER BY id;'
-    df = ss.snowflake.query(sql)
+    df = reference_client().query(sql)
         
     return df
 
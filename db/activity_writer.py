@@ -0,0 +1,90 @@
+import atexit
+import threading
+from collections import deque
+
+class ActivityWriter:
+    """
+    Background writer for the page activity log.
+
+    Events are queued in memory and written by a daemon thread with one multi row INSERT, every flush_interval
+    seconds or as soon as batch_size events are waiting, so page switches never wait on the warehouse. The queue
+    keeps at most max_queue events, the oldest are dropped past that. Pending events are flushed on shutdown.
+    on_write is called with every INSERT that succeeded, to invalidate cached reads of the table.
+    """
+    def __init__(self, execute, table: str = 'supp.streamlit_activity', flush_interval: float = 5.0, batch_size: int = 200, max_queue: int = 10_000, on_write=None):
+        self.table = table
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.dropped = 0
+
+        self._execute = execute
+        self._on_write = on_write
+        self._events = deque(maxlen=max_queue)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, name='activity-writer', daemon=True)
+        self._thread.start()
+
+        atexit.register(self.close)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def log(self, timestamp: str, email: str, name: str, page: str) -> None:
+        with self._lock:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+
+            self._events.append((timestamp, email, name, page))
+            full = len(self._events) >= self.batch_size
+
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        """Write every queued event, batch_size rows per statement"""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    rows = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+
+                if not rows:
+                    return
+
+                sql = self._insert_sql(rows)
+
+                try:
+                    self._execute(sql)
+                except Exception as e:
+                    # Activity logging is best effort, a failed batch must not take the writer down
+                    print(f"Failed to write {len(rows)} activity events: {e}")
+                    continue
+
+                if self._on_write is not None:
+                    self._on_write(sql)
+
+    def close(self) -> None:
+        if self._closed.is_set():
+            return
+
+        self._closed.set()
+        self._wake.set()
+        self._thread.join(timeout=self.flush_interval)
+        self.flush()
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _insert_sql(self, rows: list) -> str:
+        values = ',\n'.join(f"({', '.join(_quote(value) for value in row)})" for row in rows)
+
+        return f"INSERT INTO {self.table} (timestamp, email, name, page) VALUES\n{values};"
+
+def _quote(value) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
@@ -0,0 +1,58 @@
+import threading
+import time
+
+class CacheWarmer:
+    """
+    Prepopulates caches in a daemon thread, once at start and again whenever latest_date returns a new date.
+
+    Parameters:
+        loaders (list[tuple]): (func, args) pairs, args is a tuple or a callable building it from the latest date.
+        latest_date (callable): Returns the latest data date, e.g. the newest funnelweb closing date.
+        poll_interval (float): Seconds between checks for a new latest date.
+    """
+    def __init__(self, loaders: list, latest_date, poll_interval: float = 300):
+        self.loaders = loaders
+        self.latest_date = latest_date
+        self.poll_interval = poll_interval
+        self.warmed_date = None
+        self.timings = {}
+
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+        self._thread.start()
+
+    def warm(self, latest) -> None:
+        start = time.perf_counter()
+        timings = {}
+
+        for func, args in self.loaders:
+            args = args(latest) if callable(args) else args
+            loader_start = time.perf_counter()
+
+            try:
+                func(*args)
+            except Exception as e:
+                # A failed loader is simply loaded on first use instead
+                print(f"Warming {func.__name__} failed: {e}")
+
+            timings[func.__name__] = round((time.perf_counter() - loader_start) * 1000, 1)
+
+        self.timings = timings
+        self.warmed_date = latest
+
+        print(f"Warmed {len(self.loaders)} caches for {latest} in {time.perf_counter() - start:.1f}s")
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                latest = self.latest_date()
+
+                if latest != self.warmed_date:
+                    self.warm(latest)
+            except Exception as e:
+                print(f"Cache warm up failed: {e}")
+
+            self._stopped.wait(self.poll_interval)
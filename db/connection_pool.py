@@ -0,0 +1,168 @@
+import threading
+import time
+from contextlib import contextmanager
+from snowflake.connector.errors import DatabaseError, InterfaceError
+
+# Session / master token expired or not found, the connection has to be rebuilt
+SESSION_EXPIRED_ERRNOS = {390111, 390112, 390113, 390114}
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out within the timeout"""
+
+class QueryCancelledError(Exception):
+    """Raised when a query was cancelled because the caller that issued it no longer needs the result"""
+
+class _PooledConnection:
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = self.last_used = self.last_checked = time.monotonic()
+
+class SnowflakeConnectionPool:
+    """
+    Process wide pool of Snowflake connections shared by all Streamlit sessions.
+
+    Connections are created lazily up to max_size, handed out with checkout / checkin and evicted once they
+    have been idle for longer than idle_timeout. Idle connections are health checked before being reused when
+    they have not been used for longer than health_check_interval.
+    """
+    def __init__(self, connect, max_size: int = 8, idle_timeout: float = 1800, health_check_interval: float = 300, checkout_timeout: float = 60):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+
+        self._idle: list[_PooledConnection] = []
+        self._size = 0
+        self._condition = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+    def checkout(self) -> _PooledConnection:
+        """Borrow a connection from the pool, creating a new one if there is spare capacity"""
+        deadline = time.monotonic() + self.checkout_timeout
+
+        while True:
+            pooled = self._reserve(deadline)
+
+            if pooled is None:
+                break
+
+            # Health checks can hit the network so they are done outside of the lock
+            if self._is_healthy(pooled):
+                return pooled
+
+            with self._condition:
+                self._discard(pooled)
+                self._condition.notify()
+
+        try:
+            return _PooledConnection(self._connect())
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def checkin(self, pooled: _PooledConnection, discard: bool = False) -> None:
+        """Return a borrowed connection, closing it instead if it is broken"""
+        with self._condition:
+            if discard or pooled.conn.is_closed():
+                self._discard(pooled)
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager yielding a connection, reconnecting once if the Snowflake session has expired"""
+        pooled = self.checkout()
+        discard = False
+
+        try:
+            yield pooled.conn
+        except (DatabaseError, InterfaceError) as e:
+            discard = is_session_expired(e) or pooled.conn.is_closed()
+            raise
+        finally:
+            self.checkin(pooled, discard)
+
+    def run(self, func, retry: bool = True):
+        """
+        Run func(conn) on a pooled connection, retrying once on a fresh connection if the session expired.
+
+        Pass retry=False for statements that are not safe to run twice (DML), the expired connection is still
+        discarded but the error is raised to the caller.
+        """
+        try:
+            with self.connection() as conn:
+                return func(conn)
+        except (DatabaseError, InterfaceError) as e:
+            if not retry or not is_session_expired(e):
+                raise
+
+        with self.connection() as conn:
+            return func(conn)
+
+    def close(self) -> None:
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop())
+
+    def _reserve(self, deadline: float):
+        """Pop an idle connection, or reserve a slot for a new one (returns None) waiting until the deadline"""
+        with self._condition:
+            self._evict_idle()
+
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0 or not self._condition.wait(remaining):
+                    raise PoolTimeoutError(f'No Snowflake connection available after {self.checkout_timeout}s (max size {self.max_size})')
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        expired = [pooled for pooled in self._idle if now - pooled.last_used > self.idle_timeout]
+
+        for pooled in expired:
+            self._idle.remove(pooled)
+            self._discard(pooled)
+
+    def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        if pooled.conn.is_closed():
+            return False
+
+        now = time.monotonic()
+
+        if now - pooled.last_checked < self.health_check_interval:
+            return True
+
+        pooled.last_checked = now
+
+        return pooled.conn.is_valid()
+
+    def _discard(self, pooled: _PooledConnection) -> None:
+        self._size -= 1
+
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+def is_session_expired(error: Exception) -> bool:
+    return getattr(error, 'errno', None) in SESSION_EXPIRED_ERRNOS
@@ -0,0 +1,155 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+TIMEZONE = 'Asia/Hong_Kong'
+
+# Low cardinality funnelweb columns that are dictionary encoded into pandas categoricals
+CATEGORICAL_COLUMNS = frozenset([
+    'FUND_CODE', 'LBU_CODE', 'LBU_GROUP', 'MANAGER', 'FWD_ASSET_TYPE', 'BBG_ASSET_TYPE', 'L1_ASSET_TYPE', 'L2_ASSET_TYPE',
+    'L3_ASSET_TYPE', 'CURRENCY', 'COUNTRY_REPORT', 'FINAL_RATING', 'ISSUER_COUNTRY', 'SW_PAY_CRNCY', 'SW_REC_CRNCY'
+])
+
+# Columns with more distinct values than this share of the rows are left as strings
+MAX_CATEGORY_RATIO = 0.5
+
+def convert_table(table: pa.Table, columns: dict) -> pa.Table:
+    """
+    Convert an Arrow table to the dashboard types in a single pass with pyarrow.compute.
+
+    Parameters:
+        table (pa.Table): Raw table returned by the database.
+        columns (dict): Column name to python type (float, str, datetime, ZoneInfo or bool).
+
+    Returns:
+        pa.Table: Table whose columns already match the old pandas conversion, columns already in the right type are not copied.
+    """
+    for key, dtype in columns.items():
+        index = table.schema.get_field_index(key)
+
+        if index == -1:
+            continue
+
+        column = table.column(index)
+        converted = _convert_column(column, dtype)
+
+        if converted is not column:
+            table = table.set_column(index, key, converted)
+
+    return table
+
+def _convert_column(column, dtype):
+    arrow_type = column.type
+
+    if dtype == float:
+        if pa.types.is_float64(arrow_type):
+            return column
+        return pc.cast(column, pa.float64(), safe=False)
+    elif dtype == str:
+        if not pa.types.is_string(arrow_type) and not pa.types.is_large_string(arrow_type):
+            column = pc.cast(column, pa.string())
+        # Keep the 'None' string the pages compare against
+        return pc.fill_null(column, 'None') if column.null_count else column
+    elif dtype == bool:
+        if not pa.types.is_boolean(arrow_type):
+            column = pc.cast(column, pa.bool_())
+        return pc.fill_null(column, False) if column.null_count else column
+    elif dtype == datetime:
+        if pa.types.is_timestamp(arrow_type) and arrow_type.unit == 'ns' and arrow_type.tz is None:
+            return column
+        if pa.types.is_timestamp(arrow_type) and arrow_type.tz is not None:
+            column = pc.local_timestamp(column)
+        return pc.cast(column, pa.timestamp('ns'))
+    elif dtype == ZoneInfo:
+        if not pa.types.is_timestamp(arrow_type):
+            column = pc.cast(column, pa.timestamp('ns'))
+        if column.type.tz is None:
+            column = pc.assume_timezone(column, 'UTC')
+        column = pc.cast(column, pa.timestamp('ns', tz=TIMEZONE))
+        return pc.local_timestamp(column)
+
+    return column
+
+def sort_table(table: pa.Table, sort_columns: list) -> pa.Table:
+    if not sort_columns:
+        return table
+
+    return table.sort_by([(column, 'ascending') for column in sort_columns])
+
+def to_pandas(table: pa.Table, arrow_dtypes: bool = False, self_destruct: bool = True) -> pd.DataFrame:
+    """
+    Convert an Arrow table to pandas.
+
+    With arrow_dtypes the frame is a zero copy view backed by the Arrow buffers (pd.ArrowDtype), otherwise the
+    buffers are released column by column while converting so the peak memory stays close to one copy.
+    Pass self_destruct=False when the table is still used elsewhere.
+    """
+    if arrow_dtypes:
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    return table.to_pandas(split_blocks=True, self_destruct=self_destruct)
+
+def encode_categories(table: pa.Table, columns=CATEGORICAL_COLUMNS, max_ratio: float = MAX_CATEGORY_RATIO) -> pa.Table:
+    """
+    Dictionary encode the string columns listed in columns, so they convert to pandas categoricals without building
+    a Python string per row. The dictionary is sorted so the categories sort like the strings did, and columns with
+    too many distinct values for the encoding to pay off are skipped.
+    """
+    for index, field in enumerate(table.schema):
+        if field.name not in columns or not (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            continue
+
+        column = table.column(index)
+        dictionary = pc.drop_null(pc.unique(column))
+
+        if len(dictionary) > max_ratio * table.num_rows:
+            continue
+
+        dictionary = dictionary.take(pc.sort_indices(dictionary))
+        indices = pc.index_in(column, value_set=dictionary)
+        chunks = [pa.DictionaryArray.from_arrays(chunk, dictionary) for chunk in indices.chunks]
+
+        table = table.set_column(index, field.name, pa.chunked_array(chunks, pa.dictionary(pa.int32(), field.type)))
+
+    return table
+
+def categorize(df: pd.DataFrame, columns=CATEGORICAL_COLUMNS, max_ratio: float = MAX_CATEGORY_RATIO) -> pd.DataFrame:
+    """Same as encode_categories for a frame that is already in pandas, e.g. after patches that write new labels"""
+    for column in df.columns.intersection(list(columns)):
+        series = df[column]
+
+        if series.dtype != object or series.nunique() > max_ratio * len(series):
+            continue
+
+        df[column] = pd.Categorical(series)
+
+    return df
+
+def union_categories(frames: list) -> list:
+    """
+    Give the categorical columns of the frames the same sorted categories, so pd.concat keeps them categorical
+    instead of falling back to object. Frames where the column was left as strings are encoded too.
+    """
+    if len(frames) < 2:
+        return frames
+
+    columns = {column for frame in frames for column, dtype in frame.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+
+    for column in columns:
+        if not all(column in frame and (isinstance(frame[column].dtype, pd.CategoricalDtype) or frame[column].dtype == object) for frame in frames):
+            continue
+
+        categories = sorted(set().union(*(_categories(frame[column]) for frame in frames)))
+        dtype = pd.CategoricalDtype(categories)
+
+        frames = [frame.assign(**{column: frame[column].astype(dtype)}) for frame in frames]
+
+    return frames
+
+def _categories(series: pd.Series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.categories
+
+    return series.dropna().unique()
@@ -1,29 +1,187 @@
-import streamlit as st
-from streamlit import session_state as ss
+from collections import OrderedDict
 from datetime import datetime
+import threading
+import numpy as np
 import pandas as pd
+from db.swr_cache import stale_while_revalidate, reference_client, derived, delta_start, merge_delta
+from db.sql import bind
+from .data_shipment import HISTORY_START
+from utils.curve import convert_tenor_to_float, interpolate_zero_rates, LINEAR_ZERO
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_curves():
-    sql = (
+# Interpolated curves kept by CurveStore.on_grid, the least recently used are evicted first
+ON_GRID_ENTRIES = 2048
+
+@stale_while_revalidate(copy=False, incremental=True)
+def get_curves(previous: pd.DataFrame = None):
+    """Get all curve rates, the frame is shared so it must not be modified (use the curve store instead)"""
+    since = HISTORY_START if previous is None else delta_start(previous['VALUATION_DATE'])
+    sql = bind(
         "SELECT valuation_date, curve, fx, tenor, rate "
         "FROM supp.curve_rates r, supp.curve_name c "
-        "WHERE valuation_date >= '2021-12-31' "
+        "WHERE valuation_date >= :since "
         "AND r.curve = c.name "
-        "ORDER BY valuation_date, curve, tenor;"
+        "ORDER BY valuation_date, curve, tenor;",
+        since=since
     )
 
-    df = ss.snowflake.query(sql)
-    
+    df = reference_client().query(sql)
+
     df['VALUATION_DATE'] = pd.to_datetime(df['VALUATION_DATE']).dt.date
 
-    return df
+    return df if previous is None else merge_delta(previous, df, 'VALUATION_DATE', since)
 
-def get_curve(curve_name, valuation_date):
+class CurveStore:
+    """
+    Curve rates held as a dense (valuation date x curve x tenor) array, missing points are NaN.
+
+    Tenors are ordered by their length in years, parsed once with convert_tenor_to_float, tenors with an unknown name
+    are left out. Single curves, tenor time series and date slices are views into the array.
+    """
+    def __init__(self, df: pd.DataFrame):
+        dates = pd.DatetimeIndex(pd.to_datetime(df['VALUATION_DATE']).unique()).sort_values()
+        curve_fx = df.drop_duplicates('CURVE').set_index('CURVE')['FX'].sort_index()
+        tenor_years = {tenor: convert_tenor_to_float(tenor) for tenor in df['TENOR'].unique()}
+        tenor_years = dict(sorted(((tenor, years) for tenor, years in tenor_years.items() if years is not None), key=lambda item: item[1]))
+
+        self.dates: pd.DatetimeIndex = dates
+        self.curves: pd.Index = curve_fx.index
+        self.tenors: pd.Index = pd.Index(list(tenor_years.keys()))
+        self.years: np.ndarray = np.array(list(tenor_years.values()), dtype=float)
+        self.curve_fx: dict[str, str] = curve_fx.to_dict()
+
+        rows = self.dates.get_indexer(pd.to_datetime(df['VALUATION_DATE']))
+        curves = self.curves.get_indexer(df['CURVE'])
+        tenors = self.tenors.get_indexer(df['TENOR'])
+        known = tenors >= 0
+
+        self.cube: np.ndarray = np.full((len(self.dates), len(self.curves), len(self.tenors)), np.nan)
+        self.cube[rows[known], curves[known], tenors[known]] = df['RATE'].to_numpy(dtype=float)[known]
+        self.cube.flags.writeable = False
+
+        self._date_rows = {date.date(): row for row, date in enumerate(self.dates)}
+        self._curve_columns = {curve: column for column, curve in enumerate(self.curves)}
+        self._tenor_columns = {tenor: column for column, tenor in enumerate(self.tenors)}
+
+        self._on_grid: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self._on_grid_lock = threading.Lock()
+
+    def currencies(self) -> list[str]:
+        return sorted(set(self.curve_fx.values()))
+
+    def curves_for(self, fx: str) -> list[str]:
+        return [curve for curve, curve_fx in self.curve_fx.items() if curve_fx == fx]
+
+    def dates_for(self, curve_name: str) -> list:
+        """Valuation dates with at least one rate for the curve"""
+        available = ~np.isnan(self.cube[:, self._curve_columns[curve_name]]).all(axis=1)
+        return [date.date() for date in self.dates[available]]
+
+    def rates(self, curve_name: str, valuation_date: datetime) -> np.ndarray:
+        """Rates of one curve on one date in the order of self.tenors, None if the curve or date is unknown"""
+        row = self._date_rows.get(_to_date(valuation_date))
+        column = self._curve_columns.get(curve_name)
+
+        if row is None or column is None:
+            return None
+
+        return self.cube[row, column]
+
+    def curve(self, curve_name: str, valuation_date: datetime) -> pd.DataFrame:
+        """
+        One curve on one date in the long format of get_curves, ordered by tenor length.
+
+        Returns:
+            pd.DataFrame: CURVE, VALUATION_DATE, TENOR, RATE and YEARS columns, empty if there is no such curve.
+        """
+        rates = self.rates(curve_name, valuation_date)
+
+        if rates is None:
+            return pd.DataFrame(columns=['CURVE', 'VALUATION_DATE', 'TENOR', 'RATE', 'YEARS'])
+
+        available = ~np.isnan(rates)
+
+        return pd.DataFrame({
+            'CURVE': curve_name,
+            'VALUATION_DATE': _to_date(valuation_date),
+            'TENOR': self.tenors[available],
+            'RATE': rates[available],
+            'YEARS': self.years[available]
+        })
+
+    def series(self, curve_name: str, tenor: str) -> pd.Series:
+        """History of one tenor of a curve indexed by valuation date, dates without a rate are NaN"""
+        return pd.Series(self.cube[:, self._curve_columns[curve_name], self._tenor_columns[tenor]], index=self.dates, name=tenor)
+
+    def history(self, curve_names: list[str], tenors: list[str]) -> np.ndarray:
+        """Rates of several curves and tenors on every valuation date as one (date x curve x tenor) array"""
+        curves = [self._curve_columns[curve_name] for curve_name in curve_names]
+        tenors = [self._tenor_columns[tenor] for tenor in tenors]
+
+        return self.cube[:, curves][:, :, tenors]
+
+    def on_grid(self, curve_dates: list[tuple], method: str = LINEAR_ZERO) -> np.ndarray:
+        """
+        Curves interpolated onto every tenor of the store, for comparing curves quoted on different tenors.
+
+        The ON_GRID_ENTRIES most recently used (curve, valuation date) are cached, the others are interpolated together.
+        Tenors before the first or after the last rate of a curve are NaN, unknown curves or dates are all NaN.
+
+        Returns:
+            np.ndarray: (curve date x tenor) array in the order of curve_dates and self.tenors.
+        """
+        keys = [(curve_name, _to_date(valuation_date), method) for curve_name, valuation_date in curve_dates]
+
+        with self._on_grid_lock:
+            cached = {key: self._on_grid[key] for key in keys if key in self._on_grid}
+
+            for key in cached:
+                self._on_grid.move_to_end(key)
+
+        missing = list(dict.fromkeys(key for key in keys if key not in cached))
+
+        if len(missing) > 0:
+            rows = np.array([self._date_rows.get(valuation_date, -1) for _, valuation_date, _ in missing])
+            columns = np.array([self._curve_columns.get(curve_name, -1) for curve_name, _, _ in missing])
+            known = (rows >= 0) & (columns >= 0)
+
+            rates = np.full((len(missing), len(self.tenors)), np.nan)
+            rates[known] = self.cube[rows[known], columns[known]]
+
+            interpolated = interpolate_zero_rates(self.years, rates, self.years, method)
+            interpolated[self.years < _first_years(self.years, rates)[:, None]] = np.nan
+
+            cached.update(zip(missing, interpolated))
+
+            with self._on_grid_lock:
+                self._on_grid.update(zip(missing, interpolated))
+
+                while len(self._on_grid) > ON_GRID_ENTRIES:
+                    self._on_grid.popitem(last=False)
+
+        return np.array([cached[key] for key in keys]).reshape(len(keys), len(self.tenors))
+
+    def date_slice(self, valuation_date: datetime) -> pd.DataFrame:
+        """Every curve on one date as a curve by tenor frame"""
+        row = self._date_rows[_to_date(valuation_date)]
+        return pd.DataFrame(self.cube[row], index=self.curves, columns=self.tenors)
+
+def _first_years(years, rates):
+    """Shortest tenor with a rate of every curve, infinity for a curve without any rate"""
+    available = ~np.isnan(rates)
+    return np.where(available.any(axis=1), years[available.argmax(axis=1)], np.inf)
+
+def _to_date(valuation_date):
     if isinstance(valuation_date, (datetime, pd.Timestamp)):
-        valuation_date = valuation_date.date()
-    
-    df = get_curves()
-    df = df[(df['CURVE'] == curve_name) & (df['VALUATION_DATE'] == valuation_date)]
-    
-    return df
\ No newline at end of file
+        return valuation_date.date()
+    elif isinstance(valuation_date, str):
+        return pd.Timestamp(valuation_date).date()
+
+    return valuation_date
+
+@derived(get_curves)
+def get_curve_store(df) -> CurveStore:
+    """Get the curve store, it is read only and shared by every session"""
+    return CurveStore(df)
+
+def get_curve(curve_name, valuation_date):
+    return get_curve_store().curve(curve_name, valuation_date)
@@ -1,52 +1,62 @@
 import streamlit as st
-from streamlit import session_state as ss
 from datetime import datetime
 import pandas as pd
-from db.data.lbu import FUND_CODE, SUB_LBU, HK_CODE
+from db.data.lbu import FUND_CODE, SUB_LBU, HK_CODE, get_lbu_hierarchy
+from db.swr_cache import stale_while_revalidate, reference_client, derived, delta_start, merge_delta
+from db.sql import bind
+from utils.dates_extended import ValuationCalendar
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_funnelweb_dates() -> list[datetime]:
-    sql = 'SELECT DISTINCT closing_date FROM funnelweb WHERE closing_date >= \'2021-12-31\' ORDER BY closing_date;'
-    df = ss.snowflake.query(sql)
+# First valuation date of the reference history
+HISTORY_START = '2021-12-31'
+
+@stale_while_revalidate(copy=False, incremental=True)
+def get_funnelweb_dates(previous=None) -> list[datetime]:
+    """Get the funnelweb closing dates, the array is shared so it must not be modified (use the valuation calendar for lookups)"""
+    since = HISTORY_START if previous is None else delta_start(previous)
+    sql = bind('SELECT DISTINCT closing_date FROM funnelweb WHERE closing_date >= :since ORDER BY closing_date;', since=since)
+    df = reference_client().query(sql)
     
     dates = df['CLOSING_DATE'].unique()
     
+    if previous is not None:
+        kept = previous[previous < pd.Timestamp(since)]
+        dates = pd.concat([pd.Series(kept), pd.Series(dates)], ignore_index=True).unique()
+    
     return dates
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@derived(get_funnelweb_dates)
+def get_valuation_calendar(dates) -> ValuationCalendar:
+    """Get the valuation calendar of the funnelweb closing dates, it is read only and shared by every session"""
+    return ValuationCalendar(dates)
+
 def get_lbu_data():
-    sql = "SELECT l.id, l.group_name, f.lbu, f.type, f.short_name, l.bloomberg_name, l.lbu_group, f.sub_lbu, f.vfa, f.hk_code FROM supp.fund AS f LEFT JOIN supp.lbu AS l ON l.name = f.lbu WHERE l.bloomberg_name <> \'LT\' AND f.type <> 'N/A' ORDER BY group_name, lbu, sub_lbu, type, short_name;"
-    df = ss.snowflake.query(sql)
-    
-    return df
+    return get_lbu_hierarchy().frame.copy()
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def get_lbu_data_hk(sub_lbu=SUB_LBU, hk_code=HK_CODE, fund_code=FUND_CODE):
     df = get_lbu_data()
     
-    df = df[df[sub_lbu] != 'None']
-    missing_df = df[df[hk_code] == 'None']
-    
-    if len(missing_df) > 0:
-        st.warning(f"The following funds is not mapped to a three letter HK code: {', '.join(missing_df[fund_code].tolist())}! Please contact {st.secrets['admin']['name']}.")
-        df = df[df[hk_code] != 'None']
+    df = df[(df[sub_lbu] != 'None') & (df[hk_code] != 'None')]
+    warn_missing_hk_codes()
         
     return df
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_hk_code_dict():
-    lbu_df = get_lbu_data_hk()
-    
-    hk_code_dict = dict(zip(lbu_df[FUND_CODE], lbu_df[HK_CODE]))
+def warn_missing_hk_codes():
+    missing_hk_codes = get_lbu_hierarchy().missing_hk_codes
     
-    return hk_code_dict
+    if len(missing_hk_codes) > 0:
+        st.warning(f"The following funds is not mapped to a three letter HK code: {', '.join(missing_hk_codes)}! Please contact {st.secrets['admin']['name']}.")
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_fx_data():
-    """Get all FX data (consider using more specific functions above instead)"""
-    sql: str = 'SELECT valuation_date, fx, rate FROM supp.fx_rates WHERE valuation_date >= \'2021-12-31\' ORDER BY valuation_date, fx;'
-    df = ss.snowflake.query(sql)
+def get_hk_code_dict():
+    return dict(get_lbu_hierarchy().hk_codes)
+
+@stale_while_revalidate(copy=False, incremental=True)
+def get_fx_data(previous: pd.DataFrame = None):
+    """Get all FX data, the frame is shared so it must not be modified (use the FX store in db.data.fx instead)"""
+    since = HISTORY_START if previous is None else delta_start(previous['VALUATION_DATE'])
+    sql: str = bind('SELECT valuation_date, fx, rate FROM supp.fx_rates WHERE valuation_date >= :since ORDER BY valuation_date, fx;', since=since)
+    df = reference_client().query(sql)
     
     df['VALUATION_DATE'] = pd.to_datetime(df['VALUATION_DATE']).dt.date
     
-    return df
\ No newline at end of file
+    return df if previous is None else merge_delta(previous, df, 'VALUATION_DATE', since)
\ No newline at end of file
@@ -1,47 +1,166 @@
-import streamlit as st
-from streamlit import session_state as ss
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
 from .data_shipment import get_fx_data
+from db.swr_cache import derived
+
+# Currency the rates are quoted against
+BASE_CURRENCY = 'USD'
+
+class FxStore:
+    """FX rates held as a dense (date x currency) matrix, rates are units of the currency per USD
+
+    Args:
+        df (pd.DataFrame): Frame with VALUATION_DATE, FX and RATE columns as returned by get_fx_data
+    """
+    def __init__(self, df: pd.DataFrame):
+        table = df.pivot_table(index='VALUATION_DATE', columns='FX', values='RATE', aggfunc='last')
+        table.index = pd.DatetimeIndex(table.index).normalize()
+        table = table.sort_index()
+
+        if BASE_CURRENCY not in table.columns:
+            table[BASE_CURRENCY] = 1.0
+
+        self.dates: pd.DatetimeIndex = table.index
+        self.currencies: pd.Index = table.columns
+        self.matrix: np.ndarray = table.to_numpy(dtype=float)
+        # Last available rate on or before each date, for as-of lookups
+        self.filled: np.ndarray = table.ffill().to_numpy(dtype=float)
+
+        for matrix in (self.matrix, self.filled):
+            matrix.flags.writeable = False
+
+        self._date_rows = {date.date(): row for row, date in enumerate(self.dates)}
+        self._currency_columns = {currency: column for column, currency in enumerate(self.currencies)}
+
+    def rate(self, fx: str, valuation_date: datetime) -> float:
+        """Get the rate of a currency on a date
+
+        Args:
+            fx (str): The currency code
+            valuation_date (datetime): The date to get the rate for
+
+        Returns:
+            float: The exchange rate, None if there is no rate for that date
+        """
+        row = self._date_rows.get(_to_date(valuation_date))
+        column = self._currency_columns.get(fx)
+
+        if row is None or column is None:
+            return None
+
+        rate = self.matrix[row, column]
+        return None if np.isnan(rate) else float(rate)
+
+    def rate_asof(self, fx: str, valuation_date: datetime) -> float:
+        """Get the last available rate of a currency on or before a date, None if there is none"""
+        row = self.dates.searchsorted(pd.Timestamp(_to_date(valuation_date)), side='right') - 1
+        column = self._currency_columns.get(fx)
+
+        if row < 0 or column is None:
+            return None
+
+        rate = self.filled[row, column]
+        return None if np.isnan(rate) else float(rate)
+
+    def rates_for_date(self, valuation_date: datetime) -> dict[str, float]:
+        """Get all rates available on a date as a currency to rate dictionary"""
+        row = self._date_rows.get(_to_date(valuation_date))
+
+        if row is None:
+            return {}
+
+        rates = self.matrix[row]
+        return {currency: float(rate) for currency, rate in zip(self.currencies, rates) if not np.isnan(rate)}
+
+    def rates(self, currencies, dates, asof: bool = False, default: float = np.nan) -> np.ndarray:
+        """Vectorized lookup of one rate per element, currencies and dates may be scalars or arrays of the same length
+
+        Args:
+            currencies: Currency codes
+            dates: Valuation dates, anything pd.to_datetime understands
+            asof (bool): Use the last available rate on or before the date instead of an exact match
+            default (float): Rate for unknown currencies and dates without a rate
+
+        Returns:
+            np.ndarray: The exchange rates
+        """
+        currencies = np.atleast_1d(np.asarray(currencies, dtype=object))
+        dates = pd.DatetimeIndex(np.atleast_1d(pd.to_datetime(dates))).normalize()
+
+        columns = self.currencies.get_indexer(currencies)
+
+        if asof:
+            rows = self.dates.searchsorted(dates, side='right') - 1
+            matrix = self.filled
+        else:
+            rows = self.dates.get_indexer(dates)
+            matrix = self.matrix
+
+        rows, columns = np.broadcast_arrays(rows, columns)
+        found = (rows >= 0) & (columns >= 0)
+
+        rates = np.full(rows.shape, np.nan)
+        rates[found] = matrix[rows[found], columns[found]]
+
+        return np.where(np.isnan(rates), default, rates)
+
+    def convert(self, values, currencies, dates, to_ccy: str = BASE_CURRENCY, asof: bool = False) -> np.ndarray:
+        """Convert values from their currencies to to_ccy at the rates of their dates
+
+        Args:
+            values: Amounts in the currencies
+            currencies: Currency of each value, or one currency for all of them
+            dates: Valuation date of each value, or one date for all of them
+            to_ccy (str): Currency to convert to
+            asof (bool): Use the last available rates on or before the dates
+
+        Returns:
+            np.ndarray: Converted values, NaN where a rate is missing
+        """
+        values = np.asarray(values, dtype=float)
+        from_rates = self.rates(currencies, dates, asof)
+        to_rates = self.rates(to_ccy, dates, asof)
+
+        return values / from_rates * to_rates
+
+def _to_date(valuation_date):
+    if isinstance(valuation_date, (datetime, pd.Timestamp)):
+        return valuation_date.date()
+    elif isinstance(valuation_date, str):
+        return pd.Timestamp(valuation_date).date()
+
+    return valuation_date
+
+@derived(get_fx_data)
+def get_fx_store(df) -> FxStore:
+    """Get the FX store, it is read only and shared by every session"""
+    return FxStore(df)
 
-@st.cache_data(ttl=3600, show_spinner=False)
 def get_fx_list() -> list[str]:
     """Get a list of unique FX currencies"""
-    df = get_fx_data()
-    return sorted(df['FX'].unique())
+    return sorted(get_fx_store().currencies)
 
-@st.cache_data(ttl=3600, show_spinner=False)
 def get_fx_rates_for_date(valuation_date: datetime) -> dict[str, float]:
     """Get all FX rates for a specific date
-    
+
     Args:
         valuation_date (datetime): The date to get rates for
-        
+
     Returns:
         dict[str, float]: Dictionary mapping currency codes to their rates
     """
-    if isinstance(valuation_date, (datetime, pd.Timestamp)):
-        valuation_date = valuation_date.date()
-    
-    df = get_fx_data()
-    date_df = df[df['VALUATION_DATE'] == valuation_date]
-    return dict(zip(date_df['FX'], date_df['RATE']))
+    return get_fx_store().rates_for_date(valuation_date)
 
-#@st.cache_data(ttl=3600, show_spinner=False)
 def get_fx_rate(fx: str, valuation_date: datetime) -> float:
     """Get a specific FX rate for a date
-    
+
     Args:
         fx (str): The currency code
         valuation_date (datetime): The date to get the rate for
-        
+
     Returns:
         float: The exchange rate
     """
-    if isinstance(valuation_date, (datetime, pd.Timestamp)):
-        valuation_date = valuation_date.date()
-    
-    df = get_fx_data()
-    rate = df[(df['FX'] == fx) & (df['VALUATION_DATE'] == valuation_date)]['RATE']
-    return float(rate.iloc[0]) if not rate.empty else None
\ No newline at end of file
+    return get_fx_store().rate(fx, valuation_date)
@@ -1,3 +1,8 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+from db.swr_cache import stale_while_revalidate, reference_client, derived
+
 LBU_GROUP = 'LBU_GROUP'
 LBU_CODE = 'BLOOMBERG_NAME'
 LBU_GROUP_NAME = 'GROUP_NAME'
@@ -6,4 +11,67 @@ FUND_CODE = 'SHORT_NAME'
 FUND_TYPE = 'TYPE'
 SUB_LBU = 'SUB_LBU'
 IS_VFA = 'VFA'
-HK_CODE = 'HK_CODE'
\ No newline at end of file
+HK_CODE = 'HK_CODE'
+SAA_GROUP = 'SAA_GROUP'
+
+# Suffix of the HK entities, used when the same HK code is used by funds of several entities
+HK_ENTITY_CODES = {'Bermuda': 'HK', 'Hong Kong': 'ML', 'Macau': 'MC', 'Assurance': 'MH'}
+
+@stale_while_revalidate(copy=False)
+def get_fund_data():
+    """
+    Every fund with its LBU (NULLs when the LBU is unknown), the frame is shared so it must not be modified (use the
+    LBU hierarchy instead). The LT / N/A filter of the dashboard is applied by LbuHierarchy so the SAA groups still
+    cover every fund.
+    """
+    sql = "SELECT l.id, l.group_name, f.lbu, f.type, f.short_name, l.bloomberg_name, l.lbu_group, f.sub_lbu, f.vfa, f.hk_code, f.saa_group FROM supp.fund AS f LEFT JOIN supp.lbu AS l ON l.name = f.lbu ORDER BY group_name, lbu, sub_lbu, type, short_name;"
+    df = reference_client().query(sql)
+
+    return df
+
+class LbuHierarchy:
+    """
+    Indexed view of the fund / LBU hierarchy, built once from supp.fund and supp.lbu.
+
+    frame holds the funds shown in the dashboard, the rows of the original WHERE l.bloomberg_name <> 'LT' AND
+    f.type <> 'N/A' (NULLs fail both comparisons in SQL). The fund dictionaries map a fund code to its attribute and
+    can be passed straight to Series.map, the LBU dictionaries are keyed by LBU code.
+    """
+    def __init__(self, df: pd.DataFrame):
+        # Text nulls arrive as 'None'
+        shown = _not_null(df[LBU_CODE]) & (df[LBU_CODE] != 'LT') & _not_null(df[FUND_TYPE]) & (df[FUND_TYPE] != 'N/A')
+        self.frame = df[shown].drop(columns=[SAA_GROUP]).reset_index(drop=True)
+        frame = self.frame
+
+        self.funds: pd.Index = pd.Index(frame[FUND_CODE])
+        self.lbu_codes = dict(zip(frame[FUND_CODE], frame[LBU_CODE]))
+        self.lbu_groups = dict(zip(frame[FUND_CODE], frame[LBU_GROUP]))
+        self.sub_lbus = dict(zip(frame[FUND_CODE], frame[SUB_LBU]))
+        self.types = dict(zip(frame[FUND_CODE], frame[FUND_TYPE]))
+        self.vfa = dict(zip(frame[FUND_CODE], frame[IS_VFA]))
+
+        self.group_funds = frame.groupby(LBU_GROUP, sort=False)[FUND_CODE].agg(list).to_dict()
+        self.lbu_funds = frame.groupby(LBU_CODE, sort=False)[FUND_CODE].agg(list).to_dict()
+        self.lbu_group_names = dict(zip(frame[LBU_CODE], frame[LBU_GROUP_NAME]))
+        self.lbu_names = dict(zip(frame[LBU_CODE], frame[LBU_CODE_NAME]))
+
+        # The SAA group covers every fund with a known LBU, funds without one are their own group and HK funds are Shareholder
+        funds = df[df['ID'].notna()]
+        saa_group = np.where(_not_null(funds[SAA_GROUP]), funds[SAA_GROUP], np.where(funds[LBU_GROUP] == 'HK', 'Shareholder', funds[FUND_CODE]))
+        self.saa_groups = dict(zip(funds[FUND_CODE], saa_group))
+
+        hk = frame[(frame[SUB_LBU] != 'None') & (frame[HK_CODE] != 'None')]
+        self.missing_hk_codes: list[str] = frame.loc[(frame[SUB_LBU] != 'None') & (frame[HK_CODE] == 'None'), FUND_CODE].tolist()
+        self.hk_codes = dict(zip(hk[FUND_CODE], hk[HK_CODE]))
+        self.hk_code_funds = {f'{sub_lbu}:{hk_code}': fund for fund, sub_lbu, hk_code in zip(hk[FUND_CODE], hk[SUB_LBU], hk[HK_CODE])}
+
+        counts = Counter(self.hk_codes.values())
+        self.unique_hk_codes = {fund: f'{hk_code} ({HK_ENTITY_CODES.get(self.sub_lbus[fund], self.sub_lbus[fund])})' if counts[hk_code] > 1 else hk_code for fund, hk_code in self.hk_codes.items()}
+
+def _not_null(column: pd.Series) -> pd.Series:
+    return column.notna() & (column != 'None')
+
+@derived(get_fund_data)
+def get_lbu_hierarchy(df) -> LbuHierarchy:
+    """Get the LBU hierarchy, it is read only and shared by every session"""
+    return LbuHierarchy(df)
@@ -1,20 +1,22 @@
-import streamlit as st
-from streamlit import session_state as ss
+import numpy as np
+import pandas as pd
+from db.swr_cache import stale_while_revalidate, reference_client, derived
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_ratings_mapping(agencies):
-    sql = """
+# Rating agencies the collateral calculator maps, name to column prefix
+RATING_AGENCIES = {'S&P': 'SP', 'Moodys': 'MOODYS', 'Fitch': 'FITCH'}
+
+# Values that mean a security has no rating from an agency
+UNRATED = ['None', '']
+
+RATINGS_QUERIES = {
+    'LADDER': """
         SELECT 
             rating, 
             index 
         FROM 
             supp.ratings_ladder;
-    """
-    rating_ladder_df = ss.snowflake.query(sql)
-
-    rating_ladder = dict(zip(rating_ladder_df['RATING'], rating_ladder_df['INDEX']))
-    
-    sql = """
+    """,
+    'MAPPING': """
         SELECT 
             agency, 
             rating, 
@@ -22,24 +24,101 @@ def get_ratings_mapping(agencies):
         FROM 
             supp.ratings_mapping;
     """
-    rating_mapping_df = ss.snowflake.query(sql)
-    
-    agency_mappings = {}
-    
-    for agency in rating_mapping_df['AGENCY'].unique():
-        if agency not in agencies:
-            continue
-        
-        agency_df = rating_mapping_df[(rating_mapping_df['AGENCY'] == agency)].reset_index(drop=True)
-        
-        stop_index = agency_df[agency_df['EQUIVALENT_RATING'] == 'Default'].index[0] + 1
-        agency_mapping_df = agency_df.iloc[:stop_index]
-        agency_mapping = dict(zip(agency_mapping_df['RATING'], agency_mapping_df['EQUIVALENT_RATING'].map(rating_ladder)))
-        agency_mappings[agency] = agency_mapping
-    
-    return agency_mappings
+}
+
+class RatingScale:
+    """
+    The rating scale of every agency encoded as lookup arrays on the internal ladder, a higher index is a worse
+    rating. Each agency's scale stops at the rating equivalent to Default.
+    """
+    def __init__(self, ladder_df: pd.DataFrame, mapping_df: pd.DataFrame):
+        ladder = dict(zip(ladder_df['RATING'], ladder_df['INDEX']))
+        size = int(max(ladder.values())) + 1
+
+        self._ratings: dict[str, pd.Index] = {}
+        self._indexes: dict[str, np.ndarray] = {}
+        self._labels: dict[str, np.ndarray] = {}
+
+        for agency in mapping_df['AGENCY'].unique():
+            agency_df = mapping_df[(mapping_df['AGENCY'] == agency)].reset_index(drop=True)
+
+            stop_index = agency_df[agency_df['EQUIVALENT_RATING'] == 'Default'].index[0] + 1
+            agency_df = agency_df.iloc[:stop_index]
+            indexes = agency_df['EQUIVALENT_RATING'].map(ladder).to_numpy(dtype=float)
+
+            # Ladder index to the first rating of the agency's scale with that index
+            labels = np.full(size, None, dtype=object)
+            first = ~pd.Series(indexes).duplicated().to_numpy()
+            labels[indexes[first].astype(int)] = agency_df['RATING'].to_numpy()[first]
+
+            unique = ~agency_df['RATING'].duplicated(keep='last').to_numpy()
+            self._ratings[agency] = pd.Index(agency_df['RATING'][unique])
+            self._indexes[agency] = indexes[unique]
+            self._labels[agency] = labels
+
+    @property
+    def agencies(self) -> list[str]:
+        return list(self._ratings.keys())
+
+    def to_index(self, ratings, agency: str, unknown: float = np.nan) -> np.ndarray:
+        """
+        Ladder index of each rating on the agency's scale.
+
+        Parameters:
+            ratings (Iterable[str]): Ratings of one agency, e.g. a funnelweb rating column.
+            agency (str): Agency of the ratings.
+            unknown (float): Index for ratings that are not on the scale, unrated securities are always NaN.
+
+        Returns:
+            np.ndarray: Float array of ladder indexes.
+        """
+        ratings = np.asarray(ratings, dtype=object)
+        positions = self._ratings[agency].get_indexer(ratings)
+
+        indexes = np.where(positions >= 0, self._indexes[agency][positions], unknown)
+        indexes[pd.isna(ratings) | np.isin(ratings, UNRATED)] = np.nan
+
+        return indexes
+
+    def to_rating(self, indexes, agency: str) -> np.ndarray:
+        """Rating on the agency's scale for each ladder index, None where the scale has no such rating"""
+        indexes = np.asarray(indexes, dtype=float)
+        labels = self._labels[agency]
+        valid = ~np.isnan(indexes) & (indexes >= 0) & (indexes < len(labels))
+
+        ratings = np.full(indexes.shape, None, dtype=object)
+        ratings[valid] = labels[indexes[valid].astype(int)]
+
+        return ratings
+
+    def best_of(self, ratings: dict) -> np.ndarray:
+        """Best ladder index across agencies, ratings maps each agency to its ratings, NaN where none rates it"""
+        return np.fmin.reduce([self.to_index(values, agency) for agency, values in ratings.items()])
+
+    def worst_of(self, ratings: dict) -> np.ndarray:
+        """Worst ladder index across agencies, ratings maps each agency to its ratings, NaN where none rates it"""
+        return np.fmax.reduce([self.to_index(values, agency) for agency, values in ratings.items()])
+
+    def mapping(self, agency: str) -> dict:
+        """The agency's scale as a rating to ladder index dictionary"""
+        return dict(zip(self._ratings[agency], self._indexes[agency]))
+
+@stale_while_revalidate(copy=False)
+def get_ratings_tables() -> dict:
+    # The ladder and the mapping are independent so they are fetched in parallel
+    return reference_client().query_many(RATINGS_QUERIES)
+
+@derived(get_ratings_tables)
+def get_rating_scale(tables) -> RatingScale:
+    """Get the rating scale, it is read only and shared by every session"""
+    return RatingScale(tables['LADDER'], tables['MAPPING'])
+
+def get_ratings_mapping(agencies):
+    scale = get_rating_scale()
+
+    return {agency: scale.mapping(agency) for agency in scale.agencies if agency in agencies}
 
-@st.cache_data(ttl=3600, show_spinner=False)
+@stale_while_revalidate()
 def get_ratings_index():    
     sql = f"""
         SELECT 
@@ -48,6 +127,6 @@ def get_ratings_index():
         FROM 
             supp.ratings_ladder;
     """
-    df = ss.snowflake.query(sql)
+    df = reference_client().query(sql)
     
     return df
\ No newline at end of file
@@ -0,0 +1,84 @@
+import hashlib
+import os
+import time
+import uuid
+import pyarrow as pa
+import pyarrow.parquet as pq
+from .conversion import to_pandas
+
+# Schema metadata flag marking results that can never change
+_IMMUTABLE_KEY = b'dashboard.immutable'
+
+class DiskCache:
+    """
+    Durable cache of query results stored as Parquet files under a directory.
+
+    Entries written as immutable (results for closing dates that are fully loaded) never expire, everything else
+    is only served while younger than ttl seconds. Once the directory grows past max_bytes the least recently
+    written files are removed.
+    """
+    def __init__(self, directory: str, ttl: float = 3600, max_bytes: int = 2 * 1024 ** 3):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str, arrow_dtypes: bool = False):
+        path = self._path(key)
+
+        try:
+            age = time.time() - os.path.getmtime(path)
+            table = pq.read_table(path)
+        except (OSError, pa.ArrowException):
+            return None
+
+        metadata = table.schema.metadata or {}
+
+        if metadata.get(_IMMUTABLE_KEY) != b'1' and age > self.ttl:
+            return None
+
+        return to_pandas(table, arrow_dtypes)
+
+    def put(self, key: str, df, immutable: bool = False) -> None:
+        path = self._path(key)
+        # Sessions run on threads of one process, each write needs its own temporary file
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _IMMUTABLE_KEY: b'1' if immutable else b'0'})
+
+        try:
+            pq.write_table(table, temp_path)
+            # Readers never see a half written file
+            os.replace(temp_path, path)
+        except (OSError, pa.ArrowException):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        self._prune()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{hashlib.sha1(key.encode()).hexdigest()}.parquet')
+
+    def _prune(self) -> None:
+        files = []
+
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith('.parquet'):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
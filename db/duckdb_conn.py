@@ -0,0 +1,157 @@
+import os
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import duckdb
+import pyarrow as pa
+from .snowflake_conn import SnowflakeClient
+from .single_flight import SingleFlight
+from .telemetry import QueryTelemetry
+from . import synthetic
+
+# Snowflake functions used by the pages that DuckDB does not have
+_MACROS = [
+    'CREATE OR REPLACE MACRO iff(condition, a, b) AS CASE WHEN condition THEN a ELSE b END;',
+]
+
+# Schemas searched for unqualified table names, funnelweb lives in funnel
+_SEARCH_PATH = 'funnel,supp,main'
+
+_FLOAT_TYPES = ('TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'UTINYINT', 'USMALLINT', 'UINTEGER', 'UBIGINT', 'FLOAT', 'DOUBLE', 'DECIMAL')
+
+class DuckDBClient(SnowflakeClient):
+    """
+    Stand-in for SnowflakeClient backed by an in-process DuckDB database filled with synthetic data.
+
+    It keeps the same query / query_many / query_arrow / query_batches / execute interface, and runs the same
+    conversion, single-flight and telemetry code, so pages and benchmarks run unchanged without a Snowflake account.
+
+    Config keys (all optional):
+        database: DuckDB file, ':memory:' by default. An existing file is reused as is.
+        positions: Positions per closing date, 10000 by default.
+        dates: Number of month end closing dates, 12 by default.
+        seed: Random seed of the generator, 42 by default.
+        end_date: Last closing date, the last month end by default.
+        admin_email: Email of the seeded admin user.
+        batch_size: Rows per batch returned by query_batches, 100000 by default.
+    """
+    def __init__(self, config: dict):
+        self.config = config
+        self.batch_size = int(config.get("batch_size", 100_000))
+
+        database = config.get("database", ":memory:")
+        exists = database != ":memory:" and os.path.exists(database)
+
+        self.db = duckdb.connect(database)
+
+        for macro in _MACROS:
+            self.db.execute(macro)
+
+        if not exists:
+            synthetic.generate(
+                self.db,
+                positions=int(config.get("positions", 10_000)),
+                dates=int(config.get("dates", 12)),
+                seed=int(config.get("seed", 42)),
+                end_date=config.get("end_date"),
+                admin_email=config.get("admin_email", "admin@example.com")
+            )
+
+        self.pool = _DuckDBPool(self)
+        self.single_flight = SingleFlight()
+        self.telemetry = QueryTelemetry(
+            config.get("telemetry_path", "logs/queries.jsonl"),
+            max_records=int(config.get("telemetry_records", 1000))
+        )
+
+    def _connect(self):
+        return _DuckDBConnection(self.db, self.batch_size)
+
+    def _execute(self, conn, cur, sql: str, cancelled=None, record=None):
+        # Local queries are not billed and finish quickly, they always run synchronously
+        cur.execute(sql)
+
+    def _get_schema(self, cur):
+        columns = {}
+
+        for name, dtype, *_ in cur.description:
+            dtype = str(dtype)
+
+            if dtype.startswith(_FLOAT_TYPES):
+                columns[name] = float
+            elif dtype == 'VARCHAR':
+                columns[name] = str
+            elif dtype in ['DATE', 'TIMESTAMP', 'TIMESTAMP_NS', 'TIMESTAMP_MS', 'TIMESTAMP_S']:
+                columns[name] = datetime
+            elif dtype == 'TIMESTAMP WITH TIME ZONE':
+                columns[name] = ZoneInfo
+            elif dtype == 'BOOLEAN':
+                columns[name] = bool
+            else:
+                print(f"Unknown datatype for column '{name}'")
+
+        return columns
+
+class _DuckDBPool:
+    """Minimal pool interface over one database, every checkout gets its own cursor so threads do not share state"""
+    def __init__(self, client: DuckDBClient):
+        self._client = client
+        self.max_size = int(client.config.get("pool_size", 8))
+
+    @contextmanager
+    def connection(self):
+        yield self._client._connect()
+
+    def run(self, func, retry: bool = True):
+        return func(self._client._connect())
+
+    def close(self) -> None:
+        pass
+
+class _DuckDBConnection:
+    def __init__(self, db, batch_size: int):
+        self._db = db
+        self._batch_size = batch_size
+
+    def cursor(self):
+        return _DuckDBCursor(self._db.cursor(), self._batch_size)
+
+class _DuckDBCursor:
+    """Snowflake cursor API subset used by SnowflakeClient, result column names are upper cased like Snowflake does"""
+    def __init__(self, cur, batch_size: int):
+        self._cur = cur
+        self._batch_size = batch_size
+
+        self.description = None
+        self.rowcount = None
+        self.sfqid = None
+
+        cur.execute(f"SET search_path = '{_SEARCH_PATH}';")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._cur.close()
+
+    def execute(self, sql: str, *args, **kwargs):
+        self._cur.execute(sql)
+
+        self.sfqid = str(uuid.uuid4())
+        self.description = [(name.upper(), *rest) for name, *rest in self._cur.description or []]
+        self.rowcount = None
+
+        return self
+
+    def fetch_arrow_all(self, force_return_table: bool = False):
+        return self._rename(self._cur.to_arrow_table())
+
+    def fetch_arrow_batches(self):
+        reader = self._cur.to_arrow_reader(self._batch_size)
+
+        for batch in reader:
+            yield self._rename(pa.Table.from_batches([batch]))
+
+    def _rename(self, table: pa.Table) -> pa.Table:
+        return table.rename_columns([name.upper() for name in table.column_names])
@@ -0,0 +1,100 @@
+from collections import OrderedDict
+import threading
+import time
+import pandas as pd
+from .sql import read_tables
+
+# Last write to each table by any session or background writer of the process, see mark_written
+_written_at: dict[str, float] = {}
+_written_lock = threading.Lock()
+
+def mark_written(tables) -> None:
+    """Record a write to tables (unqualified, lower case names), results read before it become misses in every session"""
+    now = time.time()
+
+    with _written_lock:
+        for table in tables:
+            _written_at[table] = now
+
+def _written_since(tables: set[str], loaded_at: float) -> bool:
+    return any(_written_at.get(table, 0) >= loaded_at for table in tables)
+
+class ResultCache:
+    """
+    Least recently used cache of query results with a memory budget.
+
+    The size of each frame is measured with DataFrame.memory_usage(deep=True) and the oldest results are dropped
+    once the total goes over max_bytes. Results older than max_age seconds, or read from a table written since
+    (mark_written), are treated as missing, so edits made elsewhere are picked up at least as often as by the hourly
+    st.cache_data loaders. Frames are copied on the way out so callers can modify them freely.
+    """
+    def __init__(self, max_bytes: int, max_age: float = 3600):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+        # Key -> (frame, size, loaded_at, tables read)
+        self._entries: OrderedDict[str, tuple[pd.DataFrame, int, float, set[str]]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+
+        if entry is not None and (time.time() - entry[2] > self.max_age or _written_since(entry[3], entry[2])):
+            self.pop(key)
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+
+        return entry[0].copy()
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        self.pop(key)
+
+        size = int(df.memory_usage(index=True, deep=True).sum())
+
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (df, size, time.time(), read_tables(key))
+        self.bytes += size
+
+        while self.bytes > self.max_bytes:
+            _, (_, evicted_size, _, _) = self._entries.popitem(last=False)
+            self.bytes -= evicted_size
+
+    def pop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+
+        if entry is not None:
+            self.bytes -= entry[1]
+
+    def invalidate(self, table: str) -> None:
+        """Drop every entry reading from table, an unqualified lower case name as returned by db.sql.written_tables"""
+        for key in [key for key, entry in self._entries.items() if table in entry[3]]:
+            self.pop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,85 @@
+import threading
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one.
+
+    The first caller for a key runs the function, callers arriving while it is still running block and receive
+    the same result (or exception) instead of running it again.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call] = {}
+
+    def do(self, key: str, func, check=None, interval: float = 0.5):
+        """
+        Parameters:
+            check (callable): Called every interval seconds while waiting on another caller, it may raise to stop
+                waiting, the running call is not affected.
+
+        Returns:
+            tuple: The result and whether it was shared with other callers, shared results must not be mutated.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.waiters += 1
+
+        if not leader:
+            while not call.done.wait(None if check is None else interval):
+                try:
+                    check()
+                except BaseException:
+                    with self._lock:
+                        call.waiters -= 1
+                    raise
+
+            if call.error is not None:
+                raise call.error
+
+            return call.result, True
+
+        try:
+            call.result = func()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                # An abandoned call was already removed, the key may belong to a new call by now
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+
+            call.done.set()
+
+        # No one can join once the call is removed so the count is final
+        return call.result, call.waiters > 0
+
+    def abandon(self, key: str) -> bool:
+        """
+        Called by the running caller for key before it gives up on the call. With no one waiting the call is removed
+        at once, so callers arriving later start a call of their own instead of receiving the abandoned one's error.
+
+        Returns:
+            bool: Whether the call was abandoned, False while other callers are waiting on it.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+
+            if call is None or call.waiters > 0:
+                return False
+
+            del self._calls[key]
+
+            return True
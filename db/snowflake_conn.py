@@ -1,22 +1,53 @@
+import time
 import snowflake.connector
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from zoneinfo import ZoneInfo
-import pandas as pd
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
+from .connection_pool import SnowflakeConnectionPool, QueryCancelledError
+from .conversion import convert_table, encode_categories, sort_table, to_pandas
+from .single_flight import SingleFlight
+from .sql import fingerprint
+from .telemetry import QueryTelemetry, QueryRecord
+
+# Seconds between status checks of a cancellable query, the last value is repeated
+POLL_INTERVALS = [0.05, 0.1, 0.2, 0.5, 1.0]
 
 class SnowflakeClient:
     def __init__(self, config: dict):
         
         private_key_str = config["private_key"]
     
-        private_key = serialization.load_pem_private_key(
+        # Parse the key once, every pooled connection reuses it
+        self.private_key = serialization.load_pem_private_key(
             private_key_str.encode(),
             password=None,
             backend=default_backend()
         )
         
-        self.conn = snowflake.connector.connect(
+        self.config = config
+        self.pool = SnowflakeConnectionPool(
+            self._connect,
+            max_size=int(config.get("pool_size", 8)),
+            idle_timeout=float(config.get("pool_idle_timeout", 1800)),
+            health_check_interval=float(config.get("pool_health_check_interval", 300))
+        )
+        self.single_flight = SingleFlight()
+        self.telemetry = QueryTelemetry(
+            config.get("telemetry_path", "logs/queries.jsonl"),
+            max_records=int(config.get("telemetry_records", 1000))
+        )
+    
+    def _connect(self):
+        config = self.config
+        session_parameters = {}
+        
+        # Enforced by the warehouse, runaway queries are cancelled even if nobody is waiting on them
+        if config.get("statement_timeout"):
+            session_parameters["STATEMENT_TIMEOUT_IN_SECONDS"] = int(config["statement_timeout"])
+        
+        return snowflake.connector.connect(
             user=config.get("user"),
             account=config.get("account"),
             host=config.get("host"),
@@ -25,21 +56,202 @@ class SnowflakeClient:
             database=config.get("database"),
             schema=config.get("schema"),
             authenticator=config.get("authenticator"),
-            private_key=private_key
+            private_key=self.private_key,
+            session_parameters=session_parameters
         )
     
-    def query(self, sql: str, sort_columns: list = []):
-        with self.conn.cursor() as cur:
-            cur.execute(sql)
+    def query(self, sql: str, sort_columns: list = [], arrow_dtypes: bool = False, page: str = None, categorical: bool = False, cancelled=None):
+        """
+        Run a query and return it as a DataFrame.
+        
+        cancelled is an optional callable polled while the query runs, once it returns True the query is cancelled on
+        the warehouse and QueryCancelledError is raised.
+        """
+        record = QueryRecord('query', sql, page)
+        
+        try:
+            table, shared = self._fetch(sql, sort_columns, record, cancelled)
             
-            df = cur.fetch_pandas_all()
-
-            if sort_columns != []:
-                self._convert_columns(df, cur).sort_values(by=sort_columns)
-            else:
-                self._convert_columns(df, cur)
+            # A table shared with other callers must keep its buffers
+            with record.phase('convert'):
+                if categorical:
+                    table = encode_categories(table)
                 
-            return df
+                df = to_pandas(table, arrow_dtypes, self_destruct=not shared)
+            
+            record['pandas_bytes'] = int(df.memory_usage(index=True).sum())
+        except Exception as e:
+            self.telemetry.record(record.finish(e))
+            raise
+        
+        self.telemetry.record(record.finish())
+        
+        return df
+    
+    def query_many(self, queries: dict, arrow_dtypes: bool = False, page: str = None, cancelled=None):
+        """
+        Run independent queries concurrently, each on its own pooled connection.
+        
+        Parameters:
+            queries (dict): Name to SQL statement.
+        
+        Returns:
+            dict: Name to DataFrame, in the same order as queries. The first error raised by any query is re-raised.
+        """
+        if not queries:
+            return {}
+        
+        workers = min(len(queries), self.pool.max_size)
+        
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='snowflake-query') as executor:
+            futures = {name: executor.submit(self.query, sql, [], arrow_dtypes, page, False, cancelled) for name, sql in queries.items()}
+            
+            return {name: future.result() for name, future in futures.items()}
+    
+    def query_arrow(self, sql: str, sort_columns: list = [], page: str = None, cancelled=None):
+        record = QueryRecord('query_arrow', sql, page)
+        
+        try:
+            table = self._fetch(sql, sort_columns, record, cancelled)[0]
+        except Exception as e:
+            self.telemetry.record(record.finish(e))
+            raise
+        
+        self.telemetry.record(record.finish())
+        
+        return table
+    
+    def _fetch(self, sql: str, sort_columns: list, record: QueryRecord, cancelled=None):
+        """
+        Run a query and return (table, shared). Identical queries already running, from any session, are
+        waited on instead of being sent to the warehouse again, shared is True when the table went to several callers.
+        """
+        key = f'{fingerprint(sql)}|{",".join(sort_columns)}'
+        
+        def check():
+            if cancelled():
+                raise QueryCancelledError('Query cancelled while waiting on an identical query')
+        
+        # The query keeps running as long as another caller is waiting on it, once abandoned no one can join it
+        def abandoned():
+            return cancelled() and self.single_flight.abandon(key)
+        
+        def run(conn):
+            with conn.cursor() as cur:
+                with record.phase('execute'):
+                    self._execute(conn, cur, sql, None if cancelled is None else abandoned, record)
+                
+                record['query_id'] = cur.sfqid
+                
+                with record.phase('fetch'):
+                    table = cur.fetch_arrow_all(force_return_table=True)
+                
+                with record.phase('convert'):
+                    table = convert_table(table, self._get_schema(cur))
+                    return sort_table(table, sort_columns)
+        
+        with record.phase('wait'):
+            table, shared = self.single_flight.do(key, lambda: self.pool.run(run), None if cancelled is None else check)
+        
+        # Waiters did not run the query, their wait covers the leader's execute and fetch
+        record['wait_ms'] = round(record['wait_ms'] - sum(record.get(f'{phase}_ms', 0) for phase in ['execute', 'fetch', 'convert']), 1)
+        record['cache'] = 'miss'
+        record['shared'] = shared
+        record['rows'] = table.num_rows
+        record['arrow_bytes'] = table.nbytes
+        
+        return table, shared
+    
+    def query_batches(self, sql: str, on_progress=None, page: str = None, categorical: bool = False, cancelled=None):
+        """
+        Yield the result of a query as converted DataFrames, one per Arrow batch, so that the
+        peak memory is bounded by the batch size instead of the result size.
+        
+        on_progress(rows_fetched, total_rows) is called after every batch. With categorical the low cardinality
+        columns of each batch are dictionary encoded, every batch has its own categories.
+        """
+        record = QueryRecord('query_batches', sql, page)
+        error = None
+        
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    with record.phase('execute'):
+                        self._execute(conn, cur, sql, cancelled, record)
+                    
+                    record['query_id'] = cur.sfqid
+                    
+                    columns = self._get_schema(cur)
+                    total_rows = cur.rowcount or 0
+                    rows = 0
+                    batches = 0
+                    arrow_bytes = 0
+                    
+                    batch_iter = cur.fetch_arrow_batches()
+                    
+                    while True:
+                        with record.phase('fetch'):
+                            batch = next(batch_iter, None)
+                        
+                        if batch is None:
+                            break
+                        
+                        if cancelled is not None and cancelled():
+                            raise QueryCancelledError(f'Query {cur.sfqid} cancelled after {rows} rows')
+                        
+                        with record.phase('convert'):
+                            table = convert_table(batch, columns)
+                            rows += table.num_rows
+                            arrow_bytes += table.nbytes
+                            batches += 1
+                            df = to_pandas(encode_categories(table) if categorical else table)
+                        
+                        if on_progress is not None:
+                            on_progress(rows, total_rows)
+                        
+                        yield df
+                    
+                    # Empty results have no batches, yield an empty frame so consumers still get the columns
+                    if batches == 0:
+                        yield to_pandas(convert_table(cur.fetch_arrow_all(force_return_table=True), columns))
+                    
+                    record.update(cache='miss', rows=rows, arrow_bytes=arrow_bytes, batches=batches)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.telemetry.record(record.finish(error))
+    
+    def _execute(self, conn, cur, sql: str, cancelled=None, record: QueryRecord = None):
+        """
+        Execute sql on cur. Without cancelled this is a plain blocking execute, otherwise the query is submitted
+        asynchronously and its status polled so it can be cancelled on the warehouse while it runs.
+        """
+        if cancelled is None:
+            cur.execute(sql)
+            return
+        
+        cur.execute_async(sql)
+        query_id = cur.sfqid
+        
+        if record is not None:
+            record['query_id'] = query_id
+        
+        attempt = 0
+        
+        while conn.is_still_running(conn.get_query_status_throw_if_error(query_id)):
+            if cancelled():
+                try:
+                    cur.execute(f"SELECT SYSTEM$CANCEL_QUERY('{query_id}');")
+                except Exception as e:
+                    print(f"Failed to cancel query {query_id}: {e}")
+                
+                raise QueryCancelledError(f'Query {query_id} cancelled')
+            
+            time.sleep(POLL_INTERVALS[min(attempt, len(POLL_INTERVALS) - 1)])
+            attempt += 1
+        
+        cur.query_result(query_id)
     
     def _get_schema(self, cur):
         schema = cur.description
@@ -62,19 +274,22 @@ class SnowflakeClient:
 
         return columns
 
-    def _convert_columns(self, df, cur):
-        columns = self._get_schema(cur)
-        
-        for key, dtype in columns.items():
-            if dtype == datetime:
-                df[key] = pd.to_datetime(df[key])
-            elif dtype == ZoneInfo:
-                df[key] = pd.to_datetime(df[key]).dt.tz_convert('Asia/Hong_Kong').dt.tz_localize(None)
-            else:
-                df[key] = df[key].astype(dtype)
-        return df
-
+    def execute(self, sql: str, page: str = None):
+        record = QueryRecord('execute', sql, page)
+        
+        def run(conn):
+            with conn.cursor() as cur:
+                with record.phase('execute'):
+                    cur.execute(sql)
+                
+                record['query_id'] = cur.sfqid
+                record['rows'] = cur.rowcount
+        
+        try:
+            # DML is not retried, it may already have been applied when the error came back
+            self.pool.run(run, retry=False)
+        except Exception as e:
+            self.telemetry.record(record.finish(e))
+            raise
         
-    def execute(self, sql: str):
-        with self.conn.cursor() as cur:
-            cur.execute(sql)
\ No newline at end of file
+        self.telemetry.record(record.finish())
\ No newline at end of file
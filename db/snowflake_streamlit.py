@@ -1,27 +1,230 @@
 import streamlit as st
 from streamlit import session_state as ss
+from streamlit.runtime.scriptrunner_utils.script_run_context import get_script_run_ctx
+from streamlit.runtime.scriptrunner_utils.script_requests import ScriptRequestType
+from contextlib import contextmanager
 from .snowflake_conn import SnowflakeClient
+from .connection_pool import QueryCancelledError
+from .result_cache import ResultCache, mark_written
+from .disk_cache import DiskCache
+from .activity_writer import ActivityWriter
+from .sql import normalize_sql, written_tables, read_tables, iso_dates
+from .data.data_shipment import get_funnelweb_dates
 import pandas as pd
 
+# Tables whose rows for a closing date never change once the next date is loaded, the reference tables are editable
+IMMUTABLE_TABLES = {'funnelweb'}
+
+@st.cache_resource(show_spinner=False)
+def get_snowflake_client() -> SnowflakeClient:
+    """
+    Process wide Snowflake client, its connection pool is shared by every session.
+
+    Set backend = "duckdb" at the top of secrets.toml to run against a local DuckDB database with synthetic data
+    instead, configured by the [duckdb] section.
+    """
+    if _backend() == "duckdb":
+        # Imported here so deployments on Snowflake do not need duckdb installed
+        from .duckdb_conn import DuckDBClient
+
+        return DuckDBClient({"admin_email": st.secrets["admin"]["email"], **_config()})
+
+    return SnowflakeClient(_config())
+
+@st.cache_resource(show_spinner=False)
+def get_disk_cache() -> DiskCache:
+    """Process wide Parquet cache for results of fully loaded closing dates, it survives restarts"""
+    config = _config()
+
+    return DiskCache(
+        config.get("disk_cache_dir", ".cache/results"),
+        ttl=float(config.get("disk_cache_ttl", 3600)),
+        max_bytes=int(float(config.get("disk_cache_mb", 2048)) * 1024 * 1024)
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_activity_writer() -> ActivityWriter:
+    """Process wide writer of the page activity log, events from every session are inserted together in the background"""
+    config = _config()
+    client = get_snowflake_client()
+
+    return ActivityWriter(
+        client.execute,
+        flush_interval=float(config.get("activity_flush_interval", 5)),
+        batch_size=int(config.get("activity_batch_size", 200)),
+        # The raw client skips SnowflakeStreamlit.execute, so cached reads of the activity log are invalidated here
+        on_write=lambda sql: mark_written(written_tables(sql))
+    )
+
 class SnowflakeStreamlit:
     def __init__(self):
-        config = st.secrets["snowflake"]
-        snowflake_client = SnowflakeClient(config)
-        st.toast('Connected to Snowflake')
-        self.client = snowflake_client
+        self.client = get_snowflake_client()
+
+        cache_mb = float(_config().get("session_cache_mb", 256))
+        # Never older than the hourly st.cache_data page loaders, which fall through to this cache when they expire
+        self.cache = ResultCache(int(cache_mb * 1024 * 1024), max_age=float(_config().get("session_cache_ttl", 3600)))
+        self.cancel_on_rerun = bool(_config().get("cancel_on_rerun", True))
+
+    def query(self, sql: str, sort_columns: list = [], refresh: bool = False, arrow_dtypes: bool = False, closing_dates: list = None, categorical: bool = False):
+        """
+        Run a query through the session cache.
+
+        Pass the funnelweb closing_dates the query touches to also keep the result in the disk cache, see persist.
+        With categorical the low cardinality columns in db.conversion.CATEGORICAL_COLUMNS come back as categoricals.
+        """
+        key = _cache_key(sql, sort_columns, arrow_dtypes, categorical)
+
+        if not refresh:
+            df = self.cache.get(key)
+
+            if df is not None:
+                self.client.telemetry.cache_hit('session', sql, _page())
+                return df
+
+        def load():
+            with st.spinner('Fetching your requested data...'), _stop_if_cancelled():
+                return self.client.query(sql, sort_columns, arrow_dtypes, _page(), categorical, self._cancelled())
+
+        if closing_dates is None:
+            df = load()
+        else:
+            df = self.persist(key, closing_dates, load, refresh, arrow_dtypes)
+
+        self.cache.put(key, df)
+
+        return df.copy()
+
+    def persist(self, key: str, closing_dates: list, load, refresh: bool = False, arrow_dtypes: bool = False) -> pd.DataFrame:
+        """
+        Return load() through the disk cache, keyed on key (normally the SQL) and the closing dates it touches.
+
+        Results that only read funnelweb (IMMUTABLE_TABLES) for dates older than the latest funnelweb load never
+        change and are kept forever, anything touching the latest date or an editable reference table expires like
+        the other caches. When load transforms the rows in Python, put a version of the transform in key.
+        """
+        dates = iso_dates(closing_dates)
+        disk_key = f'{normalize_sql(key)}|{",".join(dates)}|{arrow_dtypes}'
+        disk_cache = get_disk_cache()
+
+        if not refresh:
+            df = disk_cache.get(disk_key, arrow_dtypes)
+
+            if df is not None:
+                self.client.telemetry.cache_hit('disk', key, _page())
+                return df
+
+        df = load()
+
+        latest_date = iso_dates([max(get_funnelweb_dates())])[0]
+        immutable = bool(dates) and dates[-1] < latest_date and read_tables(key) <= IMMUTABLE_TABLES
+        disk_cache.put(disk_key, df, immutable=immutable)
+
+        return df
+
+    def query_many(self, queries: dict, refresh: bool = False, arrow_dtypes: bool = False):
+        """
+        Run several independent queries in parallel and return a dict of DataFrames keyed like queries.
         
-        self.sql = ''
-        self.df = pd.DataFrame()
-    
-    def query(self, sql: str, sort_columns: list = [], refresh: bool = False):
-        if sql == self.sql and not self.df.empty and not refresh:
-            return self.df
+        Results already in the session cache are reused, the rest are fetched concurrently so the wait is
+        roughly the slowest query rather than the sum of all of them.
+        """
+        keys = {name: _cache_key(sql, [], arrow_dtypes) for name, sql in queries.items()}
+        results = {}
         
-        with st.spinner('Fetching your requested data...'):
-            df = self.client.query(sql, sort_columns)
+        if not refresh:
+            for name, key in keys.items():
+                df = self.cache.get(key)
+                
+                if df is not None:
+                    self.client.telemetry.cache_hit('session', queries[name], _page())
+                    results[name] = df
         
-        return df
+        missing = {name: sql for name, sql in queries.items() if name not in results}
+        
+        if missing:
+            with st.spinner('Fetching your requested data...'), _stop_if_cancelled():
+                fetched = self.client.query_many(missing, arrow_dtypes, _page(), self._cancelled())
+            
+            for name, df in fetched.items():
+                self.cache.put(keys[name], df)
+                results[name] = df.copy()
+        
+        return {name: results[name] for name in queries}
     
+    def query_arrow(self, sql: str, sort_columns: list = []):
+        with st.spinner('Fetching your requested data...'), _stop_if_cancelled():
+            table = self.client.query_arrow(sql, sort_columns, _page(), self._cancelled())
+
+        return table
+
+    def query_batches(self, sql: str, on_progress=None, categorical: bool = False):
+        with _stop_if_cancelled():
+            yield from self.client.query_batches(sql, on_progress, _page(), categorical, self._cancelled())
+
+    def _cancelled(self):
+        """
+        Callable telling whether the script run issuing a query has been superseded, by a rerun after a widget
+        change or by the session stopping, so the client cancels the query instead of computing a discarded result.
+        """
+        ctx = get_script_run_ctx()
+        requests = getattr(ctx, 'script_requests', None)
+
+        if not self.cancel_on_rerun or requests is None:
+            return None
+
+        # ScriptRequests has no public accessor, the state is read the same way the script runner does at yield points.
+        # These private attributes are those of the pinned streamlit==1.49.1, if an upgrade renames them queries are
+        # simply never treated as superseded
+        def superseded():
+            try:
+                state = requests._state
+
+                if state == ScriptRequestType.RERUN:
+                    # Fragment reruns are queued behind the current run rather than replacing it
+                    rerun_data = requests._rerun_data
+                    return not rerun_data.fragment_id_queue or rerun_data.is_fragment_scoped_rerun
+            except AttributeError:
+                return False
+
+            return state == ScriptRequestType.STOP
+
+        return superseded
+
     def execute(self, sql: str):
         with st.spinner('Executing SQL command...'):
-            self.client.execute(sql)
\ No newline at end of file
+            self.client.execute(sql, _page())
+
+        # Drop cached results reading from the tables written to, or everything if the statement is not plain DML
+        tables = written_tables(sql)
+
+        if not tables:
+            self.cache.clear()
+
+        for table in tables:
+            self.cache.invalidate(table)
+
+        # Other sessions drop their copies on their next read
+        mark_written(tables)
+
+def _cache_key(sql: str, sort_columns: list, arrow_dtypes: bool, categorical: bool = False) -> str:
+    return f'{normalize_sql(sql)}|{",".join(sort_columns)}|{arrow_dtypes}' + ('|categorical' if categorical else '')
+
+
+@contextmanager
+def _stop_if_cancelled():
+    # A rerun or stop is already pending, end this run quietly instead of showing the error
+    try:
+        yield
+    except QueryCancelledError:
+        st.stop()
+
+def _backend() -> str:
+    return st.secrets.get("backend", "snowflake")
+
+def _config() -> dict:
+    """Secrets section of the selected backend, cache settings are read from it too"""
+    return dict(st.secrets.get(_backend(), {}))
+
+def _page():
+    # Page that issued the query, set by interface.menu.log_activity
+    return ss.get('page_name')
@@ -0,0 +1,145 @@
+import hashlib
+import numbers
+import re
+import numpy as np
+import pandas as pd
+
+# Target table of a DML statement, used to invalidate cached results that read from it
+_WRITE_TARGET = re.compile(r'\b(?:INSERT\s+(?:OVERWRITE\s+)?INTO|UPDATE|DELETE\s+FROM|MERGE\s+INTO|TRUNCATE\s+(?:TABLE\s+)?)\s*([\w.$"]+)', re.IGNORECASE)
+
+# Tables read by a query, the FROM list (comma separated, with optional aliases) and every JOIN
+_READ_SOURCE = re.compile(r'\b(?:FROM|JOIN)\s+([\w.$"]+(?:\s+(?:AS\s+)?\w+)?(?:\s*,\s*[\w.$"]+(?:\s+(?:AS\s+)?\w+)?)*)', re.IGNORECASE)
+
+# Names of the common table expressions defined by a WITH clause, they are not tables
+_CTE_NAME = re.compile(r'(?:\bWITH|,)\s*(\w+)\s+AS\s*\(', re.IGNORECASE)
+
+# :name placeholders substituted by bind, :: casts are left alone
+_PARAMETER = re.compile(r'(?<![:\w]):([A-Za-z_]\w*)')
+
+# Quoted string literals, '' is an escaped quote
+_LITERAL = re.compile(r"('(?:[^']|'')*')")
+
+def normalize_sql(sql: str) -> str:
+    """
+    Canonical form of a SQL statement used as a cache key.
+
+    Whitespace outside of string literals is collapsed to single spaces and trailing semicolons are removed, so
+    the same statement built with different indentation maps to the same key. Literals are left untouched.
+    """
+    parts = []
+    in_literal = False
+    pending_space = False
+
+    for char in sql.strip():
+        if in_literal:
+            parts.append(char)
+
+            if char == "'":
+                in_literal = False
+            continue
+
+        if char.isspace():
+            pending_space = True
+            continue
+
+        if pending_space and parts:
+            parts.append(' ')
+        pending_space = False
+
+        parts.append(char)
+
+        if char == "'":
+            in_literal = True
+
+    return ''.join(parts).rstrip('; ')
+
+def fingerprint(sql: str) -> str:
+    """Stable hash of the normalised statement"""
+    return hashlib.sha1(normalize_sql(sql).encode()).hexdigest()
+
+def written_tables(sql: str) -> set[str]:
+    """Unqualified, lower case names of the tables a DML statement writes to (empty for anything else)"""
+    return {_table_name(match) for match in _WRITE_TARGET.findall(sql)}
+
+def read_tables(sql: str) -> set[str]:
+    """Unqualified, lower case names of the tables a query reads from, common table expressions are left out"""
+    ctes = {name.lower() for name in _CTE_NAME.findall(sql)}
+    identifiers = {source.split()[0].lower() for match in _READ_SOURCE.findall(sql) for source in match.split(',')}
+
+    # Only unqualified names can refer to a CTE, supp.fx_rates is read even inside a CTE named fx_rates
+    return {_table_name(identifier) for identifier in identifiers if '.' in identifier or identifier.strip('"') not in ctes}
+
+def _table_name(identifier: str) -> str:
+    return identifier.split('.')[-1].strip('"').lower()
+
+def iso_dates(dates) -> list[str]:
+    """Sorted, de-duplicated ISO strings for dates given as date, datetime, numpy datetime64 or string"""
+    return sorted({pd.Timestamp(date).strftime('%Y-%m-%d') for date in dates})
+
+def literal(value) -> str:
+    """SQL literal for a python value, dates and timestamps are written as ISO strings and NaN / NaT as NULL"""
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return 'NULL'
+
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+
+    if isinstance(value, numbers.Integral):
+        return str(int(value))
+
+    if isinstance(value, numbers.Real):
+        if not np.isfinite(value):
+            raise ValueError(f'{value} has no SQL literal')
+
+        return repr(float(value))
+
+    if hasattr(value, 'strftime') or isinstance(value, np.datetime64):
+        timestamp = pd.Timestamp(value)
+        value = timestamp.strftime('%Y-%m-%d' if timestamp == timestamp.normalize() else '%Y-%m-%d %H:%M:%S')
+
+    return "'" + str(value).replace("'", "''") + "'"
+
+def in_list(values) -> str:
+    """
+    Body of an IN (...) list. Values are sorted and de-duplicated so every selection order gives the same statement,
+    an empty selection becomes NULL which matches nothing.
+    """
+    literals = sorted({literal(value) for value in values})
+
+    return ', '.join(literals) if literals else 'NULL'
+
+def canonical(values) -> tuple:
+    """Sorted, de-duplicated tuple of values, used as a st.cache_data argument so selection order does not matter"""
+    return tuple(sorted(set(values), key=literal))
+
+def bind(sql: str, **params) -> str:
+    """
+    Substitute :name placeholders with SQL literals and return the normalised statement.
+
+    Lists, tuples and sets are expanded with in_list, so write them as IN (:name). Placeholders inside string
+    literals and :: casts are left untouched. The result is the same text for the same logical query, which keeps
+    both our caches and the Snowflake result cache hitting.
+
+    Example:
+        bind("SELECT * FROM funnelweb WHERE closing_date = :date AND fund_code IN (:funds)", date=date, funds=funds)
+    """
+    def substitute(match):
+        name = match.group(1)
+
+        if name not in params:
+            raise KeyError(f"No value bound for SQL parameter ':{name}'")
+
+        value = params[name]
+
+        if isinstance(value, (list, tuple, set, frozenset, pd.Index, pd.Series, np.ndarray)):
+            return in_list(value)
+
+        return literal(value)
+
+    parts = _LITERAL.split(sql)
+
+    # Even parts are outside of string literals
+    for index in range(0, len(parts), 2):
+        parts[index] = _PARAMETER.sub(substitute, parts[index])
+
+    return normalize_sql(''.join(parts))
@@ -0,0 +1,74 @@
+import pandas as pd
+from .conversion import union_categories
+
+# Partial aggregates are combined once this many have been collected
+COMBINE_EVERY = 16
+
+# How partial results are combined for each supported aggregation
+_COMBINE = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+def aggregate_batches(batches, by: list[str], values: list[str], agg: str = 'sum') -> pd.DataFrame:
+    """
+    Running group-by over a stream of DataFrames.
+
+    Each batch is reduced to one row per group as soon as it arrives, so only the partial aggregates are kept in
+    memory rather than the full result.
+
+    Parameters:
+        batches (Iterable[pd.DataFrame]): Stream of frames, e.g. from SnowflakeClient.query_batches.
+        by (list[str]): Columns to group by.
+        values (list[str]): Columns to aggregate.
+        agg (str): One of 'sum', 'count', 'min' or 'max'.
+
+    Returns:
+        pd.DataFrame: Aggregated frame with the group columns and the value columns.
+    """
+    if agg not in _COMBINE:
+        raise ValueError(f"Unsupported streaming aggregation '{agg}'")
+
+    combine = _COMBINE[agg]
+    partials = []
+
+    for batch in batches:
+        partials.append(_group(batch, by, values, agg))
+
+        if len(partials) >= COMBINE_EVERY:
+            partials = [_group(_concat(partials), by, values, combine)]
+
+    if not partials:
+        return pd.DataFrame(columns=by + values)
+
+    return _group(_concat(partials), by, values, combine)
+
+def _group(df, by, values, agg):
+    return df.groupby(by, as_index=False, dropna=False, observed=True, sort=True)[values].agg(agg)
+
+def filter_batches(batches, func) -> pd.DataFrame:
+    """
+    Apply func to every batch as it arrives and concatenate what it returns.
+
+    func receives one batch and returns the (usually smaller) frame to keep, which lets row level filters and
+    patches run before the full result is ever materialised.
+    """
+    frames = [func(batch) for batch in batches]
+    frames = [frame for frame in frames if frame is not None]
+
+    if not frames:
+        return pd.DataFrame()
+
+    return _concat(frames)
+
+def _concat(frames):
+    # Batches encoded separately have different categories, align them so the result stays categorical
+    return pd.concat(union_categories(frames), ignore_index=True)
+
+def progress_callback(bar, start: int, end: int, text: str = 'Getting data...'):
+    """Build an on_progress callback moving an existing st.progress bar from start to end"""
+    def on_progress(rows, total_rows):
+        if total_rows <= 0:
+            return
+
+        percent = start + (end - start) * min(rows / total_rows, 1)
+        bar.progress(int(percent), text)
+
+    return on_progress
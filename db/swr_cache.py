@@ -0,0 +1,147 @@
+import copy
+import functools
+import threading
+import time
+from datetime import timedelta
+import pandas as pd
+from .single_flight import SingleFlight
+
+# Days before the newest cached date that an incremental refresh fetches again, to pick up late corrections
+DELTA_LOOKBACK_DAYS = 7
+
+class _Entry:
+    def __init__(self, value):
+        self.value = value
+        self.loaded_at = time.monotonic()
+
+def stale_while_revalidate(soft_ttl: float = 3600, hard_ttl: float = 86400, copy: bool = True, incremental: bool = False):
+    """
+    Process wide cache for reference data loaders with stale-while-revalidate semantics.
+
+    A value younger than soft_ttl is returned as is. Between soft_ttl and hard_ttl the cached value is still returned
+    immediately and a background thread reloads it, so no request waits on the reload. Only a missing value, one
+    older than hard_ttl or a call to .clear() makes the caller wait, and concurrent callers share that one load.
+
+    The loader runs outside of any Streamlit session when refreshed in the background, so it must not use session
+    state, see reference_client. Every caller receives its own copy of the value, like st.cache_data, unless copy is
+    False, which is meant for read only values and the sources of derived values.
+
+    With incremental the background refresh passes the cached value to the loader as previous, so it only fetches
+    what changed since, see delta_start and merge_delta. previous is None for a full load, which still happens on a
+    missing value, past hard_ttl and after .clear(). The loader must not modify previous.
+    """
+    def decorator(func):
+        entries: dict[str, _Entry] = {}
+        refreshing = set()
+        lock = threading.Lock()
+        single_flight = SingleFlight()
+        generation = [0]
+
+        def load(key, args, kwargs, previous=None):
+            started = generation[0]
+            value = func(*args, previous=previous, **kwargs) if incremental else func(*args, **kwargs)
+
+            with lock:
+                # A load started before clear() may have read data the caller just changed
+                if generation[0] == started:
+                    entries[key] = _Entry(value)
+
+            return value
+
+        def refresh(key, args, kwargs, previous):
+            try:
+                load(key, args, kwargs, previous)
+            except Exception as e:
+                # The stale value is kept and the next call past soft_ttl tries again
+                print(f"Background refresh of {func.__name__} failed: {e}")
+            finally:
+                with lock:
+                    refreshing.discard(key)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = repr((args, sorted(kwargs.items())))
+
+            with lock:
+                entry = entries.get(key)
+                age = None if entry is None else time.monotonic() - entry.loaded_at
+                stale = age is not None and soft_ttl <= age < hard_ttl and key not in refreshing
+
+                if stale:
+                    refreshing.add(key)
+
+            if stale:
+                threading.Thread(target=refresh, args=(key, args, kwargs, entry.value), name=f'swr-{func.__name__}', daemon=True).start()
+
+            if age is None or age >= hard_ttl:
+                value = single_flight.do(key, lambda: load(key, args, kwargs))[0]
+            else:
+                value = entry.value
+
+            return _copy(value) if copy else value
+
+        def clear():
+            """Drop every cached value, the next call reloads synchronously"""
+            with lock:
+                entries.clear()
+                generation[0] += 1
+
+        wrapper.clear = clear
+
+        return wrapper
+
+    return decorator
+
+def derived(source):
+    """
+    Cache a read only value built from the result of source, e.g. a store built from a loader with copy=False. The
+    value is rebuilt the first time it is asked for after source returns a new result, so it is never older than
+    its source.
+    """
+    def decorator(func):
+        built = [None, None]
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper():
+            value = source()
+
+            with lock:
+                if built[0] is value:
+                    return built[1]
+
+            result = func(value)
+
+            with lock:
+                built[:] = [value, result]
+
+            return result
+
+        wrapper.clear = source.clear
+
+        return wrapper
+
+    return decorator
+
+def delta_start(dates, lookback_days: int = DELTA_LOOKBACK_DAYS):
+    """First date an incremental refresh fetches again, given the dates already cached"""
+    return (pd.Timestamp(max(dates)) - timedelta(days=lookback_days)).date()
+
+def merge_delta(previous: pd.DataFrame, delta: pd.DataFrame, column: str, since) -> pd.DataFrame:
+    """Replace the rows of previous from since onwards with the freshly fetched delta"""
+    kept = previous[pd.to_datetime(previous[column]) < pd.Timestamp(since)]
+
+    return pd.concat([kept, delta], ignore_index=True)
+
+def reference_client():
+    """Process wide client for reference data loaders, it works with or without a Streamlit session"""
+    # Imported here as db.snowflake_streamlit itself depends on the reference loaders
+    from .snowflake_streamlit import get_snowflake_client
+
+    return get_snowflake_client()
+
+def _copy(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return value.copy()
+
+    return copy.deepcopy(value)
@@ -0,0 +1,530 @@
+import json
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# Reference data shared by the generated tables, loosely modelled on the production schema
+LBUS = [
+    # name, fx, bloomberg_name, lbu_group, country, group_name
+    ('Hong Kong', 'HKD', 'HK', 'HK', 'HK', 'Hong Kong'),
+    ('Thailand', 'THB', 'TH', 'TH', 'TH', 'Thailand'),
+    ('Japan', 'JPY', 'JP', 'JP', 'JP', 'Japan'),
+    ('Singapore', 'SGD', 'SG', 'SG', 'SG', 'Singapore'),
+]
+
+FUNDS = [
+    # short_name, lbu, type, sub_lbu, saa_group, vfa, hk_code, cashflow_name
+    ('HK: Trad', 'Hong Kong', 'Par', 'Bermuda', 'Par', True, 'TRD', 'HK Par'),
+    ('HK: MF1', 'Hong Kong', 'Par', 'Bermuda', 'Par', True, 'MF1', 'HK Par'),
+    ('HK: UL1', 'Hong Kong', 'Non Par', 'Hong Kong', None, True, 'UL1', 'HK Non Par'),
+    ('HK: Provie', 'Hong Kong', 'Non Par', 'Hong Kong', None, False, 'PRV', 'HK Non Par'),
+    ('HK: SHF', 'Hong Kong', 'SHF', 'Assurance', 'Shareholder', False, 'SHF', None),
+    ('HK: Macau Par', 'Hong Kong', 'Par', 'Macau', 'Par', True, 'MCP', 'HK Par'),
+    ('TH: Par', 'Thailand', 'Par', None, None, True, None, 'TH Par'),
+    ('TH: Non Par', 'Thailand', 'Non Par', None, None, False, None, 'TH Non Par'),
+    ('JP: GA', 'Japan', 'Non Par', None, None, False, None, 'JP GA'),
+    ('SG: Par', 'Singapore', 'Par', None, None, True, None, None),
+    ('SG: SHF', 'Singapore', 'SHF', None, None, False, None, None),
+]
+
+# Currency units per USD at the first generated date
+CURRENCIES = {'USD': 1.0, 'HKD': 7.8, 'THB': 35.0, 'JPY': 145.0, 'SGD': 1.35, 'EUR': 0.92, 'CNY': 7.2, 'GBP': 0.79}
+
+COUNTRIES = {'US': True, 'HK': True, 'JP': True, 'SG': True, 'GB': True, 'CN': False, 'TH': False, 'KR': False, 'ID': False}
+
+MANAGERS = ['Pinebridge Asia', 'Apollo', 'Wellington', 'BlackRock', 'FWD']
+
+ASSET_TYPES = [
+    # bbg_asset_type, fwd_asset_type, l1, l2, l3, is_bbg_fi, weight
+    ('Government Bond', 'Government Bonds', 'Fixed Income', 'Government', 'Sovereign', True, 0.22),
+    ('Treasury', 'Government Bonds', 'Fixed Income', 'Government', 'Treasury', True, 0.10),
+    ('Corporate Bond', 'Corporate Bonds - Asia', 'Fixed Income', 'Corporate', 'IG Corporate', True, 0.20),
+    ('Corporate Bond', 'Corporate Bonds - US', 'Fixed Income', 'Corporate', 'IG Corporate', True, 0.10),
+    ('Corporate Bond', 'Private Debt', 'Fixed Income', 'Private', 'Private Credit', True, 0.05),
+    ('Mortgage Backed', 'Structured Credit', 'Fixed Income', 'Securitized', 'MBS', True, 0.03),
+    ('Equity', 'Listed Equity - Local', 'Equity', 'Listed', 'Local Equity', False, 0.08),
+    ('Equity', 'Listed Equity - International', 'Equity', 'Listed', 'International Equity', False, 0.05),
+    ('Fund', 'Alternatives', 'Alternatives', 'Funds', 'Private Equity', False, 0.04),
+    ('Cash', 'Cash', 'Cash', 'Cash', 'Cash', False, 0.06),
+    ('Repo Liability', 'Other Assets', 'Other', 'Repo', 'Repo', False, 0.01),
+    ('Foreign Exchange Forward', 'Derivatives', 'Derivatives', 'FX', 'FX Forward', False, 0.03),
+    ('OIS Swap', 'Derivatives', 'Derivatives', 'Rates', 'Swap', False, 0.02),
+    ('Bond Option', 'Derivatives', 'Derivatives', 'Options', 'Bond Option', False, 0.01),
+]
+
+RATINGS = ['AAA', 'AA+', 'AA', 'AA-', 'A+', 'A', 'A-', 'BBB+', 'BBB', 'BBB-', 'BB+', 'BB', 'BB-', 'B+', 'B', 'B-', 'CCC+', 'CCC', 'CCC-', 'CC', 'C', 'D']
+MOODYS_RATINGS = ['Aaa', 'Aa1', 'Aa2', 'Aa3', 'A1', 'A2', 'A3', 'Baa1', 'Baa2', 'Baa3', 'Ba1', 'Ba2', 'Ba3', 'B1', 'B2', 'B3', 'Caa1', 'Caa2', 'Caa3', 'Ca', 'C', 'D']
+RATING_FACTORS = [1, 10, 20, 40, 70, 120, 180, 260, 360, 610, 940, 1350, 1766, 2220, 2720, 3490, 4770, 6500, 8070, 9000, 10000, 10000]
+
+CURVES = {'USD_govt': 'USD', 'USD_swap': 'USD', 'HKD_govt': 'HKD', 'HKD_swap': 'HKD', 'JPY_govt': 'JPY', 'THB_govt': 'THB'}
+CURVE_TENORS = ['1m', '3m', '6m', '1', '2', '3', '4', '5', '7', '10', '15', '20', '25', '30']
+
+LIABILITY_MODES = ['Premiums', 'Guaranteed Liabilities', 'Non-Guaranteed Liabilities', 'Net Liabilities']
+
+def generate(con, positions: int = 10_000, dates: int = 12, seed: int = 42, end_date=None, admin_email: str = 'admin@example.com') -> None:
+    """
+    Create and fill the dashboard schema in a DuckDB connection with seeded synthetic data.
+
+    Parameters:
+        con: DuckDB connection.
+        positions (int): Number of positions held at each closing date.
+        dates (int): Number of month end closing dates.
+        seed (int): Random seed, the same seed always produces the same database.
+        end_date: Last closing date, defaults to the last month end before today.
+        admin_email (str): Email of the seeded admin user, should match [admin] email in the secrets.
+    """
+    rng = np.random.default_rng(seed)
+
+    if end_date is None:
+        end_date = pd.Timestamp.today().normalize() - pd.offsets.MonthEnd(1)
+
+    closing_dates = pd.date_range(end=pd.Timestamp(end_date) + pd.offsets.MonthEnd(0), periods=dates, freq='ME')
+    daily_dates = pd.date_range(closing_dates[0] - pd.offsets.MonthEnd(1), closing_dates[-1], freq='D')
+
+    for schema in ['funnel', 'supp', 'collateral', 'fees', 'liability_profile']:
+        con.execute(f'CREATE SCHEMA IF NOT EXISTS {schema};')
+
+    _create(con, 'supp.lbu', _lbu_table())
+    _create(con, 'supp.fund', _fund_table())
+    _create(con, 'supp.streamlit_users', _users_table(admin_email))
+    con.execute('CREATE TABLE supp.streamlit_activity (timestamp TIMESTAMP, email VARCHAR, name VARCHAR, page VARCHAR);')
+
+    fx = _fx_rates(rng, daily_dates)
+    _create(con, 'supp.fx_rates', fx)
+    _create(con, 'supp.curve_name', pd.DataFrame({'name': list(CURVES), 'fx': list(CURVES.values())}))
+    _create(con, 'supp.curve_rates', _curve_rates(rng, daily_dates))
+    _create(con, 'supp.cds_rates', _cds_rates(rng, daily_dates))
+    _create(con, 'supp.ratings_ladder', pd.DataFrame({'id': np.arange(1, len(RATINGS) + 2), 'rating': RATINGS + ['Default'], 'index': np.arange(1, len(RATINGS) + 2)}))
+    _create(con, 'supp.ratings_mapping', _ratings_mapping())
+    _create(con, 'supp.manager_group', pd.DataFrame({'id': [1, 2, 3, 4, 5], 'name': ['Pinebridge', 'Apollo', 'Wellington', 'BlackRock', 'FWD'], 'mv_mode_id': [2, 2, 3, 5, 2]}))
+    con.execute('CREATE TABLE supp.cashflow_dates (valuation_date DATE, bbgid VARCHAR, category VARCHAR, value VARCHAR);')
+
+    securities = _securities(rng, max(50, positions // 4))
+    _generate_funnelweb(con, rng, positions, securities, closing_dates, fx)
+
+    _generate_collateral(con)
+    _generate_fees(con, securities, closing_dates[0])
+    _generate_liabilities(con, rng, closing_dates)
+
+def _create(con, name: str, df: pd.DataFrame) -> None:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Columns named like dates are DATE in Snowflake, timestamps stay as they are
+    for index, field in enumerate(table.schema):
+        if field.name.endswith('date') and pa.types.is_timestamp(field.type):
+            table = table.set_column(index, field.name, table.column(index).cast(pa.date32()))
+
+    con.register('_synthetic', table)
+    con.execute(f'CREATE TABLE {name} AS SELECT * FROM _synthetic;')
+    con.unregister('_synthetic')
+
+def _lbu_table() -> pd.DataFrame:
+    return pd.DataFrame({
+        'id': np.arange(1, len(LBUS) + 1),
+        'name': [lbu[0] for lbu in LBUS],
+        'fx': [lbu[1] for lbu in LBUS],
+        'bloomberg_name': [lbu[2] for lbu in LBUS],
+        'lbu_group': [lbu[3] for lbu in LBUS],
+        'local_country': [lbu[4] for lbu in LBUS],
+        'local_currency': [lbu[1] for lbu in LBUS],
+        'save_path': [f'/synthetic/{lbu[2]}' for lbu in LBUS],
+        'country': [lbu[4] for lbu in LBUS],
+        'group_name': [lbu[5] for lbu in LBUS],
+        'legal_name': [f'FWD {lbu[0]} Limited' for lbu in LBUS],
+        'parent_company': ['FWD Group'] * len(LBUS),
+        'mav_name': [lbu[0] for lbu in LBUS],
+    })
+
+def _fund_table() -> pd.DataFrame:
+    return pd.DataFrame({
+        'id': np.arange(1, len(FUNDS) + 1),
+        'name': [fund[0].replace(': ', ' ') for fund in FUNDS],
+        'lbu': [fund[1] for fund in FUNDS],
+        'short_name': [fund[0] for fund in FUNDS],
+        'display_position': np.arange(1, len(FUNDS) + 1, dtype=float),
+        'type': [fund[2] for fund in FUNDS],
+        'sub_lbu': [fund[3] for fund in FUNDS],
+        'saa_group': [fund[4] for fund in FUNDS],
+        'vfa': [fund[5] for fund in FUNDS],
+        'comment': [None] * len(FUNDS),
+        'csa_name': [None] * len(FUNDS),
+        'hk_code': [fund[6] for fund in FUNDS],
+        'alternate_pam_account': [None] * len(FUNDS),
+        'pam_account': [None] * len(FUNDS),
+        'bbg_account': [f'ACC{i:03d}' for i in range(len(FUNDS))],
+        'code': [fund[0].split(': ')[1].upper() for fund in FUNDS],
+        'cashflow_name': [fund[7] for fund in FUNDS],
+    })
+
+def _users_table(admin_email: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        'id': [1, 2],
+        'email': [admin_email, 'analyst@example.com'],
+        'name': ['Admin', 'Analyst'],
+        'lbu': ['Group', 'HK'],
+        'permissions': ['Fees;Assumptions;SPA', 'Fees'],
+        'admin': [True, False],
+    })
+
+def _fx_rates(rng, dates) -> pd.DataFrame:
+    frames = []
+
+    for currency, rate in CURRENCIES.items():
+        # USD is the base so its rate stays at one
+        moves = np.zeros(len(dates)) if currency == 'USD' else rng.normal(0, 0.003, len(dates))
+        frames.append(pd.DataFrame({'valuation_date': dates.values.astype('datetime64[D]'), 'fx': currency, 'rate': rate * np.exp(np.cumsum(moves))}))
+
+    return pd.concat(frames, ignore_index=True).sort_values(['valuation_date', 'fx'], ignore_index=True)
+
+def _valuation_dates(dates):
+    # Business days plus every month end, closing dates can fall on a weekend
+    return dates[(dates.dayofweek < 5) | dates.is_month_end]
+
+def _curve_rates(rng, dates) -> pd.DataFrame:
+    tenors = np.array([1 / 12, 0.25, 0.5] + [float(tenor) for tenor in CURVE_TENORS[3:]])
+    business_days = _valuation_dates(dates)
+    frames = []
+
+    for curve in CURVES:
+        level = rng.uniform(0.5, 4.5) + np.cumsum(rng.normal(0, 0.02, len(business_days)))
+        slope = rng.uniform(-1.5, 1.5) + np.cumsum(rng.normal(0, 0.01, len(business_days)))
+        # Nelson-Siegel style shape, level plus a slope decaying with the tenor
+        loading = (1 - np.exp(-tenors / 2)) / (tenors / 2)
+        rates = level[:, None] - slope[:, None] * loading[None, :]
+
+        frames.append(pd.DataFrame({
+            'valuation_date': np.repeat(business_days.values.astype('datetime64[D]'), len(tenors)),
+            'curve': curve,
+            'tenor': np.tile(CURVE_TENORS, len(business_days)),
+            'rate': np.round(rates.ravel(), 4),
+        }))
+
+    return pd.concat(frames, ignore_index=True)
+
+def _cds_rates(rng, dates) -> pd.DataFrame:
+    business_days = _valuation_dates(dates)
+    spreads = 60 * np.exp(np.cumsum(rng.normal(0, 0.01, len(business_days))))
+
+    return pd.DataFrame({'valuation_date': business_days.values.astype('datetime64[D]'), 'name': 'CDX IG CDSI GEN 10Y Corp', 'spread_bid': np.round(spreads, 2)})
+
+def _ratings_mapping() -> pd.DataFrame:
+    rows = []
+
+    for agency, scale in [('S&P', RATINGS), ('Fitch', RATINGS), ('Moodys', MOODYS_RATINGS)]:
+        rows += [(agency, rating, equivalent) for rating, equivalent in zip(scale[:-1], RATINGS[:-1])]
+        # The mapping of each agency stops at its default rating
+        rows.append((agency, scale[-1], 'Default'))
+
+    return pd.DataFrame(rows, columns=['agency', 'rating', 'equivalent_rating'])
+
+def _securities(rng, count: int) -> dict:
+    weights = np.array([asset_type[-1] for asset_type in ASSET_TYPES])
+    asset_type = rng.choice(len(ASSET_TYPES), count, p=weights / weights.sum())
+    is_fi = np.array([asset_type_row[5] for asset_type_row in ASSET_TYPES])[asset_type]
+
+    currencies = np.array(list(CURRENCIES))
+    countries = np.array(list(COUNTRIES))
+    issuers = np.array([f'Issuer {i:04d}' for i in range(max(10, count // 5))])
+
+    rating = np.clip(rng.normal(6, 3, count).round().astype(int), 0, len(RATINGS) - 2)
+    maturity_years = np.where(is_fi, rng.gamma(2.0, 4.0, count) + 0.25, np.nan)
+
+    return {
+        'id': np.arange(count),
+        'asset_type': asset_type,
+        'is_fi': is_fi,
+        'bbgid': np.array([f'BBG{i:09d}' for i in range(count)], dtype=object),
+        'isin': np.array([f'XS{i:010d}' for i in range(count)], dtype=object),
+        'name': np.array([f'SEC {i:06d}' for i in range(count)], dtype=object),
+        'issuer': rng.choice(issuers, count),
+        'currency': rng.choice(currencies, count, p=[0.45, 0.2, 0.08, 0.08, 0.05, 0.06, 0.05, 0.03]),
+        'country': rng.choice(countries, count),
+        'rating': rating,
+        'maturity_years': maturity_years,
+        'coupon': np.where(is_fi, np.round(rng.uniform(0.5, 7.0, count), 3), np.nan),
+        'coupon_frequency': np.where(is_fi, rng.choice([1.0, 2.0, 4.0], count), np.nan),
+        'callable': is_fi & (rng.random(count) < 0.15),
+        'price': np.where(is_fi, rng.normal(98, 6, count), rng.lognormal(3.5, 1.0, count)),
+        'spread': np.where(is_fi, np.exp(rng.normal(4.5, 0.6, count)), np.nan),
+    }
+
+def _generate_funnelweb(con, rng, positions: int, securities: dict, closing_dates, fx: pd.DataFrame) -> None:
+    security = rng.integers(0, len(securities['id']), positions)
+    fund = rng.integers(0, len(FUNDS), positions)
+    manager = rng.choice(len(MANAGERS), positions, p=[0.25, 0.2, 0.2, 0.2, 0.15])
+
+    # Most positions exist for the whole history, the rest are bought or sold part way through
+    first_date = np.where(rng.random(positions) < 0.8, 0, rng.integers(0, len(closing_dates), positions))
+    last_date = np.where(rng.random(positions) < 0.9, len(closing_dates) - 1, rng.integers(0, len(closing_dates), positions))
+    last_date = np.maximum(first_date, last_date)
+
+    quantity = rng.lognormal(13, 1.2, positions)
+    price = securities['price'].copy()
+    trade_dates = np.full(positions, closing_dates[0].to_datetime64().astype('datetime64[D]'))
+
+    fx_by_date = fx.pivot(index='valuation_date', columns='fx', values='rate')
+    position_ids = np.array([f'P{index:08d}' for index in range(positions)], dtype=object)
+    created = False
+
+    for i, closing_date in enumerate(closing_dates):
+        if i > 0:
+            # Occasional trades and a price random walk between month ends
+            traded = rng.random(positions) < 0.05
+            quantity = np.where(traded, quantity * rng.uniform(0.5, 1.5, positions), quantity)
+            trade_dates = np.where(traded, (closing_date - pd.Timedelta(days=int(rng.integers(1, 28)))).to_datetime64().astype('datetime64[D]'), trade_dates)
+            price = price * np.exp(rng.normal(0, 0.01, len(price)))
+
+        held = (first_date <= i) & (last_date >= i)
+        table = _funnelweb_rows(rng, securities, security[held], fund[held], manager[held], position_ids[held], quantity[held], price, trade_dates[held], closing_date, fx_by_date.loc[closing_date])
+
+        con.register('_synthetic', table)
+
+        if not created:
+            con.execute('CREATE TABLE funnel.funnelweb AS SELECT * FROM _synthetic;')
+            created = True
+        else:
+            con.execute('INSERT INTO funnel.funnelweb SELECT * FROM _synthetic;')
+
+        con.unregister('_synthetic')
+
+def _funnelweb_rows(rng, securities, security, fund, manager, position_ids, quantity, price, trade_dates, closing_date, fx_rates) -> pa.Table:
+    rows = len(security)
+    asset_type = securities['asset_type'][security]
+    asset_rows = [ASSET_TYPES[index] for index in range(len(ASSET_TYPES))]
+    bbg_asset_type = np.array([row[0] for row in asset_rows], dtype=object)[asset_type]
+    is_fi = securities['is_fi'][security]
+
+    currency = securities['currency'][security]
+    fx_rate = fx_rates.reindex(currency).to_numpy()
+    unit = np.where(is_fi, 0.01, 1.0)
+    clean_price = np.where(bbg_asset_type == 'Cash', 100.0, price[security])
+    unit = np.where(bbg_asset_type == 'Cash', 0.01, unit)
+
+    position = np.where(bbg_asset_type == 'Repo Liability', -quantity, quantity)
+    net_mv = position * unit * clean_price / fx_rate
+
+    # Derivatives only carry a small mark to market
+    derivative = np.isin(bbg_asset_type, ['Foreign Exchange Forward', 'OIS Swap', 'Bond Option'])
+    notional = np.where(derivative, quantity * 10, np.nan)
+    net_mv = np.where(derivative, notional * rng.normal(0, 0.01, rows) / fx_rate, net_mv)
+
+    closing = closing_date.to_datetime64().astype('datetime64[D]')
+    maturity_years = securities['maturity_years'][security]
+    maturity = closing + np.nan_to_num(maturity_years * 365.25).astype(np.int64).astype('timedelta64[D]')
+    maturity = np.where(is_fi, maturity, np.datetime64('NaT'))
+    time_until_maturity = np.where(is_fi, maturity_years, np.nan)
+
+    duration = np.where(is_fi, np.minimum(maturity_years, 30) * rng.uniform(0.7, 0.95, rows), np.nan)
+    spread = securities['spread'][security] * rng.uniform(0.95, 1.05, rows)
+    ytm = np.where(is_fi, 3.0 + spread / 100 + rng.normal(0, 0.1, rows), np.nan)
+
+    rating = securities['rating'][security]
+    # A few bonds have no rating at all
+    not_rated = securities['id'][security] % 37 == 0
+    final_rating = np.where(not_rated, 'NR', np.array(RATINGS, dtype=object)[rating])
+    final_rating = np.where(is_fi, final_rating, None)
+    final_rating_letter = pd.Series(final_rating, dtype=object).str.rstrip('+-').to_numpy()
+    warf = np.where(is_fi & ~not_rated, np.array(RATING_FACTORS, dtype=float)[rating], 0.0)
+
+    maturity_range = pd.cut(time_until_maturity, [0, 1, 3, 5, 10, np.inf], labels=['0-1Y', '1-3Y', '3-5Y', '5-10Y', '10Y+']).astype(object)
+    maturity_range = np.where(pd.isna(maturity_range), None, maturity_range)
+
+    funds = np.array([row[0] for row in FUNDS], dtype=object)[fund]
+    lbus = {lbu[0]: lbu for lbu in LBUS}
+    fund_lbu = [lbus[row[1]] for row in FUNDS]
+    lbu_code = np.array([lbu[2] for lbu in fund_lbu], dtype=object)[fund]
+    lbu_group = np.array([lbu[3] for lbu in fund_lbu], dtype=object)[fund]
+    fund_type = np.array([row[2] for row in FUNDS], dtype=object)[fund]
+
+    country = securities['country'][security]
+    issuer = securities['issuer'][security]
+    callable_ = securities['callable'][security]
+
+    is_swap = np.isin(bbg_asset_type, ['Foreign Exchange Forward', 'OIS Swap'])
+    pay_currency = np.where(is_swap, currency, None)
+    rec_currency = np.where(is_swap, np.where(currency == 'USD', 'HKD', 'USD'), None)
+
+    def strings(values):
+        return pa.array(np.asarray(values, dtype=object), type=pa.string())
+
+    def floats(values):
+        return pa.array(np.asarray(values, dtype=float), type=pa.float64(), from_pandas=True)
+
+    def dates(values):
+        return pa.array(np.asarray(values, dtype='datetime64[D]'), type=pa.date32(), from_pandas=True)
+
+    return pa.table({
+        'closing_date': dates(np.full(rows, closing)),
+        'position_id': strings(position_ids),
+        'security_name': strings(securities['name'][security]),
+        'bbgid': strings(securities['bbgid'][security]),
+        'bbgid_v2': strings(securities['bbgid'][security]),
+        'isin': strings(np.where(is_fi, securities['isin'][security], None)),
+        'lbu_group': strings(lbu_group),
+        'lbu_code': strings(lbu_code),
+        'fund_code': strings(funds),
+        'fund_type': strings(fund_type),
+        'account_code': strings(np.char.add('ACC', (fund * 10 + manager).astype(str)).astype(object)),
+        'manager': strings(np.array(MANAGERS, dtype=object)[manager]),
+        'country_report': strings(country),
+        'developed_country': pa.array(pd.Series(country).map(COUNTRIES).to_numpy(dtype=bool)),
+        'bbg_asset_type': strings(bbg_asset_type),
+        'fwd_asset_type': strings(np.array([row[1] for row in asset_rows], dtype=object)[asset_type]),
+        'l1_asset_type': strings(np.array([row[2] for row in asset_rows], dtype=object)[asset_type]),
+        'l2_asset_type': strings(np.array([row[3] for row in asset_rows], dtype=object)[asset_type]),
+        'l3_asset_type': strings(np.array([row[4] for row in asset_rows], dtype=object)[asset_type]),
+        'l4_asset_type': strings(np.array([row[4] for row in asset_rows], dtype=object)[asset_type]),
+        'coll_typ': strings(np.where(bbg_asset_type == 'Mortgage Backed', 'MORTGAGE BACKED', None)),
+        'securitized_credit_type': strings(np.where(bbg_asset_type == 'Mortgage Backed', 'Agency MBS', None)),
+        'currency': strings(currency),
+        'sw_pay_crncy': strings(pay_currency),
+        'sw_rec_crncy': strings(rec_currency),
+        'sw_rec_notl_amt': floats(np.where(is_swap, notional, np.nan)),
+        'derivs_dollar_notional': floats(np.where(derivative, notional / fx_rate, np.nan)),
+        'strike': floats(np.where(bbg_asset_type == 'Bond Option', 100.0, np.nan)),
+        'underlying_security_name': strings(np.where(bbg_asset_type == 'Bond Option', securities['name'][security], None)),
+        'issuer': strings(issuer),
+        'ultimate_parent_name': strings(issuer),
+        'cast_parent_name': strings(issuer),
+        'industry_sector': strings(np.where(is_fi, 'Financial', 'Diversified')),
+        'industry_group': strings(np.where(is_fi, 'Banks', 'Funds')),
+        'industry': strings(np.where(is_fi, 'Commercial Banks', 'Investment Companies')),
+        'ult_parent_industry_group': strings(np.where(is_fi, 'Banks', 'Funds')),
+        'fund_geo_focus': strings(np.where(bbg_asset_type == 'Fund', 'Asia', None)),
+        'is_bbg_fi': pa.array(is_fi),
+        'maturity': dates(maturity),
+        'effective_maturity': dates(maturity),
+        'next_call_date': dates(np.where(callable_, closing + 365, np.datetime64('NaT'))),
+        'next_call_price': floats(np.where(callable_, 100.0, np.nan)),
+        'redemption_value': floats(np.where(is_fi, 100.0, np.nan)),
+        'coupon_rate': floats(securities['coupon'][security]),
+        'coupnfreq': floats(securities['coupon_frequency'][security]),
+        'time_until_maturity': floats(time_until_maturity),
+        'maturity_range': strings(maturity_range),
+        'position': floats(position),
+        'pledge_pos': floats(np.where(rng.random(rows) < 0.05, -position * 0.2, 0.0)),
+        'unit': floats(unit),
+        'mtge_factor': floats(np.where(bbg_asset_type == 'Mortgage Backed', rng.uniform(0.5, 1, rows), 0.0)),
+        'principal_factor': floats(np.zeros(rows)),
+        'clean_price': floats(clean_price),
+        'fx_rate': floats(fx_rate),
+        'net_mv': floats(net_mv),
+        'clean_mv_usd': floats(net_mv * 0.99),
+        'duration': floats(duration),
+        'ytm': floats(ytm),
+        'convexity': floats(np.where(is_fi, duration ** 2 / 100, np.nan)),
+        'credit_spread_bp': floats(np.where(is_fi, spread, np.nan)),
+        'dv01_000': floats(np.where(is_fi, net_mv * np.nan_to_num(duration) / 10_000 / 1_000, 0.0)),
+        'cs01_000': floats(np.where(is_fi, net_mv * np.nan_to_num(duration) / 10_000 / 1_000 * 0.9, 0.0)),
+        'warf': floats(warf),
+        'final_rating': strings(final_rating),
+        'final_rating_letter': strings(final_rating_letter),
+        'final_sp_rating': strings(final_rating),
+        'final_sp_issuer_rating': strings(final_rating),
+        'final_moodys_rating': strings(final_rating),
+        'final_moodys_issuer_rating': strings(final_rating),
+        'final_fitch_rating': strings(final_rating),
+        'final_fitch_issuer_rating': strings(final_rating),
+        'last_trade_date': dates(trade_dates),
+    })
+
+def _generate_collateral(con) -> None:
+    _create(con, 'collateral.fwd_entities', pd.DataFrame({'id': [1, 2, 3], 'code': ['ML', 'HK', 'MC']}))
+    _create(con, 'collateral.cp_entities', pd.DataFrame({'id': [1, 2, 3], 'name': ['Bank A', 'Bank B', 'Bank C']}))
+    _create(con, 'collateral.csas', pd.DataFrame({
+        'id': [1, 2, 3],
+        'entity_id': [1, 2, 1],
+        'cp_id': [1, 2, 3],
+        'effective_date': pd.to_datetime(['2022-01-01'] * 3).values.astype('datetime64[D]'),
+        'base_currency': ['USD', 'USD', 'HKD'],
+        'eligible_currency': ['USD;HKD', 'USD', 'USD;HKD'],
+        'fx_haircut': [0.08, 0.08, 0.0],
+    }))
+    _create(con, 'collateral.csa_fund_groups', pd.DataFrame({'id': [1, 2], 'code': ['HK Par', 'HK Non Par']}))
+    _create(con, 'collateral.csa_fund_details', pd.DataFrame({'csa_id': [1, 2, 3, 3], 'fund_group_id': [1, 2, 1, 2]}))
+    _create(con, 'collateral.csa_fund_mapping', pd.DataFrame({
+        'fund_group_id': [1, 1, 1, 2, 2],
+        'fund_code': ['HK: Trad', 'HK: MF1', 'HK: Macau Par', 'HK: UL1', 'HK: Provie'],
+    }))
+
+    logics = []
+    valuations = []
+
+    for csa_id in [1, 2, 3]:
+        logics += [
+            (csa_id, 'Cash', 'CURRENCY', 'String', 'IN', 'USD;HKD'),
+            (csa_id, 'UST', 'CURRENCY', 'String', 'EQUALS', 'USD'),
+            (csa_id, 'Corporate Bonds', 'CURRENCY', 'String', 'IN', 'USD;HKD'),
+            (csa_id, 'Corporate Bonds', 'TIME_UNTIL_MATURITY', 'Number', 'LESS THAN', '30'),
+        ]
+        valuations += [
+            (csa_id, 'Cash', '', '', '', '', '', '', 0, -1, 1.0),
+            (csa_id, 'UST', '', '', '', '', '', '', 0, 5, 0.98),
+            (csa_id, 'UST', '', '', '', '', '', '', 5, -1, 0.95),
+            (csa_id, 'Corporate Bonds', 'A-', 'AAA', 'A3', 'Aaa', 'A-', 'AAA', 0, 5, 0.9),
+            (csa_id, 'Corporate Bonds', 'A-', 'AAA', 'A3', 'Aaa', 'A-', 'AAA', 5, -1, 0.85),
+            (csa_id, 'Corporate Bonds', 'BBB-', 'AAA', 'Baa3', 'Aaa', 'BBB-', 'AAA', 0, -1, 0.75),
+        ]
+
+    _create(con, 'collateral.collateral_logic', pd.DataFrame(logics, columns=['csa_id', 'asset_type', 'field', 'datatype', 'logic', 'value']))
+    _create(con, 'collateral.valuation_percentages', pd.DataFrame(valuations, columns=['csa_id', 'asset_type', 'sp_lower', 'sp_upper', 'moodys_lower', 'moodys_upper', 'fitch_lower', 'fitch_upper', 'tenor_lower', 'tenor_upper', 'percentage']))
+
+def _generate_fees(con, securities: dict, effective_date) -> None:
+    _create(con, 'fees.calc_mode', pd.DataFrame({'id': [1, 2, 3], 'mode': ['Flat', 'Tiered', 'Custom']}))
+    _create(con, 'fees.mv_mode', pd.DataFrame({'id': [1, 2, 3, 4, 5], 'mode': ['N/A', 'Monthly', 'Quarterly', 'Monthly Average', 'Three Month Average']}))
+
+    created_at = datetime(2022, 1, 1)
+    fees = []
+    details = []
+
+    for lbu_code in ['HK', 'MC', 'TH', 'JP', 'SG']:
+        for manager_id in [1, 2, 3, 4]:
+            fee_id = len(fees) + 1
+            fees.append((fee_id, lbu_code, manager_id, 'All', effective_date, created_at, 1))
+
+            if manager_id == 4 and lbu_code == 'HK':
+                # BlackRock is billed on tiers per security category, see fees.fee_calculator
+                args = {'currency': 'USD', 'tiers': {'Core': {'aum': [1000, 0], 'fee': [10, 7]}, 'Satellite': {'aum': [0], 'fee': [15]}}}
+                details.append((fee_id, fee_id, 0.0, 3, json.dumps(args), created_at, 1))
+            elif manager_id == 3:
+                args = {'currency': 'USD', 'tiers': {'aum': [500, 0], 'fee': [12, 8]}}
+                details.append((fee_id, fee_id, 0.0, 2, json.dumps(args), created_at, 1))
+            else:
+                details.append((fee_id, fee_id, float(5 + manager_id * 2), 1, '', created_at, 1))
+
+    fees_df = pd.DataFrame(fees, columns=['id', 'lbu_code', 'manager_id', 'asset_type', 'effective_date', 'created_at', 'created_by_id'])
+    fees_df['effective_date'] = pd.to_datetime(fees_df['effective_date']).values.astype('datetime64[D]')
+
+    _create(con, 'fees.ima_fees', fees_df)
+    _create(con, 'fees.ima_fees_bps', pd.DataFrame(details, columns=['id', 'fee_id', 'fee_bps', 'calc_mode_id', 'calc_mode_args', 'created_at', 'created_by_id']))
+
+    core = securities['bbgid'][:20]
+    _create(con, 'fees.custom_fees', pd.DataFrame({
+        'manager_id': 4,
+        'category': 'Core',
+        'value': '',
+        'value2': core,
+        'created_at': created_at,
+        'created_by_id': 1,
+    }))
+
+def _generate_liabilities(con, rng, closing_dates) -> None:
+    tables = {'HK': 'hk_liabilities', 'TH': 'th_liabilities_new', 'JP': 'jp_liabilities'}
+    scale = {'HK': 1.0, 'TH': 35.0, 'JP': 145.0}
+
+    for lbu, table in tables.items():
+        groups = sorted({fund[7] for fund in FUNDS if fund[7] and fund[7].startswith(lbu)})
+        years = np.arange(1, 51)
+        frames = []
+
+        for as_of_date in closing_dates:
+            for group in groups:
+                for mode in LIABILITY_MODES:
+                    sign = 1 if mode == 'Premiums' else -1
+                    # Run off profile decaying with the projection year
+                    values = sign * scale[lbu] * rng.uniform(50, 150) * 1e6 * np.exp(-years / rng.uniform(8, 20))
+
+                    frames.append(pd.DataFrame({'as_of_date': as_of_date.to_datetime64().astype('datetime64[D]'), 'group_name': group, 'year': years, 'value': values, 'mode': mode}))
+
+        _create(con, f'liability_profile.{table}', pd.concat(frames, ignore_index=True))
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from .connection_pool import QueryCancelledError
+from .sql import normalize_sql, fingerprint
+
+# Longest SQL text kept per record, the fingerprint identifies the full statement
+MAX_SQL_LENGTH = 1000
+
+class QueryRecord(dict):
+    """Telemetry of a single query, phase timings are accumulated in milliseconds as <phase>_ms"""
+    def __init__(self, kind: str, sql: str, page: str = None):
+        super().__init__(
+            timestamp=datetime.now().isoformat(timespec='milliseconds'),
+            kind=kind,
+            page=page,
+            fingerprint=fingerprint(sql),
+            sql=normalize_sql(sql)[:MAX_SQL_LENGTH]
+        )
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+
+        try:
+            yield
+        finally:
+            key = f'{name}_ms'
+            self[key] = round(self.get(key, 0) + (time.perf_counter() - start) * 1000, 1)
+
+    def finish(self, error: Exception = None) -> 'QueryRecord':
+        self['total_ms'] = round((time.perf_counter() - self._start) * 1000, 1)
+        self['status'] = 'ok' if error is None else 'cancelled' if isinstance(error, QueryCancelledError) else 'error'
+
+        if error is not None:
+            self['error'] = f'{type(error).__name__}: {error}'
+
+        return self
+
+class QueryTelemetry:
+    """
+    Collects query records in an in memory ring buffer and writes them as JSON lines to a rotating log file.
+
+    Parameters:
+        path (str): Log file, None to only keep the ring buffer.
+        max_records (int): Size of the ring buffer.
+        max_bytes (int): Size at which the log file is rotated.
+        backup_count (int): Number of rotated files kept.
+    """
+    def __init__(self, path: str = None, max_records: int = 1000, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5):
+        self.records = deque(maxlen=max_records)
+        self._lock = threading.Lock()
+        self._logger = None
+
+        if path:
+            directory = os.path.dirname(path)
+
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._logger = logging.getLogger(f'dashboard.queries.{os.path.abspath(path)}')
+            self._logger.setLevel(logging.INFO)
+            self._logger.propagate = False
+
+            if not self._logger.handlers:
+                handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self._logger.addHandler(handler)
+
+    def record(self, record: dict) -> None:
+        with self._lock:
+            self.records.append(record)
+
+        if self._logger is not None:
+            self._logger.info(json.dumps(record, default=str))
+
+    def cache_hit(self, cache: str, sql: str, page: str = None) -> None:
+        record = QueryRecord('cache', sql, page)
+        record['cache'] = cache
+        self.record(record.finish())
+
+    def recent(self, n: int = None) -> list[dict]:
+        with self._lock:
+            records = list(self.records)
+
+        return records if n is None else records[-n:]
@@ -12,9 +12,9 @@ def build_date_filter(label: str, dates: list[datetime], default: datetime = Non
     
     return date
 
-def build_date_filter_pills(label: str, dates: list[datetime], default: datetime = None, key: str = 'selected_date', comparison_date: datetime = None, pill_dates: list[datetime] = None):
+def build_date_filter_pills(label: str, dates: ValuationCalendar, default: datetime = None, key: str = 'selected_date', comparison_date: datetime = None, pill_dates: list[datetime] = None):
     """
-    Builds a date filter with pills for quick selection of common date ranges.
+    Builds a date filter with pills for quick selection of common date ranges, the pill dates are looked up in the valuation calendar.
     """
     #if ss.reset_variables and f'{key}_override' in ss:
     #   ss.pop(f'{key}_override')
@@ -31,7 +31,7 @@ def build_date_filter_pills(label: str, dates: list[datetime], default: datetime
         
     _override_date(key, pill_dates)
     
-    build_date_filter(label, dates, pill_dates[default], key, _reset_pills)
+    build_date_filter(label, (dates.first, dates.latest), pill_dates[default], key, _reset_pills)
     
     _set_pill_date(key, pill_dates)
     
@@ -39,7 +39,7 @@ def build_date_filter_pills(label: str, dates: list[datetime], default: datetime
     
 def _build_valuation_pill_dates(dates, default):
     date = datetime.now().date()
-    pill_dates = {'Today': max(dates).date(), 'YTD': get_ytd(date, dates), 'QTD': get_qtd(date, dates), 'MTD': get_mtd(date, dates)}
+    pill_dates = {'Today': dates.latest, 'YTD': get_ytd(date, dates), 'QTD': get_qtd(date, dates), 'MTD': get_mtd(date, dates)}
     
     if default == None:
         default = 'Today'
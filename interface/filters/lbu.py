@@ -2,7 +2,7 @@ import streamlit as st
 from streamlit import session_state as ss
 from db.data.data_shipment import get_lbu_data, get_lbu_data_hk
 from interface.filters.tree import build_nested_dict, build_custom_tree_filter
-from db.data.lbu import LBU_GROUP, LBU_GROUP_NAME, LBU_CODE, LBU_CODE_NAME, FUND_TYPE, FUND_CODE, SUB_LBU, HK_CODE
+from db.data.lbu import LBU_GROUP, LBU_GROUP_NAME, LBU_CODE, LBU_CODE_NAME, FUND_TYPE, FUND_CODE, SUB_LBU, HK_CODE, get_lbu_hierarchy
 
 def build_lbu_filter():
     df = get_lbu_data()
@@ -61,7 +61,7 @@ def build_lbu_filter_hk(fund_codes = []):
         expanded_level=expanded_level
     )
     
-    mapping_dict = {f"{row[SUB_LBU]}:{row[HK_CODE]}": row[FUND_CODE] for _, row in df.iterrows()}
+    mapping_dict = get_lbu_hierarchy().hk_code_funds
     
     selected_funds = [mapping_dict[selection.replace(HK_CODE + ':', '')] for selection in selected['checked'] if HK_CODE in selection]
     
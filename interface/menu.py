@@ -1,6 +1,6 @@
 import streamlit as st
 from streamlit import session_state as ss
-from db.snowflake_streamlit import SnowflakeStreamlit
+from db.snowflake_streamlit import SnowflakeStreamlit, get_activity_writer
 from auth.authenticate import authenticate_user, add_login_name
 import inspect
 import os
@@ -58,6 +58,7 @@ def initialize():
     
     _apply_formatting()
     _initialize_snowflake()
+    _start_cache_warmer()
     authenticate_user()
     _build_nav_bar(page_name)
     add_login_name()
@@ -69,6 +70,12 @@ def _initialize_snowflake():
     
     ss.snowflake = SnowflakeStreamlit()
 
+def _start_cache_warmer():
+    # Imported here as the warm up list imports the pages, which import the interface
+    from .warm_up import start_cache_warmer
+
+    start_cache_warmer()
+
 def _apply_formatting():
     try:
         st.set_page_config(layout="wide", page_title='Stilson Dashboard', page_icon='assets/fwd_ico.png')
@@ -84,21 +91,13 @@ def log_activity(page_name):
 
     ss.page_name = page_name
 
-    sql = f"""
-        INSERT INTO supp.streamlit_activity (
-            timestamp, 
-            email, 
-            name, 
-            page
-        ) VALUES (
-            '{datetime.now(ZoneInfo('Asia/Hong_Kong')).strftime('%Y-%m-%d %H:%M:%S')}', 
-            '{ss.ST_OAUTH_EMAIL}', 
-            '{ss.nickname}', 
-            '{page_name}'
-        );
-    """
-
-    ss.snowflake.execute(sql)
+    # Queued and inserted in bulk by a background thread, the page does not wait on the warehouse
+    get_activity_writer().log(
+        datetime.now(ZoneInfo('Asia/Hong_Kong')).strftime('%Y-%m-%d %H:%M:%S'),
+        ss.ST_OAUTH_EMAIL,
+        ss.nickname,
+        page_name
+    )
 
 def _build_nav_bar(page_name: str):
     with open("assets/style.css") as css:
@@ -0,0 +1,29 @@
+import streamlit as st
+from db.cache_warmer import CacheWarmer
+from db.swr_cache import reference_client
+from db.data.data_shipment import get_funnelweb_dates
+from db.data.lbu import get_lbu_hierarchy
+from db.data.fx import get_fx_store
+from db.data.curve import get_curve_store
+from db.data.ratings import get_rating_scale
+from auth.authenticate import get_user_permissions
+from pages.activity_monitor.data import get_average_costs
+
+# Loaders warmed at start and for every new funnelweb closing date, with the arguments the pages call them with
+WARM_UP = [
+    (get_funnelweb_dates, ()),
+    (get_lbu_hierarchy, ()),
+    (get_fx_store, ()),
+    (get_curve_store, ()),
+    (get_user_permissions, ()),
+    (get_rating_scale, ()),
+    (get_average_costs, lambda latest: (latest, reference_client())),
+]
+
+@st.cache_resource(show_spinner=False)
+def start_cache_warmer() -> CacheWarmer:
+    """Start the cache warmer once per server process"""
+    return CacheWarmer(WARM_UP, _latest_closing_date)
+
+def _latest_closing_date():
+    return max(get_funnelweb_dates()).date()
@@ -2,6 +2,7 @@ import streamlit as st
 from streamlit import session_state as ss
 import pandas as pd
 from grid import AgGridBuilder
+from db.data.lbu import get_lbu_hierarchy
 
 ANALYSIS_COLUMNS = ['SAA_GROUP', 'FUND_CODE', 'FINAL_RATING_LETTER', 'COUNTRY_REPORT', 'MANAGER', 'MATURITY_RANGE', 'CURRENCY', 'L3_ASSET_TYPE']
 
@@ -144,16 +145,9 @@ def _join_saa_group(df):
     
     return df
 
-@st.cache_data(ttl=3600, show_spinner=False)
 def _build_saa_group_mapping():
     """Build mapping of fund short name to SAA group"""
-    df = ss.snowflake.query("SELECT short_name, saa_group, lbu_group FROM supp.fund f, supp.lbu l WHERE f.lbu = l.name;")
-    
-    df['SAA_GROUP'] = df.apply(lambda row: ('Shareholder' if row['LBU_GROUP'] == 'HK' else row['SHORT_NAME']) if row['SAA_GROUP'] == 'None' else row['SAA_GROUP'], axis=1)
-    
-    saa_group_dict = dict(zip(df['SHORT_NAME'], df['SAA_GROUP']))
-    
-    return saa_group_dict
+    return get_lbu_hierarchy().saa_groups
 
 def _build_analysis_columns(df):
     """Build list of columns to show in analysis grid based on assets"""
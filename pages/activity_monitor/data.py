@@ -3,6 +3,10 @@ from streamlit import session_state as ss
 import pandas as pd
 from numba import njit
 import numpy as np
+from db.streaming import filter_batches, progress_callback
+from db.conversion import categorize
+from db.sql import bind, canonical
+from db.data.fx import get_fx_store
 
 def verify_to_load():
     """Verify user selections and load data if all checks pass"""
@@ -37,14 +41,15 @@ def get_data(config, bar):
     start_date = ss.start_date
     end_date = ss.end_date
 
-    start_average_costs = _get_average_costs(start_date)
+    start_average_costs = get_average_costs(start_date)
     bar.progress(30, "Getting data...")
-    end_average_costs = _get_average_costs(end_date)
+    end_average_costs = get_average_costs(end_date)
     bar.progress(40, "Getting data...")
     
-    fund_codes = ss.selected_funds
+    # Sorted so the same funds picked in another order reuse the cached positions
+    fund_codes = canonical(ss.selected_funds)
     
-    df = _get_positions(config, start_date, end_date, start_average_costs, end_average_costs, fund_codes)
+    df = _get_positions(config, start_date, end_date, start_average_costs, end_average_costs, fund_codes, bar)
     bar.progress(60, "Getting data...")
     
     ss.previous_start_date = start_date
@@ -53,13 +58,15 @@ def get_data(config, bar):
     return df
 
 @st.cache_data(ttl=3600, show_spinner=False)
-def _get_average_costs(date):
-    """Get average costs for all positions as of a specific date"""
-    average_cost_sql = f"""
+def get_average_costs(date, _client=None):
+    """Get average costs for all positions as of a specific date, _client lets the cache warmer load it without a session"""
+    client = ss.snowflake if _client is None else _client
+    
+    average_cost_sql = bind("""
         WITH position_ids AS (
             SELECT DISTINCT position_id 
             FROM funnelweb 
-            WHERE closing_date = '{date}' AND 
+            WHERE closing_date = :date AND 
             (is_bbg_fi = true or bbg_asset_type = 'Equity')
         ), 
         first_dates AS (
@@ -73,16 +80,16 @@ def _get_average_costs(date):
         FROM funnelweb f 
         INNER JOIN first_dates fd ON f.position_id = fd.position_id 
         AND f.closing_date = fd.first_price_date;
-    """
+    """, date=date)
     
-    ac_df = ss.snowflake.query(average_cost_sql)
+    ac_df = client.query(average_cost_sql)
     first_prices = ac_df.set_index('POSITION_ID')['CLEAN_PRICE'].to_dict()
     
-    transactions_sql = f"""
+    transactions_sql = bind("""
         WITH position_ids AS (
             SELECT DISTINCT position_id 
             FROM funnelweb 
-            WHERE closing_date = '{date}' AND 
+            WHERE closing_date = :date AND 
             (is_bbg_fi = true or bbg_asset_type = 'Equity')
         ), 
         history_data AS (
@@ -99,9 +106,9 @@ def _get_average_costs(date):
         FROM history_data 
         WHERE position_change != 0 
         ORDER BY position_id, closing_date;
-    """
+    """, date=date)
     
-    t_df = ss.snowflake.query(transactions_sql)
+    t_df = client.query(transactions_sql)
         
     position_ids, position_id_map = t_df['POSITION_ID'].factorize()
     position_changes = t_df['POSITION_CHANGE'].to_numpy(dtype=np.float64)
@@ -166,23 +173,24 @@ def _compute_average_costs(position_ids, position_changes, positions, prices, fi
     return average_costs
 
 @st.cache_data(ttl=3600, show_spinner=False)
-def _get_positions(config, start_date, end_date, start_average_costs, end_average_costs, fund_codes):
+def _get_positions(config, start_date, end_date, start_average_costs, end_average_costs, fund_codes, _bar=None):
     """Get position data for start and end date, patched with average costs and other overrides"""
-    sql = _build_sql(config, start_date, end_date, fund_codes)
-    df = ss.snowflake.query(sql)
+    fx = get_fx_store()
     
-    fx_sql = f"SELECT valuation_date, fx, rate FROM supp.fx_rates WHERE valuation_date IN ('{start_date}', '{end_date}');"
-    fx_df = ss.snowflake.query(fx_sql)
+    sql = _build_sql(config, start_date, end_date, fund_codes)
+    on_progress = progress_callback(_bar, 40, 60) if _bar is not None else None
     
-    df = _patch_data(df, fx_df, start_average_costs, end_average_costs)
+    # Positions are patched batch by batch as they are streamed in
+    df = filter_batches(
+        ss.snowflake.query_batches(sql, on_progress),
+        lambda batch: _patch_data(batch, fx, start_average_costs, end_average_costs)
+    )
     
     return df
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def _build_sql(config, start_date, end_date, fund_codes):
     """Build SQL query to get position data for start and end date"""
-    fund_codes_string = "', '".join(fund_codes)
-    
     default_condition = "position * unit * IFF(mtge_factor > 0, mtge_factor, 1) * IFF(principal_factor > 0, principal_factor, 1)"
 
     notional_usd_conditions = {"fwd_asset_type = 'Accreting notes'": f"sw_rec_notl_amt / rate",
@@ -191,7 +199,7 @@ def _build_sql(config, start_date, end_date, fund_codes):
 
     notional_usd_case_sql = "CASE  \n" + '  \n'.join(f'WHEN {key} THEN {value}' for key, value in notional_usd_conditions.items()) + f"  \nELSE {default_condition} / rate" + "  \nEND AS notional_usd"
 
-    fx_rate_sql = f"WITH fx_rates AS (SELECT fx, rate FROM supp.fx_rates WHERE valuation_date = '{end_date}')"
+    fx_rate_sql = "WITH fx_rates AS (SELECT fx, rate FROM supp.fx_rates WHERE valuation_date = :end_date)"
 
     sql = f"""{fx_rate_sql}  
     SELECT {", ".join(config.IDENTIFIER_COLUMNS)},  
@@ -201,14 +209,14 @@ def _build_sql(config, start_date, end_date, fund_codes):
     {notional_usd_case_sql} 
     FROM funnel.funnelweb AS fw
     LEFT JOIN fx_rates AS f1 ON fw.currency = f1.fx
-    WHERE closing_date IN (\'{start_date}\', \'{end_date}\') 
+    WHERE closing_date IN (:dates) 
     AND bbg_asset_type != 'Repo Liability'
-    AND fund_code IN ('{fund_codes_string}')
+    AND fund_code IN (:funds)
     ORDER BY closing_date;"""
     
-    return sql
+    return bind(sql, end_date=end_date, dates=[start_date, end_date], funds=fund_codes)
 
-def _patch_data(df, fx_df, start_average_costs, end_average_costs):
+def _patch_data(df, fx, start_average_costs, end_average_costs):
     """Patch data with average costs, FX rates, and other overrides"""
     # Change date to string
     df['CLOSING_DATE'] = pd.to_datetime(df['CLOSING_DATE']).dt.strftime('%Y-%m-%d')
@@ -246,15 +254,9 @@ def _patch_data(df, fx_df, start_average_costs, end_average_costs):
     derivs = ['Multi-Leg Deal', 'Foreign Exchange Forward', 'Non Deliverable Swap', 'OIS Swap', 'Amort. Swap']
     deriv_mask = df['BBG_ASSET_TYPE'].isin(derivs) & (df['CLOSING_DATE'] == ss.start_date_string)
 
-    fx_start = fx_df[fx_df['VALUATION_DATE'] == ss.start_date_string].set_index('FX')['RATE'].to_dict()
-    fx_end = fx_df[fx_df['VALUATION_DATE'] == ss.end_date_string].set_index('FX')['RATE'].to_dict()
-
-    def get_fx_rate(currency):
-        return fx_start.get(currency, 1), fx_end.get(currency, 1)
-
-    fx_rates = df.loc[deriv_mask, 'SW_REC_CRNCY'].apply(lambda c: get_fx_rate(c))
-    start_rates = fx_rates.apply(lambda x: x[0])
-    end_rates = fx_rates.apply(lambda x: x[1])
+    currencies = df.loc[deriv_mask, 'SW_REC_CRNCY']
+    start_rates = fx.rates(currencies, ss.start_date_string, default=1)
+    end_rates = fx.rates(currencies, ss.end_date_string, default=1)
 
     df.loc[deriv_mask, 'NOTIONAL_USD'] = (
         df.loc[deriv_mask, 'NOTIONAL_USD'] * start_rates / end_rates
@@ -276,4 +278,5 @@ def _patch_data(df, fx_df, start_average_costs, end_average_costs):
     # Merge PineBridge custodies
     df['MANAGER'] = np.where(df['MANAGER'].str.contains('Pinebridge', na=False), 'Pinebridge', df['MANAGER'])
 
-    return df
\ No newline at end of file
+    # Encode once the labels are final, the frame is cached for both dates
+    return categorize(df)
\ No newline at end of file
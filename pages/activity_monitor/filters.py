@@ -1,13 +1,13 @@
 import streamlit as st
 from streamlit import session_state as ss
-from db.data.data_shipment import get_funnelweb_dates
+from db.data.data_shipment import get_valuation_calendar
 from interface.filters import build_date_filter_pills, build_lbu_filter, build_multi_select_filter
 
 def build_filters(config):
     with st.expander('Filters', True):
         #region Date Filters
         
-        dates = get_funnelweb_dates()
+        dates = get_valuation_calendar()
         
         build_date_filter_pills('Valuation Date', dates, key='selected_date')
         ss.end_date = ss['selected_date']
@@ -22,8 +22,8 @@ def _build_grid(df, selected_columns, selected_values, transaction_columns, tran
         for column in selected_values[date]:
             value_columns.append(column['field'])
     
-    grid_df = df.groupby(selected_columns)[value_columns + [item for sublist in transaction_column_headers.values() for item in sublist]].sum().reset_index()
-    total_df = grid_df.groupby('FWD_ASSET_TYPE')[value_columns + [item for sublist in transaction_column_headers.values() for item in sublist]].sum().reset_index()
+    grid_df = df.groupby(selected_columns, observed=True)[value_columns + [item for sublist in transaction_column_headers.values() for item in sublist]].sum().reset_index()
+    total_df = grid_df.groupby('FWD_ASSET_TYPE', observed=True)[value_columns + [item for sublist in transaction_column_headers.values() for item in sublist]].sum().reset_index()
     total_df['LBU_GROUP'] = 'Total'
     
     grid_df = pd.concat([grid_df, total_df], axis=0)
@@ -1,7 +1,8 @@
 import streamlit as st
 from streamlit import session_state as ss
 import pandas as pd
-from db.data.fx import get_fx_rate
+from db.data.fx import get_fx_store
+from db.sql import bind
 from utils.download import create_download_button
 
 def verify_and_load_data():
@@ -47,12 +48,9 @@ def _get_data():
     
 @st.cache_data(ttl=3600, show_spinner=False)
 def _get_asset_allocation_data(current_date, comparison_date):
-    current_date_string = current_date.strftime('%Y-%m-%d')
-    comparison_date_string = comparison_date.strftime('%Y-%m-%d')
+    sql = bind("SELECT * FROM asset_allocation_new WHERE closing_date IN (:dates);", dates=[current_date, comparison_date])
     
-    sql = f"SELECT * FROM asset_allocation_new WHERE closing_date IN ('{current_date_string}', '{comparison_date_string}');"
-    
-    df = ss.snowflake.query(sql)
+    df = ss.snowflake.query(sql, closing_dates=[current_date, comparison_date])
         
     return df
 
@@ -162,8 +160,9 @@ def process_data(df):
     comparison_date = ss.selected_comparison_date
     level = float(ss.selected_level)
     currency = ss.selected_currency
-    current_fx_rate = get_fx_rate(currency, current_date)
-    comparison_fx_rate = get_fx_rate(currency, comparison_date)
+    fx = get_fx_store()
+    current_fx_rate = fx.rate(currency, current_date)
+    comparison_fx_rate = fx.rate(currency, comparison_date)
     
     # Process data in steps
     df = filter_and_group_data(df, current_date, comparison_date, level)
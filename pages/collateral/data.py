@@ -1,9 +1,12 @@
 import streamlit as st
 from streamlit import session_state as ss
 import pandas as pd
+import numpy as np
 
 from db.data.data_shipment import get_funnelweb_dates, get_hk_code_dict
-from db.data.ratings import get_ratings_mapping
+from db.data.ratings import get_rating_scale, UNRATED
+from db.swr_cache import stale_while_revalidate, reference_client
+from db.sql import bind
 from .ratings import convert_csa_valuation_ratings
 from .custom import add_functions_to_config
 
@@ -35,9 +38,9 @@ def get_data(config):
     
     df = df[df['FUND_CODE'].isin(ss.get('selected_funds'))].reset_index(drop=True)
 
-    agency_mappings = config.AGENCY_MAPPINGS = get_ratings_mapping(list(config.AGENCIES.keys()))
+    scale = config.RATING_SCALE = get_rating_scale()
     
-    config.CSA_VALUATIONS = convert_csa_valuation_ratings(config.CSA_VALUATIONS, agency_mappings, config.AGENCIES)
+    config.CSA_VALUATIONS = convert_csa_valuation_ratings(config.CSA_VALUATIONS, scale, config.AGENCIES)
     
     return config, df
 
@@ -57,7 +60,7 @@ def calculate_haircuts(config, fw_df):
     eligible_asset_types = config.ELIGIBLE_ASSET_TYPES
     custom_functions = config.CUSTOM_FUNCTIONS
     agencies = config.AGENCIES
-    agency_mappings = config.AGENCY_MAPPINGS
+    scale = config.RATING_SCALE
         
     fw_df = fw_df[fw_df['FUND_CODE'].isin(csa_funds_mapped['FUND_CODE'].unique().tolist())].reset_index(drop=True)
     fw_df['ASSET_TYPE'] = None
@@ -97,7 +100,7 @@ def calculate_haircuts(config, fw_df):
                         break
                 
                 asset_type_valuations = eligible_valuations[eligible_valuations['ASSET_TYPE'] == asset_type]
-                asset_type_df = _add_haircut_valuations(asset_type_valuations, asset_type_df, agencies, agency_mappings, column_name)
+                asset_type_df = _add_haircut_valuations(asset_type_valuations, asset_type_df, agencies, scale, column_name)
                 asset_type_df = asset_type_df[asset_type_df[column_name] != 0]
                 asset_type_df['ASSET_TYPE'] = asset_type
                 csa_df = pd.concat([csa_df, asset_type_df])
@@ -167,73 +170,44 @@ def _filter_dataframe_by_logics(df, logic_details, csa, custom_functions):
         
     return df
 
-def _add_haircut_valuations(valuation_logic, df, agencies, agency_mappings, cp):
-    agency_mapping = agency_mappings['S&P']
+def _add_haircut_valuations(valuation_logic, df, agencies, scale, cp):
+    tenors = df['TIME_UNTIL_MATURITY'].fillna(0).to_numpy(dtype=float)
     
-    for index, row in df.iterrows():
-        tenor = row['TIME_UNTIL_MATURITY']
+    # Ladder index of each security per agency, the security rating falls back to the issuer rating and ratings
+    # missing from the scale never pass a rating bound. Funnelweb holds every agency's ratings in S&P notation, only
+    # the CSA bounds are in each agency's own notation
+    rating_indexes = {}
+    
+    for column_name in agencies.values():
+        rating = scale.to_index(df[f'FINAL_{column_name}_RATING'], 'S&P', unknown=np.inf)
+        issuer_rating = scale.to_index(df[f'FINAL_{column_name}_ISSUER_RATING'], 'S&P', unknown=np.inf)
+        rating_indexes[column_name] = np.where(np.isnan(rating), issuer_rating, rating)
+    
+    percentages = df[cp].to_numpy(dtype=float).copy()
+    matched = np.zeros(len(df), dtype=bool)
+    
+    # The first valuation rule a security satisfies sets its haircut
+    for _, logic in valuation_logic.iterrows():
+        tenor_upper = logic['TENOR_UPPER']
+        match = ~matched & (tenors >= logic['TENOR_LOWER']) & ((tenor_upper == -1) | (tenors <= tenor_upper))
         
-        if pd.isna(tenor):
-            tenor = 0
-                    
-        for _, logic in valuation_logic.iterrows():
-            tenor_lower = logic['TENOR_LOWER']
-            tenor_upper = logic['TENOR_UPPER']
+        for column_name, indexes in rating_indexes.items():
+            rating_lower = logic[f'{column_name}_LOWER']
+            rating_upper = logic[f'{column_name}_UPPER']
             
-            lower_tenor = tenor < tenor_lower
-            higher_tenor = tenor > tenor_upper and tenor_upper != -1
-            
-            if lower_tenor or higher_tenor:
+            if rating_lower in UNRATED or rating_upper in UNRATED:
                 continue
             
-            rating_match = True
-            
-            for _, column_name in agencies.items():
-                #agency_columns = [item for item in list(eligible_valuations.columns) if agencies[agency] in item]
-                
-                columns = [f'FINAL_{column_name}_RATING', f'FINAL_{column_name}_ISSUER_RATING']
-                
-                rating_lower = logic[f'{column_name}_LOWER']
-                rating_upper = logic[f'{column_name}_UPPER']
-                
-                if rating_lower == '' or rating_upper == '':
-                    continue
-                
-                rating_lower = int(rating_lower)
-                rating_upper = int(rating_upper)
-
-                for column in columns:
-                    value = row[column]
-                    
-                    if value == None or value == 'None':
-                        continue
-                    
-                    rating_index = agency_mapping[value]
-
-                    if rating_index > rating_lower:
-                        rating_match = False
-
-                    break
-            
-            if not rating_match:
-                continue
-
-            df.loc[index, cp] = logic['PERCENTAGE']
-            break
+            # Unrated securities are not held to the agency's bound
+            match &= ~(indexes > int(rating_lower))
         
-    return df
-
-def get_csa_data(config):
-    config.CSA_FUNDS_MAPPED = _get_csa_funds_mapped()
-    config.CSA_DETAILS = _get_csa_details()
-    config.CSA_LOGICS = _get_csa_logics()
-    config.CSA_VALUATIONS = _get_csa_valuations()
+        percentages[match] = logic['PERCENTAGE']
+        matched |= match
     
-    return config
+    return df.assign(**{cp: percentages})
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_csa_funds_mapped():
-    sql = """
+CSA_QUERIES = {
+    'CSA_FUNDS_MAPPED': """
         SELECT 
             csa_id, 
             code, 
@@ -245,14 +219,8 @@ def _get_csa_funds_mapped():
         WHERE 
             d.fund_group_id = g.id 
             AND m.fund_group_id = g.id;
-    """
-    csa_funds_mapped = ss.snowflake.query(sql)
-    
-    return csa_funds_mapped
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_csa_details():
-    sql = """
+    """,
+    'CSA_DETAILS': """
         WITH max_dates AS (
             SELECT 
                 entity_id, 
@@ -282,14 +250,8 @@ def _get_csa_details():
             AND m.cp_id = c.cp_id 
             AND c.effective_date = max_effective_date 
             AND c.entity_id = f.id;
-    """
-    csa_details = ss.snowflake.query(sql)
-    
-    return csa_details
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_csa_logics():
-    sql = """
+    """,
+    'CSA_LOGICS': """
         SELECT 
             csa_id, 
             asset_type, 
@@ -299,14 +261,8 @@ def _get_csa_logics():
             value 
         FROM 
             collateral.collateral_logic;
-    """
-    csa_logics = ss.snowflake.query(sql)
-    
-    return csa_logics
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_csa_valuations():
-    sql = """
+    """,
+    'CSA_VALUATIONS': """
         SELECT 
             csa_id, 
             asset_type, 
@@ -322,9 +278,22 @@ def _get_csa_valuations():
         FROM 
             collateral.valuation_percentages;
     """
-    csa_valuations = ss.snowflake.query(sql)
+}
+
+def get_csa_data(config):
+    tables = _get_csa_tables()
+    
+    config.CSA_FUNDS_MAPPED = tables['CSA_FUNDS_MAPPED']
+    config.CSA_DETAILS = tables['CSA_DETAILS']
+    config.CSA_LOGICS = tables['CSA_LOGICS']
+    config.CSA_VALUATIONS = tables['CSA_VALUATIONS']
     
-    return csa_valuations
+    return config
+
+@stale_while_revalidate()
+def _get_csa_tables():
+    # The CSA tables are independent so they are fetched in parallel
+    return reference_client().query_many(CSA_QUERIES)
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def get_funnelweb_data(date, config):
@@ -344,9 +313,9 @@ def get_funnelweb_data(date, config):
         FROM 
             funnelweb 
         WHERE 
-            closing_date = '{date.strftime('%Y-%m-%d')}' 
+            closing_date = :date 
             AND lbu_group = 'HK';
     """
-    df = ss.snowflake.query(sql)
+    df = ss.snowflake.query(bind(sql, date=date), closing_dates=[date])
 
     return df
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
 from grid import AgGridBuilder
+from db.data.ratings import UNRATED
 
 def build_grid(config, df):
     _build_valuations_grid(config)
@@ -10,13 +11,12 @@ def build_grid(config, df):
 def _build_valuations_grid(config):
     df = config.CSA_VALUATIONS
     
-    agency_mappings = config.AGENCY_MAPPINGS
-    agency_mapping = {v: k for k, v in agency_mappings['S&P'].items()}
+    scale = config.RATING_SCALE
     agencies = config.AGENCIES
     
-    for agency in agencies.values():
-        df[f'{agency}_LOWER'] = df[f'{agency}_LOWER'].map(agency_mapping)
-        df[f'{agency}_UPPER'] = df[f'{agency}_UPPER'].map(agency_mapping)
+    for agency, column_name in agencies.items():
+        for column in [f'{column_name}_LOWER', f'{column_name}_UPPER']:
+            df[column] = scale.to_rating(df[column].where(~df[column].isin(UNRATED)), agency)
         
     csa_details = config.CSA_DETAILS
     csa_mapping = {row['ID']: row['NAME'] for _, row in csa_details.iterrows()}
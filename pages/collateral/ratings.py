@@ -1,14 +1,21 @@
-def convert_csa_valuation_ratings(csa_valuations, agencies, agency_names):
-    agency_columns = {agency: [item for item in list(csa_valuations.columns) if agency_names[agency] in item] for agency in agencies.keys()}
-    
-    for index, row in csa_valuations.iterrows():
-        for agency, mapping in agencies.items():
-            columns = agency_columns[agency]
+import streamlit as st
+import pandas as pd
+from db.data.ratings import UNRATED
+
+def convert_csa_valuation_ratings(csa_valuations, scale, agency_names):
+    for agency, name in agency_names.items():
+        columns = [item for item in list(csa_valuations.columns) if name in item]
+        
+        for column in columns:
+            rated = ~csa_valuations[column].isin(UNRATED)
+            indexes = scale.to_index(csa_valuations.loc[rated, column], agency)
+            unknown = csa_valuations.loc[rated, column][pd.isna(indexes)]
+            
+            if len(unknown) > 0:
+                st.error(f"Unknown {agency} ratings in the valuation logic: {', '.join(unknown.unique())}!")
+                st.stop()
             
-            for column in columns:
-                if row[column] == '':
-                    continue
-                
-                csa_valuations.loc[index, column] = agencies[agency][row[column]]
+            csa_valuations[column] = csa_valuations[column].astype(object)
+            csa_valuations.loc[rated, column] = indexes.astype(int)
     
     return csa_valuations
\ No newline at end of file
@@ -1,6 +1,7 @@
 import streamlit as st
 from interface import initialize
 from pages.collateral import build_filters, verify_to_load, get_data, calculate_haircuts, build_grid
+from db.data.ratings import RATING_AGENCIES
 
 class CollateralCalculatorConfig:
     REPORT_FIELDS = [
@@ -23,8 +24,8 @@ class CollateralCalculatorConfig:
     ELIGIBLE_ASSET_TYPES = {'Cash': 'Cash', 'JGB': 'Government Bond', 'UST': 'Treasury', 'HKGB': 'Government Bond', 'Corporate Bonds': 'Corporate Bond'}
     CUSTOM_FUNCTIONS = {}
     
-    AGENCIES = {'S&P': 'SP', 'Moodys': 'MOODYS', 'Fitch': 'FITCH'}
-    AGENCY_MAPPINGS = None
+    AGENCIES = RATING_AGENCIES
+    RATING_SCALE = None
     
     CSA_FUNDS_MAPPED = None
     CSA_DETAILS = None
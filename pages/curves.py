@@ -1,5 +1,5 @@
 from interface import initialize
-from pages.curves import build_filters, build_spot_chart, build_forward_grid
+from pages.curves import build_filters, build_spot_chart, build_history_chart, build_forward_grid
 
 initialize()
 
@@ -7,4 +7,6 @@ build_filters()
 
 build_spot_chart()
 
+build_history_chart()
+
 build_forward_grid()
\ No newline at end of file
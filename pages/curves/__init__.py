@@ -1,3 +1,3 @@
 from .filters import build_filters
-from .chart import build_spot_chart
+from .chart import build_spot_chart, build_history_chart
 from .grid import build_forward_grid
\ No newline at end of file
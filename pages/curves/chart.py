@@ -1,9 +1,11 @@
 import streamlit as st
 from streamlit import session_state as ss
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
-from .data import convert_tenors_to_float, build_spot_df
 from utils.download import create_download_button
+from db.data.curve import get_curve_store
+from .history import calculate_history, RATE, SPREAD
 
 def build_spot_chart():
     if ss.selected_mode != 'Spot':
@@ -13,16 +15,21 @@ def build_spot_chart():
     
     if len(selected_curves) == 0:
         return
+    
+    store = get_curve_store()
+    names = list(selected_curves.keys())
+    curve_dates = list(selected_curves.values())
+    
+    # Every curve on the tenors of the store, tenors no selected curve reaches are left out
+    rates = store.on_grid(curve_dates)
+    available = ~np.isnan(rates).all(axis=0)
+    rates = rates[:, available]
+    tenors = store.years[available]
         
     fig = go.Figure()
-    chart_df = pd.DataFrame(columns=['CURVE', 'VALUATION_DATE', 'TENOR', 'RATE'])
-        
-    for name, df in selected_curves.items():
-        values, tenors, rates = build_spot_df(df)
-
-        chart_df = pd.concat([chart_df.astype(values.dtypes), values.astype(df.dtypes)], ignore_index=True)
-        
-        fig.add_trace(go.Scatter(x=tenors, y=rates, mode='lines+markers', name=name))
+    
+    for name, curve_rates in zip(names, rates):
+        fig.add_trace(go.Scatter(x=tenors, y=curve_rates, mode='lines+markers', name=name))
     
     fig.update_layout(
                 title='Yield Curve',
@@ -41,4 +48,55 @@ def build_spot_chart():
 
     st.plotly_chart(fig)
     
-    create_download_button(chart_df, 'curve_spot_rates', 'curve_spot_rates', 'Curve Data')
\ No newline at end of file
+    chart_df = pd.DataFrame({
+        'CURVE': np.repeat([curve for curve, _ in curve_dates], len(tenors)),
+        'VALUATION_DATE': np.repeat([valuation_date for _, valuation_date in curve_dates], len(tenors)),
+        'TENOR': np.tile(tenors, len(curve_dates)),
+        'RATE': rates.ravel()
+    }).dropna(subset=['RATE'])
+    
+    create_download_button(chart_df, 'curve_spot_rates', 'curve_spot_rates', 'Curve Data')
+    
+def build_history_chart():
+    if ss.selected_mode != 'History':
+        return
+    
+    curves = ss.history_curves
+    tenors = ss.history_tenors
+    measure = ss.history_measure or RATE
+    change = ss.history_change or 'Level'
+    
+    if len(curves) == 0 or len(tenors) == 0:
+        return
+    
+    if measure == SPREAD and len(curves) < 2:
+        st.info('Select at least two curves, the spreads are taken over the first one.')
+        return
+    
+    history_df = calculate_history(get_curve_store(), curves, tenors, measure, change)
+    
+    fig = go.Figure()
+    
+    for column in history_df.columns:
+        fig.add_trace(go.Scattergl(x=history_df.index, y=history_df[column], mode='lines', name=column, connectgaps=True))
+    
+    unit = 'Zero Coupon Rate (Continuous) (%)' if measure == RATE else 'Spread (bps)'
+    
+    fig.update_layout(
+                title='Curve History' if change == 'Level' else f'Curve History ({change} Change)',
+                xaxis_title='Valuation Date',
+                yaxis_title=unit if change == 'Level' else f'{change} Change in {unit}',
+                template='plotly_dark',
+                showlegend=True,
+                legend=dict(
+                    orientation='h',
+                    y=-0.2,
+                    x=0.5,
+                    xanchor='center',
+                    yanchor='top'
+                )
+            )
+
+    st.plotly_chart(fig)
+    
+    create_download_button(history_df.reset_index(names='VALUATION_DATE'), 'curve_history', 'curve_history', 'Curve History')
\ No newline at end of file
@@ -1,28 +1,27 @@
 import streamlit as st
 from streamlit import session_state as ss
-import pandas as pd
-from db.data.curve import get_curves
+from db.data.curve import get_curve_store
 from interface.filters import build_date_filter
+from utils.curve import INTERPOLATION_METHODS, LINEAR_ZERO, convert_floats_to_tenor
+from .history import MEASURES, RATE, CHANGES
 
 def build_filters():
     with st.expander('Filters', True):
         build_curve_filters()
         
 def build_curve_filters():
-    df = get_curves()
+    store = get_curve_store()
     
-    unique_fx = df['FX'].unique().tolist()
+    unique_fx = store.currencies()
     selected_fx = st.selectbox('Currency', unique_fx, key='selected_currency', index=unique_fx.index('USD'))
     
-    curves = df[df['FX'] == selected_fx]['CURVE'].unique().tolist()
+    curves = store.curves_for(selected_fx)
     
     govt_index = next((i for i, curve in enumerate(curves) if '_govt' in curve), 0)
     selected_curve = st.selectbox('Curve', curves, key='selected_curve', index=govt_index)
     
-    dates = df[(df['FX'] == selected_fx) & (df['CURVE'] == selected_curve)]['VALUATION_DATE'].unique().tolist()
+    dates = store.dates_for(selected_curve)
     selected_date = build_date_filter('Valuation Date', dates, key='selected_date', default=max(dates))
-    
-    df['VALUATION_DATE'] = pd.to_datetime(df['VALUATION_DATE']).dt.date
         
     if 'selected_curves' not in st.session_state:
         st.session_state['selected_curves'] = {}
@@ -30,21 +29,31 @@ def build_curve_filters():
         st.session_state['selected_curve_forward'] = None
     
     selection = st.segmented_control(
-        options=['Spot', 'Forward'],
+        options=['Spot', 'Forward', 'History'],
         key='selected_mode',
         label='Mode',
         selection_mode='single',
         default='Spot'
     )
     
+    if selection == 'Forward':
+        st.segmented_control('Interpolation', INTERPOLATION_METHODS, key='forward_interpolation', default=LINEAR_ZERO)
+    elif selection == 'History':
+        build_history_filters(store, selected_curve)
+    
     if selection == 'Spot' and st.button('Add'):        
         key = f'{selected_curve} {selected_date}'
         
         if key not in st.session_state['selected_curves'].keys():
-            curve_df = ss['curve_data'] = df[(df['FX'] == selected_fx) & (df['CURVE'] == selected_curve) & (df['VALUATION_DATE'] == ss['selected_date'])].copy()
-            curve_df = curve_df[['CURVE', 'VALUATION_DATE', 'TENOR', 'RATE']].reset_index(drop=True)
-            st.session_state['selected_curves'][key] = curve_df
+            st.session_state['selected_curves'][key] = (selected_curve, ss['selected_date'])
     elif selection == 'Forward' and st.button('Select'):
-        curve_df = df[(df['FX'] == selected_fx) & (df['CURVE'] == selected_curve) & (df['VALUATION_DATE'] == ss['selected_date'])].copy()
-        curve_df = curve_df[['CURVE', 'VALUATION_DATE', 'TENOR', 'RATE']].reset_index(drop=True)
-        ss.selected_curve_forward = curve_df
\ No newline at end of file
+        ss.selected_curve_forward = store.curve(selected_curve, ss['selected_date'])
+
+def build_history_filters(store, selected_curve):
+    tenor_names = dict(zip(store.tenors, convert_floats_to_tenor(store.years.tolist())))
+    default_tenors = [tenor for tenor in ['2', '10'] if tenor in tenor_names] or list(tenor_names)[:1]
+    
+    st.multiselect('Curves', list(store.curves), default=[selected_curve], key='history_curves')
+    st.multiselect('Tenors', list(tenor_names), default=default_tenors, key='history_tenors', format_func=tenor_names.get)
+    st.segmented_control('Measure', MEASURES, key='history_measure', default=RATE)
+    st.segmented_control('Change', list(CHANGES), key='history_change', default='Level')
\ No newline at end of file
@@ -1,33 +1,23 @@
 from .data import build_spot_df
+import numpy as np
 import pandas as pd
-from utils.curve import calculate_forward_rates_for_tenor, convert_floats_to_tenor
+from utils.curve import calculate_forward_matrix, convert_floats_to_tenor, LINEAR_ZERO
 
 DISPLAY_TENORS = [0, 0.25, 0.5, 1, 2, 3, 4, 5, 7, 10, 15, 20, 25, 30]
 
-def calculate_forward_rates(df):
+def calculate_forward_rates(df, method=LINEAR_ZERO):
     _, tenors, rates = build_spot_df(df)
-    tenor_rates = dict(zip(tenors, rates))
-    tenor_rates_forward = {}
+    starts = [tenor for tenor in DISPLAY_TENORS if tenor > 0]
 
-    for tenor in tenor_rates.keys():
-        if tenor == 0 or tenor > max(DISPLAY_TENORS):
-            continue
+    forwards = calculate_forward_matrix(np.array(tenors), np.array(rates), starts, DISPLAY_TENORS, method, max(DISPLAY_TENORS))
+    tenor_rates_forward = pd.DataFrame(forwards, index=starts, columns=DISPLAY_TENORS)
 
-        forward_rates = calculate_forward_rates_for_tenor(tenor, tenors, tenor_rates, DISPLAY_TENORS)
-        tenor_rates_forward[str(tenor)] = forward_rates
-        
     return tenor_rates_forward
 
 def format_forward_rates(tenor_rates_forward):
-    grid_df = pd.DataFrame.from_dict(tenor_rates_forward, orient='index').reset_index()
+    grid_df = tenor_rates_forward.dropna(axis=1, how='all')
 
-    tenor_columns = [float(col) for col in grid_df.columns if col != 'index']
-    tenor_dict = dict(zip(tenor_columns, convert_floats_to_tenor(tenor_columns)))
-    tenor_dict['index'] = 'Forward \\ Tenor'
+    grid_df.columns = convert_floats_to_tenor([float(col) for col in grid_df.columns])
+    grid_df.insert(0, 'Forward \\ Tenor', convert_floats_to_tenor([float(tenor) for tenor in grid_df.index]))
 
-    grid_df = grid_df.rename(columns=tenor_dict)
-    grid_df['Forward \\ Tenor'] = convert_floats_to_tenor(
-        [float(tenor) for tenor in grid_df['Forward \\ Tenor']]
-    )
-
-    return grid_df
\ No newline at end of file
+    return grid_df.reset_index(drop=True)
@@ -1,6 +1,7 @@
 import streamlit as st
 from streamlit import session_state as ss
 from grid import AgGridBuilder
+from utils.curve import LINEAR_ZERO
 from .forward import calculate_forward_rates, format_forward_rates
 
 def build_forward_grid():
@@ -8,8 +9,8 @@ def build_forward_grid():
         return
 
     df = ss.selected_curve_forward
-    forward_dict = calculate_forward_rates(df)
-    grid_df = format_forward_rates(forward_dict)
+    forward_df = calculate_forward_rates(df, ss.get('forward_interpolation') or LINEAR_ZERO)
+    grid_df = format_forward_rates(forward_df)
 
     grid = AgGridBuilder(grid_df)
     grid.add_columns(
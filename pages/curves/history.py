@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from db.data.curve import CurveStore
+from utils.curve import convert_floats_to_tenor
+
+RATE = 'Rate'
+SPREAD = 'Spread'
+MEASURES = [RATE, SPREAD]
+
+# Offsets of the rolling changes, None for the level itself and 1D for the previous valuation date
+CHANGES = {'Level': None, '1D': None, '1W': pd.DateOffset(weeks=1), '1M': pd.DateOffset(months=1)}
+
+def calculate_history(store: CurveStore, curve_names: list[str], tenors: list[str], measure: str = RATE, change: str = 'Level') -> pd.DataFrame:
+    """
+    Tenor rates of the curves, or their spreads over the first curve in bps, on every valuation date.
+
+    Returns:
+        pd.DataFrame: One '<curve> <tenor>' column per series indexed by valuation date, dates without any value are
+        left out.
+    """
+    values = store.history(curve_names, tenors)
+    tenor_names = convert_floats_to_tenor(store.years[store.tenors.get_indexer(tenors)].tolist())
+
+    if measure == SPREAD:
+        values = (values[:, 1:] - values[:, :1]) * 100
+        curve_names = [f'{curve_name} - {curve_names[0]}' for curve_name in curve_names[1:]]
+
+    if change != 'Level':
+        # Changes are taken against the latest rate on or before the lagged date, the curves are not all quoted every day
+        filled = pd.DataFrame(values.reshape(len(values), -1)).ffill().to_numpy().reshape(values.shape)
+        padded = np.concatenate([filled, np.full((1,) + values.shape[1:], np.nan)])
+        values = values - padded[_lag_rows(store.dates, change)]
+
+    columns = [f'{curve_name} {tenor_name}' for curve_name in curve_names for tenor_name in tenor_names]
+    history_df = pd.DataFrame(values.reshape(len(store.dates), -1), index=store.dates, columns=columns)
+
+    return history_df.dropna(how='all')
+
+def _lag_rows(dates: pd.DatetimeIndex, change: str) -> np.ndarray:
+    """Row of the valuation date each change is taken against, rows without an earlier date point at a NaN row"""
+    if CHANGES[change] is None:
+        rows = np.arange(len(dates)) - 1
+    else:
+        rows = np.searchsorted(dates, dates - CHANGES[change], side='right') - 1
+
+    # Index -1 would wrap around to the last date, point at the NaN row padded after the last date instead
+    return np.where(rows >= 0, rows, len(dates))
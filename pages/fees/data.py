@@ -3,27 +3,39 @@ from streamlit import session_state as ss
 import pandas as pd
 from auth.authenticate import get_user_permissions
 import json
+from db.streaming import aggregate_batches
+from db.conversion import categorize
+from db.sql import bind, canonical
+from db.swr_cache import stale_while_revalidate, reference_client
+
+# Columns the fee calculation groups positions by, NET_MV is summed over them
+POSITION_GROUP_COLUMNS = ['CLOSING_DATE', 'LBU_CODE', 'FUND_CODE', 'MANAGER', 'FWD_ASSET_TYPE', 'L1_ASSET_TYPE', 'DEVELOPED_COUNTRY', 'BBGID_V2']
+
+# Part of the disk cache key of the aggregated positions, bump it whenever _filter_data changes
+FEES_POSITIONS_VERSION = 1
 
 # Get Positions
 def get_data():
     selected_dates = ss.selected_dates
     
-    df = _get_positions(selected_dates)
-    
-    df = _filter_data(df)
+    df = _get_positions(canonical(selected_dates))
     
     return df
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def _get_positions(selected_dates):
-    selected_dates_string = "', '".join([date.strftime('%Y-%m-%d') for date in selected_dates])
-    
-    sql = f"""SELECT closing_date, position_id, lbu_group, lbu_code, fund_code, manager, fwd_asset_type, bbg_asset_type, l1_asset_type, security_name, net_mv, first_acquired_date, is_ig, currency, fx_rate, bbgid_v2, ytm, developed_country, coll_typ   
+    sql = bind("""SELECT closing_date, lbu_code, fund_code, manager, fwd_asset_type, bbg_asset_type, l1_asset_type, net_mv, bbgid_v2, developed_country, coll_typ   
             FROM funnel.funnelweb 
-            WHERE closing_date IN ('{selected_dates_string}') 
-            ORDER BY closing_date"""
-            
-    df = ss.snowflake.query(sql)
+            WHERE closing_date IN (:dates) 
+            ORDER BY closing_date""", dates=selected_dates)
+    
+    # Patch each batch as it arrives and only keep the MV per group needed by the fee calculation
+    def load():
+        batches = (_filter_data(batch) for batch in ss.snowflake.query_batches(sql))
+        return categorize(aggregate_batches(batches, POSITION_GROUP_COLUMNS, ['NET_MV']))
+    
+    # Past month ends never change so the aggregate is kept on disk across restarts
+    df = ss.snowflake.persist(f'fees positions v{FEES_POSITIONS_VERSION} {",".join(POSITION_GROUP_COLUMNS)} {sql}', selected_dates, load)
         
     return df
 
@@ -60,56 +72,11 @@ def _filter_data(df):
     return df
 
 # Get Fee Data
-def get_fee_data(config):
-    config.CALC_MODES, config.CALC_MODES_ID = _get_calc_modes()
-    config.MV_MODES, config.MV_MODES_ID = _get_mv_modes()
-    config.MANAGERS, config.MANAGERS_ID, config.MANAGERS_MV_MODES = _get_managers()
-    config.USER_DICT, config.USER_DICT_ID = _get_users()
-    config.FEE_GROUPS = _get_ima_fees()
-    config.FEE_DETAILS = _get_ima_fees_details()
-    config.CUSTOM_MANAGER_DATA = _get_custom_manager_data()
-    
-    return config
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_calc_modes():
-    sql = 'SELECT id, mode FROM fees.calc_mode;'
-    df = ss.snowflake.query(sql)
-    mode_dict = dict(zip(df['ID'], df['MODE']))
-    mode_id_dict = dict(zip(df['MODE'], df['ID']))
-    
-    return mode_dict, mode_id_dict
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_mv_modes():
-    sql = 'SELECT id, mode FROM fees.mv_mode;'
-    df = ss.snowflake.query(sql)
-    mode_dict = dict(zip(df['ID'], df['MODE']))
-    mode_id_dict = dict(zip(df['MODE'], df['ID']))
-    
-    return mode_dict, mode_id_dict
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_managers():
-    sql = 'SELECT id, name, mv_mode_id FROM supp.manager_group;'
-    df = ss.snowflake.query(sql)
-    manager_dict = dict(zip(df['ID'], df['NAME']))
-    manager_id_dict = dict(zip(df['NAME'], df['ID']))
-    manager_mv_dict = dict(zip(df['ID'], df['MV_MODE_ID']))
-    
-    return manager_dict, manager_id_dict, manager_mv_dict
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_users():
-    df = get_user_permissions()
-    user_dict = dict(zip(df['ID'], df['EMAIL']))
-    user_id_dict = dict(zip(df['EMAIL'], df['ID']))
-    
-    return user_dict, user_id_dict
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_ima_fees():
-    sql = """
+FEE_QUERIES = {
+    'CALC_MODES': 'SELECT id, mode FROM fees.calc_mode;',
+    'MV_MODES': 'SELECT id, mode FROM fees.mv_mode;',
+    'MANAGERS': 'SELECT id, name, mv_mode_id FROM supp.manager_group;',
+    'FEE_GROUPS': """
     WITH max_date AS (
         SELECT 
             lbu_code, 
@@ -137,24 +104,49 @@ def _get_ima_fees():
         f.lbu_code = m.lbu_code 
         AND f.manager_id = m.manager_id 
         AND effective_date = max_eff_date;
-    """
-    df = ss.snowflake.query(sql)
+    """,
+    'FEE_DETAILS': 'SELECT id, fee_id, fee_bps, calc_mode_id, calc_mode_args, created_at, created_by_id FROM fees.ima_fees_bps;',
+    'CUSTOM_MANAGER_DATA': 'SELECT manager_id, category, value, value2, created_at, created_by_id FROM fees.custom_fees;'
+}
+
+def get_fee_data(config):
+    tables = _get_fee_tables()
     
-    return df
+    config.CALC_MODES, config.CALC_MODES_ID = _get_modes(tables['CALC_MODES'])
+    config.MV_MODES, config.MV_MODES_ID = _get_modes(tables['MV_MODES'])
+    config.MANAGERS, config.MANAGERS_ID, config.MANAGERS_MV_MODES = _get_managers(tables['MANAGERS'])
+    config.USER_DICT, config.USER_DICT_ID = _get_users()
+    config.FEE_GROUPS = tables['FEE_GROUPS']
+    config.FEE_DETAILS = tables['FEE_DETAILS']
+    config.CUSTOM_MANAGER_DATA = tables['CUSTOM_MANAGER_DATA']
+    
+    return config
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def _get_ima_fees_details():
-    sql = 'SELECT id, fee_id, fee_bps, calc_mode_id, calc_mode_args, created_at, created_by_id FROM fees.ima_fees_bps;'
-    df = ss.snowflake.query(sql)
+@stale_while_revalidate()
+def _get_fee_tables():
+    # The lookups are independent so they are fetched in parallel
+    return reference_client().query_many(FEE_QUERIES)
+
+def _get_modes(df):
+    mode_dict = dict(zip(df['ID'], df['MODE']))
+    mode_id_dict = dict(zip(df['MODE'], df['ID']))
     
-    return df
+    return mode_dict, mode_id_dict
+
+def _get_managers(df):
+    manager_dict = dict(zip(df['ID'], df['NAME']))
+    manager_id_dict = dict(zip(df['NAME'], df['ID']))
+    manager_mv_dict = dict(zip(df['ID'], df['MV_MODE_ID']))
+    
+    return manager_dict, manager_id_dict, manager_mv_dict
 
 @st.cache_data(ttl=3600, show_spinner=False)
-def _get_custom_manager_data():
-    sql = 'SELECT manager_id, category, value, value2, created_at, created_by_id FROM fees.custom_fees;'
-    df = ss.snowflake.query(sql)
+def _get_users():
+    df = get_user_permissions()
+    user_dict = dict(zip(df['ID'], df['EMAIL']))
+    user_id_dict = dict(zip(df['EMAIL'], df['ID']))
     
-    return df
+    return user_dict, user_id_dict
 
 def process_fee_data(config):
     df = config.FEE_GROUPS
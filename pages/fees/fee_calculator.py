@@ -1,8 +1,8 @@
 import streamlit as st
 from streamlit import session_state as ss
 import pandas as pd
-from db.data.fx import get_fx_rate
-from db.data.data_shipment import get_lbu_data
+from db.data.fx import get_fx_store
+from db.data.lbu import get_lbu_hierarchy
 
 def calculate_fees(df, config):
     fees_df = config.FEES
@@ -89,7 +89,7 @@ def _filter_dates(df, mv_mode_id):
     
 def _calculate_tiered_fee(mv, tier_dict, category = ''):
     currency = tier_dict['currency']
-    fx_rate = get_fx_rate(currency, ss.selected_date.to_pydatetime())
+    fx_rate = get_fx_store().rate(currency, ss.selected_date)
     
     mv *= fx_rate
     
@@ -210,13 +210,17 @@ def _calculate_fees_mv(df, fees_df, config):
     # Convert to bps for fees and display in thousands
     results_df['FEE_K'] = results_df['NET_MV'] * results_df['FEE_BPS'] / 10_000 * 1_000
     
-    lbus = get_lbu_data()
-    lbu_group_dict = lbus.set_index('BLOOMBERG_NAME')['GROUP_NAME'].to_dict()
+    lbus = get_lbu_hierarchy()
+    lbu_group_dict = dict(lbus.lbu_group_names)
     lbu_group_dict['MC'] = lbu_group_dict['HK']
     results_df['LBU_GROUP_NAME'] = results_df['LBU_CODE'].map(lbu_group_dict)
-    lbu_code_dict = lbus.set_index('BLOOMBERG_NAME')['LBU'].to_dict()
-    lbu_code_dict['HK'] = lbus[(lbus['BLOOMBERG_NAME'] == 'HK') & (~lbus['SHORT_NAME'].str.contains('Macau', na=False))].iloc[0]['SUB_LBU']
-    lbu_code_dict['MC'] = lbus[lbus['SHORT_NAME'].str.contains('Macau', na=False)].iloc[0]['SUB_LBU']
+    
+    # Macau funds are booked under the HK LBU code but reported as their own sub LBU
+    hk_fund = next(fund for fund in lbus.lbu_funds['HK'] if 'Macau' not in fund)
+    macau_fund = next(fund for fund in lbus.funds if 'Macau' in fund)
+    lbu_code_dict = dict(lbus.lbu_names)
+    lbu_code_dict['HK'] = lbus.sub_lbus[hk_fund]
+    lbu_code_dict['MC'] = lbus.sub_lbus[macau_fund]
     results_df['LBU_CODE_NAME'] = results_df['LBU_CODE'].map(lbu_code_dict)
     
     results_df = results_df[list(config.GRID_MODES.values()) + ['NET_MV', 'FEE_BPS', 'FEE_K']]
@@ -1,35 +1,23 @@
 import streamlit as st
 from streamlit import session_state as ss
 import pandas as pd
-from datetime import datetime
-from db.data.data_shipment import get_funnelweb_dates
+from datetime import date
+from db.data.data_shipment import get_valuation_calendar
         
 def build_month_end_filters():
-    dates = list(get_funnelweb_dates())
-        
-    month_end_dates = sorted({min([date for date in dates if date.month == month and date.year == year]) 
-                          for year in set(date.year for date in dates) 
-                          for month in set(date.month for date in dates if date.year == year)})
-    
-    month_end_dates.reverse()
-    
-    month_end_dates_filtered = [date for date in month_end_dates if date > datetime(2024,12,31)]
+    # The first closing date of each month holds the previous month end
+    month_end_dates = get_valuation_calendar().month_starts[::-1]
     
-    date_dict = {
-        (datetime(date.year, date.month - 1, 1).strftime('%b %Y') if date.month > 1 
-         else datetime(date.year - 1, 12, 1).strftime('%b %Y')): date
-        for date in month_end_dates_filtered
-    }
+    month_end_dates_filtered = month_end_dates[month_end_dates > date(2024, 12, 31)]
     
-    max_date = max(date_dict.values())
-    default_date = next((key for key, value in date_dict.items() if value == max_date), None)
+    date_dict = {(month - 1).strftime('%b %Y'): month_end for month, month_end in month_end_dates_filtered.items()}
     
-    selected_date_name = st.selectbox('Month', list(date_dict.keys()), key='selected_month_end', index=list(date_dict.keys()).index(default_date))
+    selected_date_name = st.selectbox('Month', list(date_dict.keys()), key='selected_month_end', index=0)
     
     selected_date = ss.selected_date = date_dict[selected_date_name]
     
     # Get the 5 months prior to the selected_date
-    selected_months = [date.to_pydatetime().date() for date in month_end_dates if date <= selected_date][:6]
+    selected_months = month_end_dates[month_end_dates <= selected_date].iloc[:6].tolist()
     ss.selected_dates = selected_months
     
 def build_fees_filters(df):
@@ -2,8 +2,9 @@ import streamlit as st
 from streamlit import session_state as ss
 import pandas as pd
 from .grid import build_grid_bbg, build_grid_sum, build_grid_wa, build_grid_ratings, build_grid_nr
-from db.data.data_shipment import get_lbu_data_hk
-from db.data.lbu import FUND_CODE, HK_CODE, SUB_LBU
+from db.data.data_shipment import warn_missing_hk_codes
+from db.data.lbu import get_lbu_hierarchy
+from db.sql import bind
 
 # Constants
 CURRENT_DATE_LABEL = 'Current Date'
@@ -15,7 +16,6 @@ SUM_VALUE_HEADERS = {
         'CS01': ('SUM_CS01', 'SUM(CS01_000) / 100 AS SUM_CS01')
     }
 WA_VALUE_HEADERS = {'Credit Spread': 'CREDIT_SPREAD_BP', 'Duration': 'DURATION', 'YTM': 'YTM', 'WARF': 'WARF'}
-ENTITY_CODES = {'Bermuda': 'HK', 'Hong Kong': 'ML', 'Macau': 'MC', 'Assurance': 'MH'}
 
 
 def verify_to_load():
@@ -40,18 +40,18 @@ def _build_query(columns, values, add_comparison_date=False):
     comparison_date = ss.selected_comparison_date
     fund_codes = ss.selected_funds
     
-    dates = f"'{current_date}'"
+    dates = [current_date]
     if add_comparison_date:
-        dates = f"'{current_date}', '{comparison_date}'"
+        dates = [current_date, comparison_date]
 
-    fund_codes_string = "', '".join(fund_codes)
-
-    return (
+    return bind(
         f"SELECT closing_date, {columns}, {values} "
         f"FROM funnelweb "
-        f"WHERE closing_date IN ({dates}) AND fund_code IN ('{fund_codes_string}') "
+        f"WHERE closing_date IN (:dates) AND fund_code IN (:funds) "
         f"GROUP BY closing_date, {columns} "
-        f"ORDER BY closing_date, {columns};"
+        f"ORDER BY closing_date, {columns};",
+        dates=dates,
+        funds=fund_codes
     )
 
 def _calculate_percentages(df, current_col, comparison_col):
@@ -77,7 +77,7 @@ def get_bbg_asset_type_allocation():
     values = 'SUM(NET_MV) / 1000000 AS SUM_NET_MV'
 
     sql = _build_query(columns, values, add_comparison_date=True)
-    df = ss.snowflake.query(sql)
+    df = ss.snowflake.query(sql, closing_dates=[ss.selected_date, ss.selected_comparison_date])
 
     # Transform DataFrame
     current_date = ss.selected_date
@@ -105,29 +105,17 @@ def _get_sum_df(sql=None):
         columns = ['FUND_CODE', 'FWD_ASSET_TYPE']
         sql = _build_query(', '.join(columns), 'SUM(NET_MV) / 1000000 AS SUM_NET_MV')
     
-    df = ss.snowflake.query(sql)
+    df = ss.snowflake.query(sql, closing_dates=[ss.selected_date])
     
     return df
 
 def _map_entity_hk_code(df):
-    lbu_df = get_lbu_data_hk()
-    
-    entity_map = dict(zip(lbu_df[FUND_CODE], lbu_df[SUB_LBU]))
-    hk_code_map_raw = dict(zip(lbu_df[FUND_CODE], lbu_df[HK_CODE]))
-    hk_code_values = list(hk_code_map_raw.values())
+    warn_missing_hk_codes()
     
-    hk_code_map = {}
+    lbus = get_lbu_hierarchy()
     
-    for key, value in hk_code_map_raw.items():
-        hk_code = value
-        
-        if hk_code_values.count(value) > 1:
-            hk_code = f'{value} ({ENTITY_CODES[entity_map[key]]})'
-                
-        hk_code_map[key] = hk_code
-    
-    df['ENTITY'] = df['FUND_CODE'].map(entity_map)
-    df['HK_CODE'] = df['FUND_CODE'].map(hk_code_map)
+    df['ENTITY'] = df['FUND_CODE'].map(lbus.sub_lbus)
+    df['HK_CODE'] = df['FUND_CODE'].map(lbus.unique_hk_codes)
     
     return df
 
@@ -164,13 +152,11 @@ def build_sum_by_fwd_asset_type(modes):
         build_grid_sum(df, value_column, header)
 
 def _build_query_wa(columns, field, weight_field, additional_filter, current_date, fund_codes):
-    fund_codes_string = "', '".join(fund_codes)
-
-    sql = f"""WITH mvs AS (SELECT {columns}, sum(net_mv) AS sum_net_mv FROM funnelweb WHERE closing_date = '{current_date}' AND fund_code IN ('{fund_codes_string}') AND {field} <> 0{additional_filter} GROUP BY {columns} ORDER BY {columns}), 
-    weight AS (SELECT {columns}, sum({field} * net_mv) AS {weight_field} FROM funnelweb WHERE closing_date = '{current_date}' AND fund_code IN ('{fund_codes_string}') {additional_filter} GROUP BY {columns} ORDER BY {columns})
+    sql = f"""WITH mvs AS (SELECT {columns}, sum(net_mv) AS sum_net_mv FROM funnelweb WHERE closing_date = :date AND fund_code IN (:funds) AND {field} <> 0{additional_filter} GROUP BY {columns} ORDER BY {columns}), 
+    weight AS (SELECT {columns}, sum({field} * net_mv) AS {weight_field} FROM funnelweb WHERE closing_date = :date AND fund_code IN (:funds) {additional_filter} GROUP BY {columns} ORDER BY {columns})
     SELECT weight.fund_code, weight.fwd_asset_type, COALESCE(sum_net_mv, 0) AS sum_net_mv, COALESCE({weight_field}, 0) AS {weight_field} FROM weight LEFT JOIN mvs ON mvs.fund_code = weight.fund_code AND mvs.fwd_asset_type = weight.fwd_asset_type;"""
 
-    return sql
+    return bind(sql, date=current_date, funds=fund_codes)
 
 @st.fragment
 def build_wa_by_fwd_asset_type(modes):
@@ -203,7 +189,7 @@ def build_wa_by_fwd_asset_type(modes):
             additional_filter = additional_filters[value_column]
         
         sql = _build_query_wa(', '.join(columns), value_column, 'SUMPRODUCT', additional_filter, current_date, fund_codes)
-        df = ss.snowflake.query(sql)
+        df = ss.snowflake.query(sql, closing_dates=[current_date])
 
         df = _map_entity_hk_code(df)
         column_order = ['ENTITY', 'HK_CODE', 'FWD_ASSET_TYPE', 'SUM_NET_MV', 'SUMPRODUCT']
@@ -216,10 +202,9 @@ def build_wa_by_fwd_asset_type(modes):
 def build_ratings_profile():
     current_date = ss.selected_date
     fund_codes = ss.selected_funds
-    fund_codes_string = "', '".join(fund_codes)
 
-    sql = f"SELECT fund_code, index, final_rating, sum(net_mv) / 1000000 AS sum_net_mv FROM funnelweb, supp.ratings_ladder WHERE closing_date = '{current_date}' AND fund_code IN ('{fund_codes_string}') AND funnelweb.warf <> 0 AND final_rating = rating GROUP BY fund_code, index, final_rating ORDER BY index;"
-    df = ss.snowflake.query(sql)
+    sql = bind("SELECT fund_code, index, final_rating, sum(net_mv) / 1000000 AS sum_net_mv FROM funnelweb, supp.ratings_ladder WHERE closing_date = :date AND fund_code IN (:funds) AND funnelweb.warf <> 0 AND final_rating = rating GROUP BY fund_code, index, final_rating ORDER BY index;", date=current_date, funds=fund_codes)
+    df = ss.snowflake.query(sql, closing_dates=[current_date])
     
     df = _map_entity_hk_code(df)
     column_order = ['ENTITY', 'HK_CODE', 'FINAL_RATING', 'SUM_NET_MV']
@@ -233,13 +218,12 @@ def build_ratings_profile():
 def build_nr_table():
     current_date = ss.selected_date
     fund_codes = ss.selected_funds
-    fund_codes_string = "', '".join(fund_codes)
     
-    sql = f"""WITH mvs AS (SELECT security_name, sum(net_mv) AS sum_net_mv, ROW_NUMBER() OVER (ORDER BY sum_net_mv DESC) AS index FROM funnelweb WHERE closing_date = '{current_date}' AND fund_code IN ('{fund_codes_string}') AND final_rating = 'NR' AND bbg_asset_type <> 'Bond Option' GROUP BY security_name ORDER BY sum_net_mv DESC),
-        fund_mvs AS (SELECT security_name, fund_code, net_mv, ROW_NUMBER() OVER (ORDER BY net_mv DESC) AS index FROM funnelweb WHERE closing_date = '{current_date}' AND fund_code IN ('{fund_codes_string}') AND final_rating = 'NR' AND bbg_asset_type <> 'Bond Option' ORDER BY net_mv DESC)
-        SELECT mvs.security_name, fund_code, net_mv FROM mvs LEFT JOIN fund_mvs ON mvs.security_name = fund_mvs.security_name ORDER BY mvs.index, fund_mvs.index;"""
+    sql = bind("""WITH mvs AS (SELECT security_name, sum(net_mv) AS sum_net_mv, ROW_NUMBER() OVER (ORDER BY sum_net_mv DESC) AS index FROM funnelweb WHERE closing_date = :date AND fund_code IN (:funds) AND final_rating = 'NR' AND bbg_asset_type <> 'Bond Option' GROUP BY security_name ORDER BY sum_net_mv DESC),
+        fund_mvs AS (SELECT security_name, fund_code, net_mv, ROW_NUMBER() OVER (ORDER BY net_mv DESC) AS index FROM funnelweb WHERE closing_date = :date AND fund_code IN (:funds) AND final_rating = 'NR' AND bbg_asset_type <> 'Bond Option' ORDER BY net_mv DESC)
+        SELECT mvs.security_name, fund_code, net_mv FROM mvs LEFT JOIN fund_mvs ON mvs.security_name = fund_mvs.security_name ORDER BY mvs.index, fund_mvs.index;""", date=current_date, funds=fund_codes)
         
-    df = ss.snowflake.query(sql)
+    df = ss.snowflake.query(sql, closing_dates=[current_date])
     
     st.write("NR Securities by Allocation")
 
@@ -3,6 +3,8 @@ from streamlit import session_state as ss
 import pandas as pd
 from db.data.data_shipment import get_lbu_data
 from db.data.data_shipment import get_funnelweb_dates
+from db.data.curve import get_curve_store
+from db.sql import bind
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def get_policy_data():
@@ -15,7 +17,7 @@ def get_policy_data():
     df['VALUATION_DATE'] = pd.to_datetime(df['VALUATION_DATE'])
     last_month_end = df['VALUATION_DATE'].max() - pd.offsets.MonthEnd(1)
     
-    sql = f"""
+    sql = """
         WITH max_date AS (
             SELECT policy_id, MAX(valuation_date) AS max_date
             FROM liability_profile.policy_jspa_ga
@@ -23,9 +25,9 @@ def get_policy_data():
         )
         SELECT p.*
         FROM liability_profile.policy_jspa_ga p, max_date m
-        WHERE valuation_date = m.max_date AND p.policy_id = m.policy_id AND max_date >= '{last_month_end.strftime('%Y-%m-%d')}';
+        WHERE valuation_date = m.max_date AND p.policy_id = m.policy_id AND max_date >= :last_month_end;
     """
-    df = ss.snowflake.query(sql)
+    df = ss.snowflake.query(bind(sql, last_month_end=last_month_end))
     
     return df
 
@@ -49,9 +51,8 @@ def get_fund_names():
 @st.cache_data(ttl=3600, show_spinner=False)
 def get_funnelweb_metrics():
     funds = get_fund_names()
-    fund_string = "', '".join(funds)
     
-    sql = f"""
+    sql = bind("""
         SELECT 
             closing_date, 
             fund_code, 
@@ -61,12 +62,12 @@ def get_funnelweb_metrics():
         FROM 
             funnel.funnelweb 
         WHERE 
-            fund_code IN ('{fund_string}') 
+            fund_code IN (:funds) 
         GROUP BY 
             closing_date, fund_code 
         ORDER BY 
             closing_date, fund_code;
-    """
+    """, funds=funds)
     
     df = ss.snowflake.query(sql)
     
@@ -74,35 +75,30 @@ def get_funnelweb_metrics():
     
     return df
 
-@st.cache_data(ttl=3600, show_spinner=False)
+# UST tenors shown on the yield cards
+UST_TENORS = ['10', '15', '20']
+
 def get_yields():
     date = ss.selected_date
     
-    sql = f"""
-        SELECT 
-            tenor, 
-            rate 
-        FROM 
-            supp.curve_rates 
-        WHERE 
-            valuation_date = '{date.strftime('%Y-%m-%d')}' 
-            AND curve = 'USD_govt' 
-            AND tenor IN ('10', '15', '20');
-    """
-    
-    ust_df = ss.snowflake.query(sql)
+    ust_df = get_curve_store().curve('USD_govt', date)
+    ust_df = ust_df[ust_df['TENOR'].isin(UST_TENORS)][['TENOR', 'RATE']].reset_index(drop=True)
     
-    sql = f"""
+    return ust_df, _get_cds_spreads(date)
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _get_cds_spreads(date):
+    sql = """
         SELECT 
             '10' AS tenor, 
             spread_bid 
         FROM 
             supp.cds_rates 
         WHERE 
-            valuation_date = '{date.strftime('%Y-%m-%d')}' 
+            valuation_date = :date 
             AND name = 'CDX IG CDSI GEN 10Y Corp';
     """
     
-    cds_df = ss.snowflake.query(sql)
+    cds_df = ss.snowflake.query(bind(sql, date=date))
     
-    return ust_df, cds_df
\ No newline at end of file
+    return cds_df
\ No newline at end of file
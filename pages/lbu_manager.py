@@ -23,26 +23,33 @@ FWD_ASSET_TYPE_COLUMNS = read_json_columns('column_definitions/asset_type_fwd.js
 
 HK_ASSET_TYPE_COLUMNS = read_json_columns('column_definitions/hk_asset_type.json')
 
+# Table name to column definitions, in the order the tables are displayed
+TABLES = {
+    'supp.lbu': LBU_COLUMNS,
+    'supp.fund': FUND_COLUMNS,
+    'supp.saa': SAA_COLUMNS,
+    'supp.saa_alloc': SAA_ALLOC_COLUMNS,
+    'supp.bbg_account': ACCOUNT_COLUMNS,
+    'supp.asset_type_fwd': FWD_ASSET_TYPE_COLUMNS,
+    'supp.hk_asset_type': HK_ASSET_TYPE_COLUMNS
+}
+
 def get_data():
-    if st.button('Refresh') or 'lbu_data' not in ss:
-        return __refresh_data()    
+    if st.button('Refresh'):
+        return __refresh_data(refresh=True)
+    elif 'lbu_data' not in ss:
+        return __refresh_data()
     elif 'lbu_data' in ss:
         return ss['lbu_data']
 
-def __refresh_data():
-    lbu_df = __get_table_data('supp.lbu', LBU_COLUMNS)
-    fund_df = __get_table_data('supp.fund', FUND_COLUMNS)    
-    saa_df = __get_table_data('supp.saa', SAA_COLUMNS)
-    saa_alloc_df = __get_table_data('supp.saa_alloc', SAA_ALLOC_COLUMNS)
-    account_df = __get_table_data('supp.bbg_account', ACCOUNT_COLUMNS)
-    fwd_asset_type_df = __get_table_data('supp.asset_type_fwd', FWD_ASSET_TYPE_COLUMNS)
-    hk_asset_type_df = __get_table_data('supp.hk_asset_type', HK_ASSET_TYPE_COLUMNS)
+def __refresh_data(refresh=False):
+    # The tables are independent so they are fetched in parallel
+    queries = {table: f'SELECT * FROM {table} ORDER BY id;' for table in TABLES}
+    dfs = ss.snowflake.query_many(queries, refresh=refresh)
     
-    return (lbu_df, fund_df, saa_df, saa_alloc_df, account_df, fwd_asset_type_df, hk_asset_type_df)
+    return tuple(__get_table_data(dfs[table], table, columns) for table, columns in TABLES.items())
 
-def __get_table_data(table, columns):
-    df = ss.snowflake.query(f'SELECT * FROM {table} ORDER BY id;')
-    
+def __get_table_data(df, table, columns):
     __check_column_definitions(df, table, columns)
     
     df = __remove_none_values(df, columns)
@@ -1,5 +1,6 @@
 import streamlit as st
 from streamlit import session_state as ss
+from db.sql import bind
 
 def verify_to_load():
     checks = [
@@ -27,7 +28,11 @@ def _build_query(selected_columns, selected_values, fund_codes, current_date, co
     if len(mv_list) == 0:
         selected_values.append('NET_MV')
 
-    sql = f'SELECT CLOSING_DATE, {", ".join(selected_columns)}, {", ".join(selected_values)} FROM funnel.funnelweb WHERE fund_code IN ({fund_codes}) AND closing_date IN (\'{current_date}\', \'{comparison_date}\') ORDER BY closing_date DESC;'
+    sql = bind(
+        f'SELECT CLOSING_DATE, {", ".join(selected_columns)}, {", ".join(selected_values)} FROM funnel.funnelweb WHERE fund_code IN (:funds) AND closing_date IN (:dates) ORDER BY closing_date DESC;',
+        funds=fund_codes,
+        dates=[current_date, comparison_date]
+    )
     
     with st.expander('SQL Statement'):
         st.write(sql)
@@ -41,11 +46,11 @@ def get_data(config):
     selected_columns = [columns[column] for column in ss['selected_columns']]
     selected_values = [values[column] for column in ss['selected_values']]
 
-    fund_codes = str(ss['selected_funds']).replace('[', '').replace(']', '')
+    fund_codes = ss['selected_funds']
     current_date = ss['selected_date']
     comparison_date = ss['selected_comparison_date']
     
     sql = _build_query(selected_columns, selected_values, fund_codes, current_date, comparison_date)
-    df = ss.snowflake.query(sql)
+    df = ss.snowflake.query(sql, categorical=True)
     
     return df
\ No newline at end of file
@@ -1,8 +1,7 @@
 import streamlit as st
 from streamlit import session_state as ss
+import numpy as np
 import pandas as pd
-from dateutil.relativedelta import relativedelta
-from datetime import datetime
 
 COLUMN_MAPPING = {
     'fund_code': 'FUND_CODE',
@@ -38,207 +37,171 @@ COLUMN_MAPPING = {
     'principal': 'PRINCIPAL',
 }
 
+# Columns of the cashflow schedule, one row per position and payment date
+SCHEDULE_POSITION = 'POSITION'
+SCHEDULE_DATE = 'DATE'
+
 def build_cashflows(pos_df, cf_df):
+    """
+    Coupon, notional and time until maturity of the positions of the selected funds, with their cashflow schedule.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The positions and the schedule in the long format of _build_schedule, in
+        dollars.
+    """
     fund_codes = ss.selected_funds
     df = pos_df[pos_df[COLUMN_MAPPING['fund_code']].isin(fund_codes)].reset_index(drop=True)
 
-    def calculate_coupon(row):
-        if row[COLUMN_MAPPING['bbg_asset_type']] == 'Mortgage Backed Security' and row[COLUMN_MAPPING['rate']] == 0:
-            return 6 / row[COLUMN_MAPPING['freq']]
-        elif row[COLUMN_MAPPING['freq']] == 0:
-            return row[COLUMN_MAPPING['rate']]
-        else:
-            return row[COLUMN_MAPPING['rate']] / row[COLUMN_MAPPING['freq']]
+    rate = df[COLUMN_MAPPING['rate']].to_numpy(dtype=float)
+    freq = df[COLUMN_MAPPING['freq']].to_numpy(dtype=float)
+    is_mbs = (df[COLUMN_MAPPING['bbg_asset_type']] == 'Mortgage Backed Security').to_numpy()
 
-    df[COLUMN_MAPPING['coupon']] = df.apply(calculate_coupon, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df[COLUMN_MAPPING['coupon']] = np.select([is_mbs & (rate == 0), freq == 0], [6 / freq, rate], rate / freq)
 
     cf_df = cf_df.pivot(index='BBGID', columns='CATEGORY', values='VALUE').reset_index()
     df = pd.merge(df, cf_df, left_on='BBGID_V2', right_on='BBGID', how='left')
 
-    cashflows_list = []
-    coupon_dollars_list = []
-    principal_dollars_list = []
-    notionals_list = []
-    cashflow_dollars_list = []
-    time_until_maturity_list = []
-
-    for _, row in df.iterrows():        
-        cashflow_columns = ['maturity', 'call_date', 'call_price', 'redemption_value', 'coupon', 'freq', 'first_coupon', 'penultimate_coupon']
-        
-        cashflow_kwargs = _build_kwargs(row, cashflow_columns)
-        cashflow, coupons, principal = _compute_cashflows(**cashflow_kwargs)
-        
-        maturity = max(cashflow.keys())
-        maturity = datetime.strptime(maturity, "%Y-%m-%d").date()
-        time_until_maturity = int(round((maturity - ss.selected_date).days / 365.25 * 10**6)) / 10**6
-
-        notional_columns = ['unit', 'position', 'mortgage_fac', 'principal_fac', 'fx_rate', 'net_mv']
-        notional_kwargs = _build_kwargs(row, notional_columns)
-        notional = _compute_notional(**notional_kwargs)
-
-        cashflow_dollar = _adjust_cashflows(cashflow, notional)
-        coupons_dollar = _adjust_cashflows(coupons, notional)
-        principal_dollar = _adjust_cashflows(principal, notional)
-
-        cashflows_list.append(cashflow)
-        notionals_list.append(notional)
-        cashflow_dollars_list.append(cashflow_dollar)
-        coupon_dollars_list.append(coupons_dollar)
-        principal_dollars_list.append(principal_dollar)
-        time_until_maturity_list.append(time_until_maturity)
-
-    # Add new columns to the DataFrame
-    df[COLUMN_MAPPING['cashflow']] = cashflows_list
-    df[COLUMN_MAPPING['notional']] = notionals_list
-    df[COLUMN_MAPPING['cashflow_dollar']] = cashflow_dollars_list
-    df[COLUMN_MAPPING['coupon_dollar']] = coupon_dollars_list
-    df[COLUMN_MAPPING['principal_dollar']] = principal_dollars_list
-    df[COLUMN_MAPPING['time_until_maturity']] = time_until_maturity_list
-
-    return df
-
-def _compute_cashflows(maturity, call_date, call_price, redemption_value, coupon, freq, first_coupon, penultimate_coupon):
-    selected_date = datetime.combine(ss.selected_date, datetime.min.time())
-
-    max_date = maturity.to_pydatetime()
-    principal = redemption_value
-    
-    if call_date is not pd.NaT and call_date.to_pydatetime() != max_date and ss.to_next_call_date:
-        max_date = call_date.to_pydatetime()
-
-    if call_date is not pd.NaT and call_date.to_pydatetime() == max_date and call_price != 0.0:
-        principal = call_price
+    schedule_df = _build_schedule(df, _to_day(ss.selected_date), ss.to_next_call_date)
 
-    if principal == 0.0:
-        principal = 100.0
+    notional = _compute_notional(df)
     
-    final_payment = principal + coupon
-
-    cashflows = {}
-    coupons = {}
-    principals = {}
-    
-    cashflows[to_date_string(max_date)] = final_payment
-    coupons[to_date_string(max_date)] = coupon
-    principals[to_date_string(max_date)] = principal
-
-    if freq != 0:
-        per_x_months = 12 / freq
-
-        # Generate all cashflow dates efficiently
-        loop_date = penultimate_coupon.to_pydatetime()
-        
-        if penultimate_coupon is pd.NaT or penultimate_coupon > max_date:
-            loop_date = max_date - relativedelta(months=per_x_months)
-        elif max_date == loop_date:
-            loop_date = loop_date - relativedelta(months=per_x_months)
-        
-        while loop_date >= selected_date:
-            coupons[to_date_string(loop_date)] = cashflows[to_date_string(loop_date)] = coupon
-            principals[to_date_string(loop_date)] = 0
-            loop_date -= relativedelta(months=per_x_months)
-        
-        if first_coupon > loop_date and first_coupon < selected_date:
-            loop_date = first_coupon.to_pydatetime()
-        
-        last_date = to_date_string(loop_date)
-        
-        if last_date == None:
-            last_date = selected_date
-
-        coupons[last_date] = principals[last_date] = cashflows[last_date] = 0
-
-    return cashflows, coupons, principals
-
-def _compute_notional(unit, position, mortgage_fac, principal_fac, fx_rate, net_mv):
-    mortgage_fac = 1 if mortgage_fac == 0 else mortgage_fac
-    principal_fac = 1 if principal_fac == 0 else principal_fac
+    for column in ['cashflow', 'coupon', 'principal']:
+        schedule_df[COLUMN_MAPPING[column]] *= notional[schedule_df[SCHEDULE_POSITION].to_numpy()] / 100
+
+    maturity = schedule_df.groupby(SCHEDULE_POSITION)[SCHEDULE_DATE].max().reindex(df.index).to_numpy().astype('datetime64[D]')
+    days = np.where(np.isnat(maturity), np.nan, (maturity - _to_day(ss.selected_date)).astype(float))
+
+    df[COLUMN_MAPPING['notional']] = notional
+    df[COLUMN_MAPPING['time_until_maturity']] = np.round(days / 365.25 * 10**6) / 10**6
+
+    return df, schedule_df
+
+def _build_schedule(df, selected_date, to_next_call_date):
+    """
+    Coupon and principal payment dates of every position, generated as flat arrays.
+
+    The final payment is at maturity, or at the next call date when to_next_call_date is set, with the call price as
+    principal when it is called. Coupons are paid every 12 / COUPNFREQ months back from the penultimate coupon date
+    (or from the final payment) up to selected_date, then a zero payment marks the coupon date before selected_date,
+    or the first coupon date if it comes after it.
+
+    Returns:
+        pd.DataFrame: POSITION (row of df), DATE, CASHFLOW, COUPON and PRINCIPAL in percent of the notional.
+    """
+    maturity = _to_days(df[COLUMN_MAPPING['maturity']])
+    call_date = _to_days(df[COLUMN_MAPPING['call_date']])
+    call_price = df[COLUMN_MAPPING['call_price']].to_numpy(dtype=float)
+    coupon = df[COLUMN_MAPPING['coupon']].to_numpy(dtype=float)
+    freq = df[COLUMN_MAPPING['freq']].to_numpy(dtype=float)
+    first_coupon = _to_days(df[COLUMN_MAPPING['first_coupon']])
+    penultimate_coupon = _to_days(df[COLUMN_MAPPING['penultimate_coupon']])
+
+    is_callable = ~np.isnat(call_date)
+    max_date = np.where(is_callable & (call_date != maturity) & to_next_call_date, call_date, maturity)
+
+    principal = df[COLUMN_MAPPING['redemption_value']].to_numpy(dtype=float)
+    principal = np.where(is_callable & (call_date == max_date) & (call_price != 0.0), call_price, principal)
+    principal = np.where(principal == 0.0, 100.0, principal)
+
+    positions = np.arange(len(df))
+    final = (positions, max_date, principal + coupon, coupon, principal)
+
+    # Coupon dates count back from an anchor date, skipping it when it is the final payment
+    paying = np.flatnonzero((freq != 0) & ~np.isnat(max_date))
+    step = np.rint(12 / freq[paying]).astype(int)
+    anchor = max_date[paying]
+    from_penultimate = ~np.isnat(penultimate_coupon[paying]) & (penultimate_coupon[paying] < anchor)
+    anchor = np.where(from_penultimate, penultimate_coupon[paying], anchor)
+    skip = np.where(from_penultimate, 0, 1)
+
+    # Enough candidate dates per position to reach the first one before selected_date
+    months_to_anchor = _month_number(anchor) - _month_number(np.array([selected_date]))
+    counts = np.maximum(months_to_anchor // step - skip + 2, 1)
+    starts = np.cumsum(counts) - counts
+
+    candidate = np.repeat(np.arange(len(paying)), counts)
+    periods = np.arange(counts.sum()) - starts[candidate] + skip[candidate]
+    dates = _add_months(anchor[candidate], -periods * step[candidate])
+
+    paid = dates >= selected_date
+    coupons = (paying[candidate[paid]], dates[paid], coupon[paying[candidate[paid]]], coupon[paying[candidate[paid]]], np.zeros(paid.sum()))
+
+    # Candidates are in descending date order, the first unpaid one is the coupon date before selected_date
+    previous_coupon = dates[starts + np.add.reduceat(paid.astype(int), starts)]
+    first = first_coupon[paying]
+    last_date = np.where((first > previous_coupon) & (first < selected_date), first, previous_coupon)
+    zeros = np.zeros(len(paying))
+    last = (paying, last_date, zeros, zeros, zeros)
+
+    columns = [SCHEDULE_POSITION, SCHEDULE_DATE, COLUMN_MAPPING['cashflow'], COLUMN_MAPPING['coupon'], COLUMN_MAPPING['principal']]
+    schedule_df = pd.DataFrame({column: np.concatenate(values) for column, *values in zip(columns, final, coupons, last)})
+
+    # A zero payment on the final payment date replaces it
+    return schedule_df.drop_duplicates([SCHEDULE_POSITION, SCHEDULE_DATE], keep='last').reset_index(drop=True)
+
+def _compute_notional(df):
+    mortgage_fac = df[COLUMN_MAPPING['mortgage_fac']].to_numpy(dtype=float)
+    principal_fac = df[COLUMN_MAPPING['principal_fac']].to_numpy(dtype=float)
+    net_mv = df[COLUMN_MAPPING['net_mv']].to_numpy(dtype=float)
     
-    notional = unit * position * mortgage_fac * principal_fac * fx_rate
+    mortgage_fac = np.where(mortgage_fac == 0, 1, mortgage_fac)
+    principal_fac = np.where(principal_fac == 0, 1, principal_fac)
     
-    if net_mv == 0:
-        return 0
+    notional = df[COLUMN_MAPPING['unit']].to_numpy(dtype=float) * df[COLUMN_MAPPING['position']].to_numpy(dtype=float) * mortgage_fac * principal_fac * df[COLUMN_MAPPING['fx_rate']].to_numpy(dtype=float)
     
-    if notional / net_mv > 100:
-        notional /= 1000
+    with np.errstate(divide='ignore', invalid='ignore'):
+        notional = np.where(notional / net_mv > 100, notional / 1000, notional)
     
-    return notional
+    return np.where(net_mv == 0, 0, notional)
 
-def _adjust_cashflows(cashflow, notional):
-    cashflow_adjusted = {}
-    
-    for key, value in cashflow.items():
-        cashflow_adjusted[key] = value / 100 * notional
-        
-    return cashflow_adjusted
+def _to_day(date):
+    return np.datetime64(date, 'D')
 
-def _build_kwargs(row, columns):
-    kwargs = {}
+def _to_days(values):
+    return pd.to_datetime(values).to_numpy().astype('datetime64[D]')
 
-    for column in columns:
-        value = row[COLUMN_MAPPING[column]]
+def _month_number(dates):
+    return dates.astype('datetime64[M]').astype(int)
 
-        kwargs[column] = value
-        
-    return kwargs
+def _add_months(dates, months):
+    """Add whole months to datetime64[D] dates, days past the end of the month move back to its last day"""
+    month = dates.astype('datetime64[M]')
+    day = (dates - month.astype('datetime64[D]')).astype(int)
+    
+    target = month + months
+    month_days = ((target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')).astype(int)
+    
+    return target.astype('datetime64[D]') + np.minimum(day, month_days - 1)
 
-def to_date_string(timestamp):
-    """Convert pandas.Timestamp to 'YYYY-MM-DD' string."""
-    if pd.isna(timestamp):
-        return None
-    return timestamp.strftime('%Y-%m-%d')
+def _months_between(dates, date):
+    """Whole months from date to dates, rounded towards date like relativedelta"""
+    months = _month_number(dates) - _month_number(np.array([date]))
+    shifted = _add_months(np.full(len(dates), date), months)
+    
+    months = np.where((dates >= date) & (dates < shifted), months - 1, months)
+    months = np.where((dates < date) & (dates > shifted), months + 1, months)
+    
+    return months
 
-def build_cashflow_df(df, cashflow_types, monthly=False):
-    date = ss.selected_comparison_date
+def build_cashflow_df(df, schedule_df, cashflow_types, monthly=False):
+    date = _to_day(ss.selected_comparison_date)
     
     cashflow_columns = ['period', 'value', 'principal', 'coupon']
     columns = ['fund_code', 'fwd_asset_type', 'manager', 'period', 'value', 'position_id', 'security_name', 'bbgid_v2', 'notional', 'coupon', 'freq', 'time_until_maturity']
     columns = list(dict.fromkeys(cashflow_columns + columns))
     
-    rows = []
+    months = _months_between(schedule_df[SCHEDULE_DATE].to_numpy(), date)
+    period = months if monthly else np.trunc(months / 12).astype(int)
+    
+    period_df = schedule_df.assign(**{COLUMN_MAPPING['period']: period + 1})
+    period_df = period_df.groupby([SCHEDULE_POSITION, COLUMN_MAPPING['period']], sort=False, as_index=False)[[COLUMN_MAPPING['cashflow'], COLUMN_MAPPING['principal'], COLUMN_MAPPING['coupon']]].sum()
+    period_df = period_df.rename(columns={COLUMN_MAPPING['cashflow']: COLUMN_MAPPING['value']})
+    
+    position_columns = [COLUMN_MAPPING[column] for column in columns if column not in cashflow_columns]
+    position_df = df[position_columns].iloc[period_df[SCHEDULE_POSITION].to_numpy()].reset_index(drop=True)
     
-    for _, row in df.iterrows():        
-        row_data = {}
-
-        for column in columns:
-            if column not in cashflow_columns:
-                column_name = COLUMN_MAPPING[column]
-                row_data[column_name] = row[column_name]
-        
-        cashflow = row[COLUMN_MAPPING['cashflow_dollar']]
-        coupons = row[COLUMN_MAPPING['coupon_dollar']]
-        principal = row[COLUMN_MAPPING['principal_dollar']]
-        
-        period_cashflow = {}
-        period_principal = {}
-        period_coupon = {}
-
-        for payment_date in cashflow.keys():
-            relative_time = relativedelta(datetime.strptime(payment_date, "%Y-%m-%d"), date)
-            
-            if not monthly:
-                period = relative_time.years
-            else:
-                period = relative_time.years * 12 + relative_time.months
-            
-            if period not in period_cashflow.keys():
-                period_cashflow[period] = cashflow[payment_date]
-                period_principal[period] = principal[payment_date]
-                period_coupon[period] = coupons[payment_date]
-            else:
-                period_cashflow[period] += cashflow[payment_date]
-                period_principal[period] += principal[payment_date]
-                period_coupon[period] += coupons[payment_date]
-
-        for period, value in period_cashflow.items():
-            row_data_copy = row_data.copy()
-            row_data_copy[COLUMN_MAPPING['period']] = period + 1
-            row_data_copy[COLUMN_MAPPING['value']] = value
-            row_data_copy[COLUMN_MAPPING['principal']] = period_principal[period]
-            row_data_copy[COLUMN_MAPPING['coupon']] = period_coupon[period]
-            rows.append(row_data_copy)
-
-    security_df = pd.DataFrame(rows, columns=[COLUMN_MAPPING[column] for column in columns])
+    security_df = pd.concat([period_df.drop(columns=[SCHEDULE_POSITION]), position_df], axis=1)[[COLUMN_MAPPING[column] for column in columns]]
     security_df = security_df.sort_values(by=[COLUMN_MAPPING[column] for column in cashflow_columns], ascending=[True if column == 'period' else False for column in cashflow_columns])
     cashflow_df = security_df[[COLUMN_MAPPING[column] for column in cashflow_columns]].copy()
     cashflow_df = cashflow_df.groupby([COLUMN_MAPPING['period']], as_index=False).sum(numeric_only=True)
@@ -2,56 +2,42 @@ import streamlit as st
 from streamlit import session_state as ss
 import pandas as pd
 from .cashflow import build_cashflows, build_cashflow_df
-from db.data.fx import get_fx_rate
+from db.data.fx import get_fx_store
+from db.streaming import filter_batches
+from db.sql import bind, canonical
+
+# LBU to liability table and the currency its values are reported in
+LIABILITY_TABLES = {
+    'HK': ('liability_profile.hk_liabilities', None),
+    'TH': ('liability_profile.th_liabilities_new', 'THB'),
+    'JP': ('liability_profile.jp_liabilities', 'JPY')
+}
 
-@st.cache_data(ttl=3600, show_spinner=False)
 def get_liabilities():
     date = ss.selected_date
     
-    hk_df = get_hk_liabilities(date)
-    th_df = get_th_liabilities(date)
-    jp_df = get_jp_liabilities(date)
-
-    df = pd.concat([hk_df, th_df, jp_df], ignore_index=True)
+    tables = _get_liability_tables(date)
+    
+    dfs = [df if ss.lbu == lbu or ss.lbu == 'Group' else df.iloc[0:0] for lbu, df in tables.items()]
+    df = pd.concat(dfs, ignore_index=True)
     
     return df
 
 @st.cache_data(ttl=3600, show_spinner=False)
-def get_hk_liabilities(date):
-    sql = f"SELECT group_name, year, value, mode FROM liability_profile.hk_liabilities WHERE as_of_date = (SELECT max(as_of_date) AS max_date FROM liability_profile.hk_liabilities WHERE as_of_date <= '{date}');"
-    df = ss.snowflake.query(sql)
-    
-    if ss.lbu == 'HK' or ss.lbu == 'Group':
-        return df
-    else:
-        return df.iloc[0:0]
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_th_liabilities(date):
-    sql = f"SELECT group_name, year, value, mode FROM liability_profile.th_liabilities_new WHERE as_of_date = (SELECT max(as_of_date) AS max_date FROM liability_profile.th_liabilities_new WHERE as_of_date <= '{date}');"
-    df = ss.snowflake.query(sql)
+def _get_liability_tables(date):
+    queries = {lbu: bind(f"SELECT group_name, year, value, mode FROM {table} WHERE as_of_date = (SELECT max(as_of_date) AS max_date FROM {table} WHERE as_of_date <= :date);", date=date) for lbu, (table, _) in LIABILITY_TABLES.items()}
     
-    thb_fx = get_fx_rate('THB', date)
-    df['VALUE'] = df['VALUE'] / thb_fx
+    # The LBU tables are independent so they are fetched in parallel
+    tables = ss.snowflake.query_many(queries)
     
-    if ss.lbu == 'TH' or ss.lbu == 'Group':
-        return df
-    else:
-        return df.iloc[0:0]
+    fx = get_fx_store()
 
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_jp_liabilities(date):
-    sql = f"SELECT group_name, year, value, mode FROM liability_profile.jp_liabilities WHERE as_of_date = (SELECT max(as_of_date) AS max_date FROM liability_profile.jp_liabilities WHERE as_of_date <= '{date}');"
-    df = ss.snowflake.query(sql)
-    
-    jpy_fx = get_fx_rate('JPY', date)
-    df['VALUE'] = df['VALUE'] / jpy_fx
-    
-    if ss.lbu == 'JP' or ss.lbu == 'Group':
-        return df
-    else:
-        return df.iloc[0:0]
+    for lbu, (_, currency) in LIABILITY_TABLES.items():
+        if currency is not None:
+            tables[lbu]['VALUE'] = fx.convert(tables[lbu]['VALUE'], currency, date)
     
+    return tables
+
 def verify_to_load():
     checks = [
         (len(ss.selected_groups) == 0, "Please select at least one fund.")
@@ -71,28 +57,25 @@ def verify_to_load():
         
 def load_asset_cashflow_data(cashflow_types, lbus, monthly=False):
     date = ss.selected_date
-    cf_df, pos_df = _get_asset_data(date, lbus)
+    cf_df, pos_df = _get_asset_data(date, canonical(lbus))
     
     if len(pos_df) == 0:
         st.error('No data available for the selected fund.')
         st.stop()
     
-    df = build_cashflows(pos_df, cf_df)
-    
-    df = _clean_positions(df)
+    df, schedule_df = build_cashflows(pos_df, cf_df)
 
-    security_df, cashflow_df = build_cashflow_df(df, cashflow_types, monthly)
+    security_df, cashflow_df = build_cashflow_df(df, schedule_df, cashflow_types, monthly)
     
     return security_df, cashflow_df
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def _get_asset_data(date, lbus):
-    sql = f"SELECT bbgid, category, value FROM supp.cashflow_dates WHERE valuation_date = '{date}';"
+    sql = bind("SELECT bbgid, category, value FROM supp.cashflow_dates WHERE valuation_date = :date;", date=date)
     cf_df = ss['cashflow_df'] = ss.snowflake.query(sql)
     
-    lbu_string = "', '".join(lbus)
-    sql = f"SELECT closing_date, position_id, lbu_code, fund_code, manager, fwd_asset_type, account_code, bbg_asset_type, security_name, bbgid_v2, isin, effective_maturity, maturity, next_call_date, coupon_rate, coupnfreq, position, unit, mtge_factor, principal_factor, redemption_value, next_call_price, currency, fx_rate, net_mv, time_until_maturity FROM funnel.funnelweb WHERE closing_date = '{date}' AND lbu_group IN ('{lbu_string}') AND is_bbg_fi = TRUE;"
-    pos_df = ss['pos_df'] = ss.snowflake.query(sql)
+    sql = bind("SELECT closing_date, position_id, lbu_code, fund_code, manager, fwd_asset_type, account_code, bbg_asset_type, security_name, bbgid_v2, isin, effective_maturity, maturity, next_call_date, coupon_rate, coupnfreq, position, unit, mtge_factor, principal_factor, redemption_value, next_call_price, currency, fx_rate, net_mv, time_until_maturity FROM funnel.funnelweb WHERE closing_date = :date AND lbu_group IN (:lbus) AND is_bbg_fi = TRUE;", date=date, lbus=lbus)
+    pos_df = ss['pos_df'] = filter_batches(ss.snowflake.query_batches(sql), _clean_positions)
     
     return cf_df, pos_df
 
@@ -1,13 +1,13 @@
 import streamlit as st
 from streamlit import session_state as ss
-from db.data.data_shipment import get_funnelweb_dates
+from db.data.data_shipment import get_valuation_calendar
 from interface.filters import build_date_filter_pills
 from .data import get_liabilities
 
 @st.fragment
 def build_filters(cashflow_types):
     with st.expander('Filters', True):
-        dates = get_funnelweb_dates()
+        dates = get_valuation_calendar()
         
         build_date_filter_pills('Asset Date', dates, key='selected_date')        
         build_date_filter_pills('Liability Date', dates, key='selected_comparison_date', comparison_date=ss['selected_date'])
@@ -1,22 +1,24 @@
 import streamlit as st
 from streamlit import session_state as ss
 import pandas as pd
+from db.sql import bind
 from .grid import build_grid
 
 def _build_query():
     fund_codes = ss.selected_funds
-    fund_codes_string = "', '".join(fund_codes)
     current_date = ss.selected_date
     comparison_date = ss.selected_comparison_date
 
-    sql = (
-        f"SELECT CLOSING_DATE, LBU_CODE, ISSUER, L3_ASSET_TYPE, ACCOUNT_CODE, SECURITY_NAME, "
-        f"NET_MV / 1000000 AS NET_MV "
-        f"FROM funnel.funnelweb "
-        f"WHERE bbg_asset_type = 'Repo Liability' "
-        f"AND fund_code IN ('{fund_codes_string}') "
-        f"AND closing_date IN ('{current_date}', '{comparison_date}') "
-        f"ORDER BY closing_date DESC;"
+    sql = bind(
+        "SELECT CLOSING_DATE, LBU_CODE, ISSUER, L3_ASSET_TYPE, ACCOUNT_CODE, SECURITY_NAME, "
+        "NET_MV / 1000000 AS NET_MV "
+        "FROM funnel.funnelweb "
+        "WHERE bbg_asset_type = 'Repo Liability' "
+        "AND fund_code IN (:funds) "
+        "AND closing_date IN (:dates) "
+        "ORDER BY closing_date DESC;",
+        funds=fund_codes,
+        dates=[current_date, comparison_date]
     )
     
     return sql
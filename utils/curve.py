@@ -1,40 +1,120 @@
 import streamlit as st
+import numpy as np
 
-def calculate_forward_rates_for_tenor(tenor, tenors, tenor_rates, display_tenors):
-    forward_rates = {}
-    rate = tenor_rates[tenor]
-    
-    for tenor2 in display_tenors:
-        f_tenor = tenor + tenor2
+# Interpolation of the zero curve between its tenors, linear on the zero rate or linear on the log discount factor
+LINEAR_ZERO = 'Linear Zero'
+LOG_DISCOUNT = 'Log Discount'
+INTERPOLATION_METHODS = [LINEAR_ZERO, LOG_DISCOUNT]
 
-        if tenor2 == 0:
-            forward_rates[str(tenor2)] = rate
-            continue
-        elif f_tenor > max(display_tenors):
-            continue
+def interpolate_zero_rates(years: np.ndarray, rates: np.ndarray, points: np.ndarray, method: str = LINEAR_ZERO) -> np.ndarray:
+    """
+    Continuously compounded zero rates at points, for one curve or a stack of curves at once.
 
-        smaller_tenor = max([t for t in tenors if t < f_tenor], default=min(tenors))
-        bigger_tenor = min([t for t in tenors if t > f_tenor], default=max(tenors))
+    Parameters:
+        years (np.ndarray): Sorted tenors of the curves in years.
+        rates (np.ndarray): Zero rates by tenor, or a (curve x tenor) stack, missing rates are NaN.
+        points (np.ndarray): Sorted or unsorted points in years to interpolate at.
+        method (str): LINEAR_ZERO (flat before the first tenor) or LOG_DISCOUNT (from a discount factor of 1 at 0).
 
-        if smaller_tenor != bigger_tenor:
-            forward_rates[str(tenor2)] = _interpolate_forward_rate(
-                tenor, f_tenor, smaller_tenor, bigger_tenor, tenor_rates
-            )
+    Returns:
+        np.ndarray: Rates at points, (curve x point) for a stack, NaN beyond the last tenor of a curve.
+    """
+    years = np.asarray(years, dtype=float)
+    stack = np.atleast_2d(np.asarray(rates, dtype=float))
+    points = np.asarray(points, dtype=float)
+    count = len(years)
 
-    return forward_rates
+    # Nearest tenor with a rate at or below / at or above every tenor, per curve
+    columns = np.arange(count)
+    valid = ~np.isnan(stack)
+    below = np.maximum.accumulate(np.where(valid, columns, -1), axis=1)
+    above = np.minimum.accumulate(np.where(valid, columns, count)[:, ::-1], axis=1)[:, ::-1]
+
+    position = np.searchsorted(years, points, side='right') - 1
+    lower = np.where(position >= 0, below[:, np.maximum(position, 0)], -1)
+    upper = np.where(position + 1 < count, above[:, np.minimum(position + 1, count - 1)], count)
+
+    # Points on a tenor or past the last one use the lower tenor, points before the first one use the upper tenor
+    short = lower == -1
+    upper = np.where((upper == count) | ~short & (years[np.maximum(lower, 0)] == points), lower, upper)
+    lower = np.where(short, upper, lower)
+
+    lower_years = years[np.clip(lower, 0, count - 1)]
+    upper_years = years[np.clip(upper, 0, count - 1)]
+    lower_rates = np.take_along_axis(stack, np.clip(lower, 0, count - 1), axis=1)
+    upper_rates = np.take_along_axis(stack, np.clip(upper, 0, count - 1), axis=1)
+
+    if method == LOG_DISCOUNT:
+        # Interpolate rate x years (minus the log discount factor), anchored at 0 before the first tenor
+        lower_years = np.where(short, 0.0, lower_years)
+        lower_values = np.where(short, 0.0, lower_rates * lower_years)
+        upper_values = upper_rates * upper_years
+    elif method == LINEAR_ZERO:
+        lower_values, upper_values = lower_rates, upper_rates
+    else:
+        raise ValueError(f"Unknown interpolation method '{method}'!")
+
+    span = upper_years - lower_years
+    weight = np.divide(points - lower_years, span, out=np.zeros_like(span), where=span > 0)
+    values = lower_values + weight * (upper_values - lower_values)
+
+    if method == LOG_DISCOUNT:
+        values = np.divide(values, points, out=upper_rates.copy(), where=points > 0)
+
+    # No extrapolation past the last tenor with a rate, or for curves without any rate
+    last_years = np.where(below[:, -1] >= 0, years[np.maximum(below[:, -1], 0)], -np.inf)
+    values[(points[None, :] > last_years[:, None]) | (lower < 0)] = np.nan
+
+    return values if np.ndim(rates) > 1 else values[0]
+
+def calculate_forward_matrix(years: np.ndarray, rates: np.ndarray, starts: np.ndarray, tenors: np.ndarray,
+                             method: str = LINEAR_ZERO, max_years: float = None) -> np.ndarray:
+    """
+    Forward zero rates starting at starts for tenors, from one curve or a stack of curves at once.
+
+    The forward rate from T1 to T2 is (r2 x T2 - r1 x T1) / (T2 - T1) with the rates interpolated with method, a
+    tenor of 0 gives the zero rate at the start. Forwards ending past max_years or past the curve are NaN.
+
+    Returns:
+        np.ndarray: (start x tenor) matrix, (curve x start x tenor) for a stack of curves.
+    """
+    starts = np.asarray(starts, dtype=float)
+    tenors = np.asarray(tenors, dtype=float)
+    ends = starts[:, None] + tenors[None, :]
+
+    start_rates = interpolate_zero_rates(years, rates, starts, method)[..., :, None]
+    end_rates = interpolate_zero_rates(years, rates, ends.ravel(), method).reshape(start_rates.shape[:-2] + ends.shape)
+
+    forwards = np.divide(end_rates * ends - start_rates * starts[:, None], tenors, out=np.zeros_like(end_rates), where=tenors > 0)
+    forwards = np.where(tenors > 0, forwards, start_rates)
+
+    if max_years is not None:
+        forwards = np.where(ends > max_years, np.nan, forwards)
+
+    return forwards
+
+# Tenor names that are not a whole number of years
+TENOR_MAPPING: dict[str, float] = {"1m": 1 / 12, "3m": 3 / 12, "6m": 6 / 12}
+
+def convert_tenor_to_float(tenor: str) -> float:
+    """Tenor name to years, None if the name is unknown"""
+    if tenor.isdigit():
+        return float(tenor)
+    elif tenor in TENOR_MAPPING.keys():
+        return TENOR_MAPPING[tenor]
+
+    print(f"Unknown tenor name '{tenor}'!")
+    return None
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def convert_tenors_to_float(rates: dict[str, float]):
-    tenor_mapping: dict[str, float] = {"1m": 1 / 12, "3m": 3 / 12, "6m": 6 / 12}
     rates_converted: dict[float, float] = {}
 
     for tenor, rate in rates.items():
-        if tenor.isdigit():
-            rates_converted[float(tenor)] = float(rate)
-        elif tenor in tenor_mapping.keys():
-            rates_converted[tenor_mapping[tenor]] = float(rate)
-        else:
-            print(f"Unknown tenor name '{tenor}'!")
+        years = convert_tenor_to_float(tenor)
+
+        if years is not None:
+            rates_converted[years] = float(rate)
 
     rates_converted = dict(sorted(rates_converted.items()))
 
@@ -43,7 +123,7 @@ def convert_tenors_to_float(rates: dict[str, float]):
 @st.cache_data(ttl=3600, show_spinner=False)
 def convert_floats_to_tenor(tenors: list[float]):
     # Round tenor_mapping values to 6 decimal places
-    tenor_mapping: dict[str, float] = {key: round(value, 6) for key, value in {"1m": 1 / 12, "3m": 3 / 12, "6m": 6 / 12}.items()}
+    tenor_mapping: dict[str, float] = {key: round(value, 6) for key, value in TENOR_MAPPING.items()}
     tenors_converted: list[str] = []
 
     for tenor in tenors:
@@ -1,61 +1,88 @@
 import calendar
-from datetime import datetime, timedelta
+from datetime import datetime, date as date_type, timedelta
 from dateutil.relativedelta import relativedelta
+import numpy as np
+import pandas as pd
 
-def get_ytd(date: datetime, dates: list[datetime]) -> datetime.date:
-    ytd_date = datetime(date.year - 1, 12, 31)
-    ytd_date = max([date for date in dates if date <= ytd_date]).date()
-    
-    return ytd_date
+class ValuationCalendar:
+    """
+    Sorted valuation dates with as-of lookups by binary search.
 
-def get_qtd(date: datetime, dates: list[datetime]) -> datetime.date:
-    qtd_months = [3, 6, 9, 12]
-    
-    qtd_month = max([month for month in qtd_months if month < date.month or date.month <= min(qtd_months) and month == max(qtd_months)])
+    The last valuation date of every month, quarter and year (month_ends, quarter_ends and year_ends) and the first
+    valuation date of every month (month_starts) are worked out once, as series of datetime.date indexed by period.
+    """
+    def __init__(self, dates):
+        self.dates: np.ndarray = np.unique(pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]'))
+        self.dates.flags.writeable = False
 
-    if qtd_month == 12:
-        qtd_date = datetime(date.year - 1, 12, 31)
-    else:
-        qtd_date = datetime(date.year, qtd_month, 1)
-        qtd_date = get_last_day(qtd_date)
+        self.first: date_type = self.dates[0].item()
+        self.latest: date_type = self.dates[-1].item()
 
-    qtd_date = max([date for date in dates if date <= qtd_date]).date()
+        self.month_ends = self._period_ends('M')
+        self.quarter_ends = self._period_ends('Q')
+        self.year_ends = self._period_ends('Y')
 
-    return qtd_date
+        self._ends = {ends.index.freqstr: ends for ends in (self.month_ends, self.quarter_ends, self.year_ends)}
 
-def get_mtd(date: datetime, dates: list[datetime]) -> datetime.date:
-    if (date.month == 1):
-        mtd_date = datetime(date.year - 1, 12, 31)
-    else:
-        mtd_date = datetime(date.year, date.month - 1, 1)
-        mtd_date = get_last_day(mtd_date)
-    
-    mtd_date = max([date for date in dates if date <= mtd_date]).date()
+        months = pd.Series(self.dates).dt.to_period('M')
+        self.month_starts = pd.Series([date.item() for date in self.dates[np.flatnonzero(months != months.shift())]], index=pd.PeriodIndex(months.unique()))
 
-    return mtd_date
+    def __len__(self):
+        return len(self.dates)
+
+    def asof(self, date) -> date_type:
+        """Latest valuation date on or before date, None if date is before the first one"""
+        row = np.searchsorted(self.dates, np.datetime64(_to_date(date), 'D'), side='right') - 1
+
+        return self.dates[row].item() if row >= 0 else None
+
+    def asof_many(self, dates) -> np.ndarray:
+        """Vectorized asof, returns datetime64[D] with NaT for dates before the first valuation date"""
+        dates = pd.to_datetime(pd.Series(dates)).to_numpy().astype('datetime64[D]')
+        rows = np.searchsorted(self.dates, dates, side='right') - 1
+
+        return np.where(rows >= 0, self.dates[np.maximum(rows, 0)], np.datetime64('NaT'))
+
+    def period_end(self, period: pd.Period) -> date_type:
+        """Last valuation date on or before the end of period"""
+        ends = self._ends[period.freqstr]
+
+        if period in ends.index:
+            return ends[period]
+
+        return self.latest if period > ends.index[-1] else None
+
+    def _period_ends(self, freq) -> pd.Series:
+        periods = pd.period_range(self.first, self.latest, freq=freq)
+        ends = self.asof_many(periods.end_time.normalize())
+
+        return pd.Series([date.item() for date in ends], index=periods)
+
+def _to_date(date) -> date_type:
+    if isinstance(date, (datetime, pd.Timestamp)):
+        return date.date()
+
+    return date
+
+def get_ytd(date: datetime, dates: ValuationCalendar) -> datetime.date:
+    return dates.period_end(pd.Period(_to_date(date), 'Y') - 1)
+
+def get_qtd(date: datetime, dates: ValuationCalendar) -> datetime.date:
+    return dates.period_end(pd.Period(_to_date(date), 'Q') - 1)
+
+def get_mtd(date: datetime, dates: ValuationCalendar) -> datetime.date:
+    return dates.period_end(pd.Period(_to_date(date), 'M') - 1)
 
 def get_last_day(date: datetime) -> datetime.date:
     date_last_day = datetime(date.year, date.month, calendar.monthrange(date.year, date.month)[1])
 
     return date_last_day
 
-def get_one_day(date: datetime, dates: list[datetime]) -> datetime.date:
-    date_1d = date - timedelta(days=1)
-    date_1d = datetime(date_1d.year, date_1d.month, date_1d.day)
-    date_1d = max([date for date in dates if date <= date_1d]).date()
-
-    return date_1d
-
-def get_one_week(date: datetime, dates: list[datetime]) -> datetime.date:
-    date_1w = date - timedelta(weeks=1)
-    date_1w = datetime(date_1w.year, date_1w.month, date_1w.day)
-    date_1w = max([date for date in dates if date <= date_1w]).date()
+def get_one_day(date: datetime, dates: ValuationCalendar) -> datetime.date:
+    return dates.asof(_to_date(date) - timedelta(days=1))
 
-    return date_1w
+def get_one_week(date: datetime, dates: ValuationCalendar) -> datetime.date:
+    return dates.asof(_to_date(date) - timedelta(weeks=1))
 
-def get_one_month(date: datetime, dates: list[datetime]) -> datetime.date:
-    date_1m = date - relativedelta(months=1)
-    date_1m = datetime(date_1m.year, date_1m.month, date_1m.day)
-    date_1m = max([date for date in dates if date <= date_1m]).date()
-    
-    return date_1m
\ No newline at end of file
+def get_one_month(date: datetime, dates: ValuationCalendar) -> datetime.date:
+    return dates.asof(_to_date(date) - relativedelta(months=1))